@@ -0,0 +1,76 @@
+"""
+HomeForge AI — Libreria condivisa della render chain
+
+Moduli importabili dagli script in `chain/` (training, preview PBR, L4_script).
+Gli script Blender non hanno `chain/` nel sys.path: aggiungerlo prima dell'import:
+
+    import sys
+    from pathlib import Path
+    sys.path.insert(0, str(Path(__file__).resolve().parent))   # chain/
+    from homeforge import compositing
+
+Questo file NON importa bpy: i moduli puri (lint, parser, scheduler) devono
+funzionare anche fuori da Blender.
+"""
+import os
+import sys
+import hashlib
+from pathlib import Path
+
+CHAIN_DIR = Path(__file__).resolve().parent.parent
+PROJECT_DIR = CHAIN_DIR.parent
+MATERIALS_DIR = CHAIN_DIR / "materials"
+TEX_DIR = MATERIALS_DIR / "textures"
+PHOTOS_DIR = PROJECT_DIR / "photos"
+OUTPUT_DIR = PROJECT_DIR / "output"
+
+
+def script_args(argv=None):
+    """Argomenti dopo `--` sulla riga di comando di Blender.
+
+    `blender --background --python script.py -- --tier draft` → ['--tier', 'draft'].
+    Fuori da Blender (python script.py ...) ritorna argv[1:].
+    """
+    argv = sys.argv if argv is None else argv
+    if "--" in argv:
+        return argv[argv.index("--") + 1:]
+    if argv and Path(argv[0]).name.startswith("blender"):
+        return []
+    return argv[1:]
+
+
+def id_alive(idblock):
+    """False se il datablock Blender è stato rimosso (clear scene, factory settings)."""
+    try:
+        idblock.name
+        return True
+    except ReferenceError:
+        return False
+
+
+def cpu_cores():
+    """Core utilizzabili dal processo (affinità CPU su Linux)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def cpu_sets(n_workers, threads, cores=None):
+    """Core di ogni worker, `threads` consecutivi e ciclici sulla lista dei core
+    (None se l'affinità non è supportata). Con più worker × thread che core i
+    gruppi si sovrappongono, ma ognuno ha sempre min(threads, core) core."""
+    if not hasattr(os, "sched_setaffinity"):
+        return [None] * n_workers
+    cores = cpu_cores() if cores is None else cores
+    take = min(threads, len(cores))
+    return [[cores[(i * threads + k) % len(cores)] for k in range(take)] or None
+            for i in range(n_workers)]
+
+
+def file_hash(path):
+    """sha1 del contenuto (letto a blocchi da 1 MB)."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
@@ -0,0 +1,188 @@
+"""
+HomeForge AI — Libreria materiali pre-costruita (.blend)
+I materiali tarati (Piode_PBR, Legno_Travi_PBR, Rame_Brunito, Pietra_Muro)
+vengono costruiti UNA volta e scritti in chain/materials/hf_materials_v<N>.blend.
+Gli script li caricano con bpy.data.libraries.load (append o link) invece di
+ricostruire i node tree a ogni run.
+
+Rebuild automatico: il manifest JSON accanto al .blend registra l'hash delle
+sorgenti dei parametri (homeforge/materials.py, stone_wall.md, roof_piode.md).
+Se una sorgente cambia, la libreria viene ricostruita al primo load.
+
+Build esplicito:
+    blender --background --python chain/homeforge/asset_library.py -- [--force]
+"""
+import sys
+import json
+import hashlib
+import argparse
+from pathlib import Path
+
+import bpy
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import PROJECT_DIR, MATERIALS_DIR, script_args
+from homeforge import materials as hfm
+from homeforge import texture_cache
+
+# Incrementare quando cambia la struttura dei materiali (non i parametri:
+# quelli sono coperti dall'hash delle sorgenti)
+LIBRARY_VERSION = 1
+LIBRARY_PATH = MATERIALS_DIR / f"hf_materials_v{LIBRARY_VERSION}.blend"
+MANIFEST_PATH = LIBRARY_PATH.with_suffix(".json")
+
+# Sorgenti dei parametri: se cambiano, la libreria è da ricostruire
+PARAM_SOURCES = [
+    Path(hfm.__file__).resolve(),
+    MATERIALS_DIR / "stone_wall.md",
+    MATERIALS_DIR / "roof_piode.md",
+]
+
+# Nome materiale → builder (ao/rough/disp impacchettate dove ci sono almeno due map)
+LIBRARY_MATERIALS = {
+    "Piode_PBR": lambda: hfm.preset_material("piode", packed=True),
+    "Legno_Travi_PBR": lambda: hfm.preset_material("legno_travi", packed=True),
+    "Rame_Brunito": lambda: hfm.create_rame_brunito(),
+    "Pietra_Muro": lambda: hfm.preset_material("pietra_muro", packed=True),
+}
+
+
+def source_hash():
+    """Hash di versione + contenuto delle sorgenti dei parametri."""
+    h = hashlib.sha1(f"v{LIBRARY_VERSION}".encode())
+    for path in PARAM_SOURCES:
+        h.update(path.name.encode())
+        h.update(path.read_bytes() if path.exists() else b"")
+    return h.hexdigest()
+
+
+def read_manifest():
+    if not MANIFEST_PATH.exists():
+        return {}
+    return json.loads(MANIFEST_PATH.read_text())
+
+
+def is_stale():
+    """True se il .blend manca o le sorgenti dei parametri sono cambiate."""
+    if not LIBRARY_PATH.exists():
+        return True
+    manifest = read_manifest()
+    return (manifest.get("version") != LIBRARY_VERSION
+            or manifest.get("source_hash") != source_hash()
+            or set(manifest.get("materials", {})) != set(LIBRARY_MATERIALS))
+
+
+def _local_named(name, exclude):
+    return next((m for m in bpy.data.materials
+                 if m.name == name and m.library is None and m != exclude), None)
+
+
+def build_library(force=False):
+    """Costruisce i materiali e li scrive nel .blend della libreria.
+
+    I materiali della sessione (scena già costruita, daemon caldo) non vengono
+    toccati: la libreria si costruisce su datablock nuovi, con le map sorgente,
+    rimossi dopo la scrittura. Chi li usa li carica con load_materials().
+    """
+    if not force and not is_stale():
+        print(f"Libreria materiali aggiornata: {LIBRARY_PATH.name}")
+        return LIBRARY_PATH
+
+    before = set(bpy.data.materials)
+    images_before = set(bpy.data.images)
+    # Senza fingerprint i materiali in sessione non vengono riusati dai builder
+    hidden = {m: m[hfm.FINGERPRINT_PROP] for m in bpy.data.materials
+              if m.library is None and hfm.FINGERPRINT_PROP in m}
+    for mat in hidden:
+        del mat[hfm.FINGERPRINT_PROP]
+    renamed = {}
+    built = {}
+    hfm.clear_caches()
+    try:
+        with texture_cache.use_tier("final"):
+            for name, builder in LIBRARY_MATERIALS.items():
+                mat = builder()
+                built[name] = mat.copy() if mat in before else mat   # es. materiale linkato
+        for name, mat in built.items():
+            live = _local_named(name, mat)
+            if live is not None:                 # il nome torna al materiale in uso dopo il write
+                renamed[live] = name
+                live.name = f"{name}.hf_live"
+            mat.name = name
+            mat.use_fake_user = True
+            mat["hf_library_version"] = LIBRARY_VERSION
+
+        LIBRARY_PATH.parent.mkdir(parents=True, exist_ok=True)
+        # Scrive solo i materiali (+ immagini referenziate, non impacchettate)
+        bpy.data.libraries.write(str(LIBRARY_PATH), set(built.values()),
+                                 fake_user=True, path_remap='ABSOLUTE')
+        MANIFEST_PATH.write_text(json.dumps({
+            "version": LIBRARY_VERSION,
+            "source_hash": source_hash(),
+            "materials": {name: mat.get(hfm.FINGERPRINT_PROP) for name, mat in built.items()},
+            "sources": [str(p.relative_to(PROJECT_DIR)) for p in PARAM_SOURCES],
+        }, indent=2))
+    finally:
+        # Solo i datablock creati qui e senza altri utenti
+        bpy.data.batch_remove([m for m in built.values()
+                               if m not in before and m.users - m.use_fake_user == 0])
+        bpy.data.batch_remove([img for img in bpy.data.images
+                               if img not in images_before and img.users == 0])
+        for live, name in renamed.items():
+            live.name = name
+        for mat, fp in hidden.items():
+            mat[hfm.FINGERPRINT_PROP] = fp
+        hfm.clear_caches()
+    print(f"Libreria materiali scritta: {LIBRARY_PATH} ({len(built)} materiali)")
+    return LIBRARY_PATH
+
+
+def load_materials(names=None, link=False):
+    """Carica materiali dalla libreria → {nome: Material}.
+
+    link=False (append): copia locale modificabile.
+    link=True: riferimento read-only al .blend (scena più leggera, nessuna copia
+    dei node tree; modifiche solo ricostruendo la libreria).
+    I materiali già presenti in sessione con lo stesso nome non vengono ricaricati.
+    """
+    names = list(names or LIBRARY_MATERIALS)
+    unknown = set(names) - set(LIBRARY_MATERIALS)
+    if unknown:
+        raise KeyError(f"Materiali non in libreria: {sorted(unknown)}")
+    if is_stale():
+        build_library(force=True)
+
+    lib_path = str(LIBRARY_PATH)
+    result = {}
+    missing = []
+    for name in names:
+        mat = bpy.data.materials.get(name)
+        if mat is not None and (not link or (mat.library and mat.library.filepath == lib_path)):
+            result[name] = mat
+        else:
+            missing.append(name)
+
+    if missing:
+        with bpy.data.libraries.load(lib_path, link=link) as (data_from, data_to):
+            requested = [n for n in missing if n in data_from.materials]
+            data_to.materials = list(requested)
+        for name, mat in zip(requested, data_to.materials):
+            if mat is None:
+                continue
+            if not link:
+                mat.use_fake_user = False
+            result[name] = mat
+    return result
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — build libreria materiali")
+    ap.add_argument("--force", action="store_true", help="ricostruisci anche se aggiornata")
+    args = ap.parse_args(script_args() if argv is None else argv)
+    build_library(force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,499 @@
+"""
+HomeForge AI — Bake dei canali procedurali (Rame_Brunito, micro-bump piode/pietra)
+Il rame valuta due Noise a 10–14 ottave, due ColorRamp e un Bump a ogni
+campione di shading; pietra e piode aggiungono un micro-bump Noise a 12–16
+ottave. A 512 samples questi fBm sono una quota grossa del tempo di shading.
+
+Per ogni (mesh, material slot) con canali procedurali il bake scrive su
+immagine, alla densità texel scelta (texel/m):
+    color      Base Color  → Emit, sRGB
+    roughness  Roughness   → Emit, Non-Color
+    normal     Normal      → Normal tangent (bump inclusi), Non-Color
+e sostituisce nello slot una copia del materiale `<nome>_baked` che legge le
+immagini dalla UV `hf_bake`; i canali non procedurali (texture Poly Haven)
+restano come sono.
+
+Un canale che mescola texture immagine e procedurali non si bakea intero (il
+bake a 512 texel/m sostituirebbe la normal map 2K): per il Normal si bakea
+solo l'Height dei Bump alimentati da un ramo procedurale puro (il micro-bump
+Noise di pietra e piode), su EXR float, e lo si ricollega al Bump, che resta
+sopra la normal map immagine. Gli altri canali misti restano procedurali.
+
+Chiave cache: hash dei parametri del node tree (ColorRamp, Noise, mapping...)
++ topologia mesh + slot + risoluzione: si rifà il bake solo se cambia uno di
+questi. File in materials/textures/cache/bake/ (<materiale>_<mesh>_<slot>_*),
+con le UV salvate accanto: un cache hit non rifà nemmeno l'unwrap.
+
+Solo per il livello final (draft/preview iterano proprio sui parametri del
+lookdev): negli script, dopo quality.apply_tier():
+    bake_cache.apply(scene, tier=TIER["name"])
+
+    blender --background file.blend --python chain/homeforge/bake_cache.py -- [--density 512] [--list] [--force]
+
+HF_BAKE=0 disattiva il bake, HF_BAKE_DENSITY cambia la densità di default.
+"""
+import os
+import re
+import sys
+import json
+import math
+import time
+import hashlib
+import argparse
+from pathlib import Path
+
+import bpy
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import script_args
+from homeforge import materials as hfm
+from homeforge.render_cache import node_tree_hash
+from homeforge.texture_cache import CACHE_DIR
+
+BAKE_DIR = CACHE_DIR / "bake"
+ENABLE_ENV = "HF_BAKE"
+DENSITY_ENV = "HF_BAKE_DENSITY"
+DEFAULT_DENSITY = int(os.environ.get(DENSITY_ENV, 512))    # texel per metro
+BAKE_TIERS = ("final",)
+MIN_RES, MAX_RES = 256, 4096
+PACKING = 0.6            # frazione dello spazio UV coperta dalle isole (smart project + margini)
+ISLAND_MARGIN = 0.01
+MARGIN = 8               # px di estensione oltre il bordo delle isole
+BAKE_SAMPLES = 16        # antialiasing del texel; Emit/Normal non dipendono dalle luci
+UV_NAME = "hf_bake"
+KEY_PROP = "hf_bake_key"
+SOURCE_PROP = "hf_baked_from"
+
+# canale → (input del Principled, tipo bake, colorspace)
+CHANNELS = {
+    "color": ("Base Color", 'EMIT', 'sRGB'),
+    "roughness": ("Roughness", 'EMIT', 'Non-Color'),
+    "normal": ("Normal", 'NORMAL', 'Non-Color'),
+}
+PROCEDURAL = {"TEX_NOISE", "TEX_VORONOI", "TEX_WAVE", "TEX_MAGIC", "TEX_WHITE_NOISE",
+              "TEX_GABOR", "TEX_BRICK", "TEX_CHECKER", "TEX_GRADIENT"}
+# Nodi / coordinate che dipendono da vista, istanza o trasformazione dell'oggetto:
+# il canale non è bakeabile (il bake è per mesh, condiviso fra gli oggetti)
+VIEW_DEPENDENT = {"LIGHT_PATH", "FRESNEL", "LAYER_WEIGHT", "CAMERA", "AMBIENT_OCCLUSION",
+                  "OBJECT_INFO", "PARTICLE_INFO", "NEW_GEOMETRY"}
+VIEW_COORDS = {"Camera", "Window", "Reflection"}
+IMAGE_NODES = {"TEX_IMAGE", "TEX_ENVIRONMENT"}
+HEIGHT = "height:"       # canale "height:<Bump>": Height procedurale di un Bump su normal map immagine
+# Proprietà da non copiare nelle copie del materiale (cache materiali, scene_diff)
+STRIP_PROPS = (hfm.FINGERPRINT_PROP, "hf_l3", "hf_spec")
+
+
+def enabled():
+    return os.environ.get(ENABLE_ENV, "1") != "0"
+
+
+# ============================================================
+# ANALISI NODE TREE
+# ============================================================
+def _principled(tree):
+    """Principled BSDF collegato all'output attivo del materiale (None se altro shader)."""
+    outputs = [n for n in tree.nodes if n.type == 'OUTPUT_MATERIAL']
+    out = next((n for n in outputs if n.is_active_output), outputs[0] if outputs else None)
+    if out is None or not out.inputs["Surface"].is_linked:
+        return None
+    node = out.inputs["Surface"].links[0].from_node
+    return node if node.type == 'BSDF_PRINCIPLED' else None
+
+
+def _upstream_links(socket):
+    """Tutti i link che alimentano un socket, risalendo il grafo."""
+    found, stack, seen = [], [socket], set()
+    while stack:
+        for link in stack.pop().links:
+            if link.is_muted or link.from_node.name in seen:
+                continue
+            seen.add(link.from_node.name)
+            found.append(link)
+            stack.extend(s for s in link.from_node.inputs if s.is_linked)
+    return found
+
+
+def _bakeable(links):
+    """Ramo solo procedurale: niente immagini, nodi o coordinate dipendenti dalla vista."""
+    nodes = {link.from_node.type for link in links}
+    if not nodes & PROCEDURAL or nodes & (VIEW_DEPENDENT | IMAGE_NODES):
+        return False
+    return not any(link.from_node.type == 'TEX_COORD'
+                   and (link.from_socket.name in VIEW_COORDS or link.from_node.object is not None)
+                   for link in links)
+
+
+def procedural_channels(mat):
+    """Canali del materiale calcolati da texture procedurali (e bakeabili).
+
+    Se il Normal mescola normal map immagine e bump procedurali, ritorna un
+    canale `height:<Bump>` per ogni Bump con Height procedurale puro.
+    """
+    if mat is None or not mat.use_nodes or mat.node_tree is None:
+        return ()
+    bsdf = _principled(mat.node_tree)
+    if bsdf is None:
+        return ()
+    channels = []
+    for channel, (socket, _, _) in CHANNELS.items():
+        links = _upstream_links(bsdf.inputs[socket])
+        if _bakeable(links):
+            channels.append(channel)
+        elif channel == "normal":
+            bumps = sorted((link.from_node for link in links if link.from_node.type == 'BUMP'),
+                           key=lambda n: n.name)
+            channels += [HEIGHT + bump.name for bump in bumps
+                         if _bakeable(_upstream_links(bump.inputs["Height"]))]
+    return tuple(channels)
+
+
+def _spec(channel):
+    """(tipo bake, colorspace) di un canale."""
+    if channel.startswith(HEIGHT):
+        return 'EMIT', 'Non-Color'
+    return CHANNELS[channel][1:]
+
+
+def _source(tree, channel):
+    """Socket che alimenta il canale (input del Principled o Height del Bump)."""
+    if channel.startswith(HEIGHT):
+        socket = tree.nodes[channel[len(HEIGHT):]].inputs["Height"]
+    else:
+        socket = _principled(tree).inputs[CHANNELS[channel][0]]
+    return socket.links[0].from_socket
+
+
+def _copy(mat, name):
+    """Copia del materiale fuori dalle cache (nessun fingerprint / nome L3)."""
+    copy = mat.copy()
+    copy.name = name
+    for prop in STRIP_PROPS:
+        copy.pop(prop, None)
+    return copy
+
+
+def _prune(tree):
+    """Rimuove i nodi che non arrivano a un output (fBm non più collegati)."""
+    keep = set()
+    for out in (n for n in tree.nodes if n.type.startswith('OUTPUT')):
+        keep.add(out.name)
+        for socket in out.inputs:
+            keep.update(link.from_node.name for link in _upstream_links(socket))
+    for node in [n for n in tree.nodes if n.name not in keep]:
+        tree.nodes.remove(node)
+
+
+# ============================================================
+# TARGET: (mesh, slot) con canali procedurali
+# ============================================================
+def _safe(name):
+    return re.sub(r"[^\w.-]", "_", name)
+
+
+def _slot_loops(mesh, slot):
+    """Maschera dei loop appartenenti ai poligoni dello slot."""
+    mat_idx = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("material_index", mat_idx)
+    totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", totals)
+    return np.repeat(mat_idx == slot, totals)
+
+
+def _mesh_key(mesh):
+    """Topologia + coordinate (le Generated dipendono dai bound della mesh)."""
+    h = hashlib.sha1()
+    for coll, attr, count, dtype in ((mesh.vertices, "co", 3, np.float32),
+                                     (mesh.loops, "vertex_index", 1, np.int32),
+                                     (mesh.polygons, "loop_total", 1, np.int32),
+                                     (mesh.polygons, "material_index", 1, np.int32)):
+        buf = np.empty(len(coll) * count, dtype=dtype)
+        coll.foreach_get(attr, buf)
+        h.update(buf.round(5).tobytes() if dtype is np.float32 else buf.tobytes())
+    return h.hexdigest()
+
+
+def resolution(obj, slot, density):
+    """Lato dell'immagine (potenza di 2) per la superficie dello slot alla densità data."""
+    mesh = obj.data
+    areas = np.empty(len(mesh.polygons), dtype=np.float32)
+    mesh.polygons.foreach_get("area", areas)
+    mat_idx = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("material_index", mat_idx)
+    scale = max(abs(s) for s in obj.matrix_world.to_scale())
+    area = float(areas[mat_idx == slot].sum()) * scale * scale
+    side = math.sqrt(area / PACKING) * density
+    return int(min(MAX_RES, max(MIN_RES, 2 ** math.ceil(math.log2(max(side, 1.0))))))
+
+
+def targets(scene, materials=None):
+    """[(oggetto, slot, materiale, canali)], uno per (mesh, slot): le mesh condivise si bakeano una volta."""
+    found, seen = [], set()
+    for obj in scene.objects:
+        if obj.type != 'MESH' or obj.hide_render or obj.modifiers or not obj.visible_get():
+            continue                  # modifier / Geometry Nodes: la mesh valutata non ha le UV di bake
+        for slot, ms in enumerate(obj.material_slots):
+            mat = ms.material
+            if mat is None or (materials and mat.name not in materials) or SOURCE_PROP in mat:
+                continue
+            key = (obj.data.name, slot, mat.name)
+            channels = procedural_channels(mat)
+            if channels and key not in seen:
+                seen.add(key)
+                found.append((obj, slot, mat, channels))
+    return found
+
+
+def bake_key(obj, slot, mat, channels, res):
+    blob = json.dumps([node_tree_hash(mat.node_tree), _mesh_key(obj.data), slot, channels, res,
+                       BAKE_SAMPLES, MARGIN, ISLAND_MARGIN, bpy.app.version_string])
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+def _paths(obj, slot, mat, key, channels):
+    stem = f"{_safe(mat.name)}_{_safe(obj.data.name)}_{slot}"
+    base = BAKE_DIR / f"{stem}_{key[:12]}"
+    images = {ch: base.with_name(f"{base.name}_{_safe(ch)}.{'exr' if ch.startswith(HEIGHT) else 'png'}")
+              for ch in channels}
+    return stem, images, base.with_name(f"{base.name}_uv.npy")
+
+
+# ============================================================
+# UV + BAKE
+# ============================================================
+def _uv_layer(mesh):
+    uv = mesh.uv_layers.get(UV_NAME)
+    if uv is None:
+        uv = mesh.uv_layers.new(name=UV_NAME, do_init=False)
+        uv.data.foreach_set("uv", np.zeros(len(mesh.loops) * 2, dtype=np.float32))
+    return uv
+
+
+def _read_uv(uv):
+    data = np.empty(len(uv.data) * 2, dtype=np.float32)
+    uv.data.foreach_get("uv", data)
+    return data.reshape(-1, 2)
+
+
+def _select_only(obj):
+    for other in bpy.context.view_layer.objects.selected:
+        other.select_set(False)
+    obj.select_set(True)
+    bpy.context.view_layer.objects.active = obj
+
+
+def unwrap(obj, slot):
+    """Smart UV Project dei soli poligoni dello slot nella UV hf_bake → UV dello slot."""
+    mesh = obj.data
+    uv = _uv_layer(mesh)
+    mesh.uv_layers.active = uv
+    _select_only(obj)
+    obj.active_material_index = slot
+    bpy.ops.object.mode_set(mode='EDIT')
+    bpy.ops.mesh.select_all(action='DESELECT')
+    bpy.ops.object.material_slot_select()
+    bpy.ops.uv.smart_project(angle_limit=math.radians(66), island_margin=ISLAND_MARGIN,
+                             scale_to_bounds=False)
+    bpy.ops.object.mode_set(mode='OBJECT')
+    return _read_uv(mesh.uv_layers[UV_NAME])[_slot_loops(mesh, slot)]
+
+
+def _restore_uv(obj, slot, slot_uv):
+    uv = _uv_layer(obj.data)
+    data = _read_uv(uv)
+    data[_slot_loops(obj.data, slot)] = slot_uv
+    uv.data.foreach_set("uv", data.ravel())
+
+
+def _bake_channel(obj, slot, mat, channel, image, sink):
+    """Bake di un canale con una copia del materiale (l'originale non viene toccato)."""
+    bake_type, _ = _spec(channel)
+    scratch = _copy(mat, f"{mat.name}_bake_{channel}")
+    nt = scratch.node_tree
+    if bake_type == 'EMIT':
+        out = next(n for n in nt.nodes if n.type == 'OUTPUT_MATERIAL' and n.is_active_output)
+        emit = nt.nodes.new("ShaderNodeEmission")
+        nt.links.new(_source(nt, channel), emit.inputs["Color"])
+        nt.links.new(emit.outputs["Emission"], out.inputs["Surface"])
+    tex = nt.nodes.new("ShaderNodeTexImage")
+    tex.image = image
+    nt.nodes.active = tex
+
+    # gli altri slot scrivono su un'immagine scarto: ogni slot ha le sue isole UV
+    saved = [ms.material for ms in obj.material_slots]
+    try:
+        for i, ms in enumerate(obj.material_slots):
+            ms.material = scratch if i == slot else sink
+        _select_only(obj)
+        bpy.ops.object.bake(type=bake_type, target='IMAGE_TEXTURES', uv_layer=UV_NAME,
+                            margin=MARGIN, use_clear=True, normal_space='TANGENT')
+    finally:
+        for ms, original in zip(obj.material_slots, saved):
+            ms.material = original
+        bpy.data.materials.remove(scratch)
+
+
+def _sink():
+    mat = bpy.data.materials.new("hf_bake_sink")
+    mat.use_nodes = True
+    tex = mat.node_tree.nodes.new("ShaderNodeTexImage")
+    tex.image = bpy.data.images.new("hf_bake_sink", 8, 8)
+    mat.node_tree.nodes.active = tex
+    return mat
+
+
+def bake(obj, slot, mat, channels, res, images, uv_path, sink):
+    """Unwrap + bake dei canali; salva PNG e UV dello slot."""
+    BAKE_DIR.mkdir(parents=True, exist_ok=True)
+    np.save(uv_path, unwrap(obj, slot))
+    for channel in channels:
+        colorspace = _spec(channel)[1]
+        height = channel.startswith(HEIGHT)          # 8 bit di altezza → gradini nel bump
+        image = bpy.data.images.new(f"{mat.name}_{channel}_baked", res, res, alpha=False,
+                                    float_buffer=height, is_data=colorspace != 'sRGB')
+        try:
+            _bake_channel(obj, slot, mat, channel, image, sink)
+            image.filepath_raw = str(images[channel])
+            image.file_format = 'OPEN_EXR' if height else 'PNG'
+            image.save()
+        finally:
+            bpy.data.images.remove(image)
+
+
+def baked_material(mat, key, images):
+    """Copia `<nome>_baked` con i canali letti dalle immagini (UV hf_bake); riusata per chiave."""
+    for existing in bpy.data.materials:
+        if existing.get(KEY_PROP) == key:
+            return existing
+    baked = _copy(mat, f"{mat.name}_baked")
+    baked[KEY_PROP] = key
+    baked[SOURCE_PROP] = mat.name
+    nt = baked.node_tree
+    bsdf = _principled(nt)
+    uv = nt.nodes.new("ShaderNodeUVMap")
+    uv.uv_map = UV_NAME
+    uv.location = (bsdf.location.x - 900, bsdf.location.y)
+    for i, (channel, path) in enumerate(images.items()):
+        colorspace = _spec(channel)[1]
+        tex = nt.nodes.new("ShaderNodeTexImage")
+        tex.image = hfm.load_image(path, colorspace)
+        tex.location = (bsdf.location.x - 600, bsdf.location.y - 300 * i)
+        nt.links.new(uv.outputs["UV"], tex.inputs["Vector"])
+        out = tex.outputs["Color"]
+        if channel.startswith(HEIGHT):                # il Bump resta sopra la normal map immagine
+            bump = nt.nodes[channel[len(HEIGHT):]]
+            tex.location = (bump.location.x - 300, bump.location.y - 200)
+            nt.links.new(out, bump.inputs["Height"])
+            continue
+        if channel == "normal":
+            nmap = nt.nodes.new("ShaderNodeNormalMap")
+            nmap.space = 'TANGENT'
+            nmap.uv_map = UV_NAME
+            nmap.location = (bsdf.location.x - 250, bsdf.location.y - 300 * i)
+            nt.links.new(out, nmap.inputs["Color"])
+            out = nmap.outputs["Normal"]
+        nt.links.new(out, bsdf.inputs[CHANNELS[channel][0]])
+    _prune(nt)
+    return baked
+
+
+# ============================================================
+# APPLY / RESTORE
+# ============================================================
+def apply(scene=None, tier=None, density=None, materials=None, force=False):
+    """Bake (se serve) e sostituzione dei materiali procedurali → report per (mesh, slot).
+
+    Con tier fuori da BAKE_TIERS (o HF_BAKE=0) non fa nulla. I materiali
+    originali restano in bpy.data: restore(report) li rimette negli slot.
+    """
+    if (tier is not None and tier not in BAKE_TIERS) or not enabled():
+        return []
+    scene = scene or bpy.context.scene
+    density = density or DEFAULT_DENSITY
+    found = targets(scene, materials)
+    if not found:
+        return []
+
+    cycles = scene.cycles
+    saved = (scene.render.engine, cycles.samples, cycles.use_denoising,
+             bpy.context.view_layer.objects.active, list(bpy.context.view_layer.objects.selected))
+    scene.render.engine = 'CYCLES'
+    cycles.samples = BAKE_SAMPLES
+    cycles.use_denoising = False
+    sink = None
+    report = []
+    try:
+        for obj, slot, mat, channels in found:
+            t0 = time.perf_counter()
+            res = resolution(obj, slot, density)
+            key = bake_key(obj, slot, mat, channels, res)
+            stem, images, uv_path = _paths(obj, slot, mat, key, channels)
+            hit = not force and uv_path.exists() and all(p.exists() for p in images.values())
+            if hit:
+                _restore_uv(obj, slot, np.load(uv_path))
+            else:
+                for old in BAKE_DIR.glob(f"{stem}_*"):          # chiavi precedenti
+                    old.unlink()
+                sink = sink or _sink()
+                bake(obj, slot, mat, channels, res, images, uv_path, sink)
+            obj.material_slots[slot].material = baked_material(mat, key, images)
+            report.append(dict(material=mat.name, mesh=obj.data.name, object=obj.name, slot=slot,
+                               channels=list(channels), resolution=res, hit=hit,
+                               s=round(time.perf_counter() - t0, 3)))
+    finally:
+        scene.render.engine, cycles.samples, cycles.use_denoising, active, selected = saved
+        for obj in bpy.context.view_layer.objects.selected:
+            obj.select_set(False)
+        for obj in selected:
+            obj.select_set(True)
+        bpy.context.view_layer.objects.active = active
+        if sink is not None:
+            image = sink.node_tree.nodes.active.image
+            bpy.data.materials.remove(sink)
+            bpy.data.images.remove(image)
+    print_report(report)
+    return report
+
+
+def restore(report):
+    """Rimette negli slot i materiali procedurali originali."""
+    for row in report:
+        bpy.data.objects[row["object"]].material_slots[row["slot"]].material = \
+            bpy.data.materials[row["material"]]
+
+
+def print_report(report):
+    if not report:
+        return
+    baked = [r for r in report if not r["hit"]]
+    print(f"  Bake: {len(report)} slot procedurali → texture "
+          f"({len(baked)} bakeati, {len(report) - len(baked)} dalla cache)")
+    for r in report:
+        took = "cache" if r["hit"] else f"{r['s']:.1f}s"
+        print(f"    {r['material']:<18} {r['mesh']:<24} slot {r['slot']}  {r['resolution']:>4}px  "
+              f"{'+'.join(r['channels']):<24} {took}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — bake dei canali procedurali")
+    ap.add_argument("--density", type=int, default=DEFAULT_DENSITY, help="texel per metro")
+    ap.add_argument("--material", action="append", help="solo questi materiali (ripetibile)")
+    ap.add_argument("--list", action="store_true", help="mostra slot, canali e risoluzione senza bake")
+    ap.add_argument("--force", action="store_true", help="rifai il bake anche se in cache")
+    ap.add_argument("--save", help="salva il .blend con i materiali baked")
+    args = ap.parse_args(script_args() if argv is None else argv)
+    scene = bpy.context.scene
+    if args.list:
+        for obj, slot, mat, channels in targets(scene, args.material):
+            print(f"  {mat.name:<18} {obj.data.name:<24} slot {slot}  "
+                  f"{resolution(obj, slot, args.density):>4}px  {'+'.join(channels)}")
+        return
+    apply(scene, density=args.density, materials=args.material, force=args.force)
+    if args.save:
+        bpy.ops.wm.save_as_mainfile(filepath=str(Path(args.save).resolve()), copy=True)
+
+
+if __name__ == "__main__":
+    main()
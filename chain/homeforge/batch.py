@@ -0,0 +1,223 @@
+"""
+HomeForge AI — Batch multi-vista (costruisci una volta, renderizza N volte)
+La scena (materiali, geometria, texture) viene costruita UNA volta; ogni vista
+cambia solo camera (posizione, target, focale) e, se indicata, la foto per il
+fotoinserimento. render.use_persistent_data = True: BVH e texture restano in
+memoria tra un render e l'altro, solo la prima vista paga sync + BVH.
+
+Dallo script L4, dopo aver costruito la scena:
+    from homeforge import batch
+    batch.render_views(batch.DEFAULT_VIEWS)            # o batch.load_views("views.json")
+
+Su un .blend già salvato:
+    blender --background scena.blend --python chain/homeforge/batch.py -- \
+        --views views.json --tier preview
+
+I tempi per vista finiscono in un record "batch" di homeforge.instrument
+(chain/L4_runs.jsonl → chain/L4_execution_log.md).
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import bpy
+from mathutils import Vector
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import PHOTOS_DIR, OUTPUT_DIR, script_args
+from homeforge import compositing
+from homeforge import instrument
+from homeforge import quality
+from homeforge.instrument import EXECUTION_LOG
+
+# Viste di L1_architect_decisions.md / L2_geometry_spec.md (camera OP-080)
+DEFAULT_VIEWS = [
+    dict(name="prato_sud", location=(5.50, -16.00, 1.60), target=(5.50, 4.00, 2.00),
+         lens=35, photo="site_photo.jpg"),
+    dict(name="tre_quarti_basso", location=(-7.00, -11.00, 0.80), target=(5.50, 4.00, 3.00),
+         lens=28, photo=None),
+]
+
+VIEW_KEYS = ("name", "location", "target")
+# Vincoli che orientano la camera e sovrascrivono rotation_euler
+TRACK_CONSTRAINTS = {'TRACK_TO', 'DAMPED_TRACK', 'LOCKED_TRACK'}
+# Impostazioni toccate dal batch (viste + quality.apply_tier), ripristinate alla fine
+SAVED_SETTINGS = {
+    "camera": ("location", "rotation_euler"),
+    "lens": ("lens",),
+    "render": ("film_transparent", "filepath", "use_persistent_data", "resolution_percentage",
+               "use_stamp_note", "stamp_note_text"),
+    "image": ("file_format", "color_mode"),
+    "cycles": ("samples", "seed", "use_animated_seed", "use_adaptive_sampling",
+               "adaptive_threshold", "max_bounces", "texture_limit_render", "use_denoising",
+               "denoiser", "denoising_prefilter", "denoising_quality"),
+}
+
+
+def load_views(path):
+    """Lista di viste da JSON: [{name, location, target, lens?, photo?}]."""
+    views = json.loads(Path(path).read_text())
+    for i, view in enumerate(views):
+        missing = [k for k in VIEW_KEYS if k not in view]
+        if missing:
+            raise ValueError(f"Vista {i} in {path}: mancano {missing}")
+    return views
+
+
+def aim_camera(cam, location, target):
+    """Posiziona la camera e la orienta verso target (-Z in avanti, Y in alto).
+
+    I vincoli di tracking attivi (es. Track-To verso un Empty, come in
+    training_tetto_piode.py) ignorerebbero target: vengono disattivati.
+    Ritorna i vincoli disattivati qui (per unmute_constraints).
+    """
+    muted = [c for c in cam.constraints if c.type in TRACK_CONSTRAINTS and not c.mute]
+    for c in muted:
+        c.mute = True
+    cam.location = location
+    direction = Vector(target) - Vector(location)
+    cam.rotation_euler = direction.to_track_quat('-Z', 'Y').to_euler()
+    return muted
+
+
+def unmute_constraints(constraints):
+    for c in constraints:
+        c.mute = False
+
+
+def _camera(scene):
+    if scene.camera is not None:
+        return scene.camera
+    data = bpy.data.cameras.new("HF_BatchCamera")
+    data.sensor_width = 36
+    data.clip_start, data.clip_end = 0.1, 100
+    cam = bpy.data.objects.new("HF_BatchCamera", data)
+    scene.collection.objects.link(cam)
+    scene.camera = cam
+    return cam
+
+
+def _owners(scene, cam):
+    return dict(camera=cam, lens=cam.data, render=scene.render,
+                image=scene.render.image_settings, cycles=scene.cycles)
+
+
+def snapshot_settings(scene, cam):
+    """Valori di SAVED_SETTINGS (+ scene["hf_tier"]) prima del batch."""
+    owners = _owners(scene, cam)
+    saved = {}
+    for owner, attrs in SAVED_SETTINGS.items():
+        for attr in attrs:
+            value = getattr(owners[owner], attr)
+            saved[owner, attr] = value.copy() if hasattr(value, "copy") else value
+    return saved, scene.get("hf_tier")
+
+
+def restore_settings(scene, cam, snapshot):
+    saved, tier = snapshot
+    owners = _owners(scene, cam)
+    for (owner, attr), value in saved.items():
+        setattr(owners[owner], attr, value)
+    if tier is None:
+        scene.pop("hf_tier", None)
+    else:
+        scene["hf_tier"] = tier
+
+
+def _photo_path(photo):
+    path = Path(photo)
+    return path if path.is_absolute() else PHOTOS_DIR / path
+
+
+def render_views(views, output_dir=OUTPUT_DIR, scene=None, tier=None,
+                 log_path=EXECUTION_LOG, build_s=None):
+    """Renderizza tutte le viste nella sessione corrente → [{name, output, render_s, ...}].
+
+    build_s: tempo di costruzione della scena (solo per il log).
+    """
+    scene = scene or bpy.context.scene
+    cam = _camera(scene)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # camera, vincoli, output e livello qualità: il .blend salvato dopo torna come prima
+    snapshot = snapshot_settings(scene, cam)
+    muted = []
+    try:
+        tier_settings = quality.apply_tier(scene, tier)
+        scene.render.use_persistent_data = True
+        results = _render_views(scene, cam, views, output_dir, tier_settings, muted)
+    finally:
+        unmute_constraints(muted)
+        restore_settings(scene, cam, snapshot)
+
+    if log_path:
+        append_execution_log(results, tier_settings["name"], log_path, build_s)
+    return results
+
+
+def _render_views(scene, cam, views, output_dir, tier_settings, muted):
+    results = []
+    base_lens = cam.data.lens          # viste senza lens: focale del .blend, non della vista prima
+    for view in views:
+        name = view["name"]
+        photo = view.get("photo")
+        muted += aim_camera(cam, view["location"], view["target"])
+        cam.data.lens = view.get("lens", base_lens)
+        # Fotoinserimento: modello su sfondo trasparente
+        scene.render.film_transparent = bool(photo)
+        scene.render.image_settings.file_format = 'PNG'
+        scene.render.image_settings.color_mode = 'RGBA' if photo else 'RGB'
+        output = quality.tier_output(output_dir / f"render_{name}.png", tier_settings["name"])
+        scene.render.filepath = output
+
+        t0 = time.perf_counter()
+        with instrument.render_phases():
+            bpy.ops.render.render(write_still=True)
+        result = dict(name=name, output=output, render_s=time.perf_counter() - t0)
+
+        if photo:
+            composite = quality.tier_output(output_dir / f"fotoinserimento_{name}.png",
+                                            tier_settings["name"])
+            t0 = time.perf_counter()
+            compositing.composite_on_photo(output, _photo_path(photo), composite)
+            result.update(composite=composite, composite_s=time.perf_counter() - t0)
+        quality.record_render(output, tier_settings, result["render_s"], view=name)
+        results.append(result)
+        print(f"  Vista {name}: render {result['render_s']:.1f}s"
+              + (f", fotoinserimento {result['composite_s']:.1f}s" if photo else ""))
+    return results
+
+
+def append_execution_log(results, tier, log_path=EXECUTION_LOG, build_s=None):
+    """Record "batch" per il log L4: una riga per vista nella sezione della run."""
+    views = [dict(name=r["name"], render_s=round(r["render_s"], 2),
+                  composite_s=round(r["composite_s"], 2) if "composite_s" in r else None,
+                  output=instrument._rel(r.get("composite", r["output"])))
+             for r in results]
+    if build_s is not None:
+        instrument.record("build", build_s)
+    return instrument.finish(f"batch ({len(results)} viste, use_persistent_data)",
+                             tier=tier, views=views, log_path=log_path)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — batch multi-vista")
+    ap.add_argument("--views", help="JSON [{name, location, target, lens, photo}] "
+                                    "(default: viste di L1/L2)")
+    ap.add_argument("--out", default=str(OUTPUT_DIR))
+    ap.add_argument("--tier", choices=sorted(quality.TIERS))
+    ap.add_argument("--no-log", action="store_true")
+    args = ap.parse_args(script_args() if argv is None else argv)
+
+    views = load_views(args.views) if args.views else DEFAULT_VIEWS
+    render_views(views, args.out, tier=args.tier,
+                 log_path=None if args.no_log else EXECUTION_LOG)
+
+
+if __name__ == "__main__":
+    main()
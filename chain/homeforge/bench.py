@@ -0,0 +1,280 @@
+"""
+HomeForge AI — Benchmark per fase degli script della chain
+Lancia gli script headless a seed e livello qualità fissi e raccoglie i tempi
+per fase scritti da homeforge.instrument (clear, textures, materials, images,
+geometry, setup, render_sync, render_path_tracing, render_denoise,
+render_write, blend_save). Casi sintetici di scala: N travi, N aperture
+boolean, N materiali PBR.
+
+    python chain/homeforge/bench.py --tier draft --repeats 3
+    python chain/homeforge/bench.py --scripts tetto --cases beams
+    python chain/homeforge/bench.py --set-baseline      # fissa il riferimento
+
+Storico: chain/benchmarks/history.json (una voce per run); confronto con
+chain/benchmarks/baseline.json, regressione se una fase è più lenta del 10%
+(e di almeno 0.05 s). Il driver non importa bpy: ogni misura è un processo
+Blender separato ($BLENDER, default `blender`).
+"""
+import os
+import sys
+import json
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import CHAIN_DIR, PROJECT_DIR, script_args
+
+BLENDER = os.environ.get("BLENDER", "blender")
+SCRIPT = Path(__file__).resolve()
+BENCH_DIR = CHAIN_DIR / "benchmarks"
+HISTORY_PATH = BENCH_DIR / "history.json"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+
+SCRIPTS = {
+    "muro": CHAIN_DIR / "training_muro_pietra.py",
+    "tetto": CHAIN_DIR / "training_tetto_piode.py",
+    "stone_wall_pbr": CHAIN_DIR / "materials" / "render_stone_wall_pbr.py",
+    "piode_roof_pbr": CHAIN_DIR / "materials" / "render_piode_roof_pbr.py",
+}
+# caso sintetico → valori di N
+CASES = {
+    "beams": (50, 200, 800),
+    "openings": (4, 9, 16),
+    "materials": (2, 5, 10),
+}
+REGRESSION = 0.10
+MIN_DELTA_S = 0.05
+
+
+# ============================================================
+# CASI SINTETICI (dentro Blender)
+# ============================================================
+def _case_beams(n):
+    from homeforge import geometry as geo, instrument
+    import bpy
+    with instrument.phase("geometry"):
+        for i in range(n):
+            geo.make_box(f"Trave_{i:04d}", 0.22, 5.45, 0.26, location=(i * 0.5, 2.0, 3.5),
+                         rotation=(0.61, 0, 0), shared=True)
+    with instrument.phase("depsgraph"):
+        bpy.context.view_layer.update()
+
+
+def _case_openings(n):
+    """Muro 11 m con n aperture boolean EXACT applicate una a una (come OP-020..028)."""
+    from homeforge import geometry as geo, instrument
+    import bpy
+    wall = geo.make_box("Muro", 11.0, 0.45, 3.0, location=(5.5, 0.225, 1.5))
+    step = 11.0 / (n + 1)
+    with instrument.phase("geometry"):
+        cutters = [geo.make_box(f"Cut_{i:02d}", min(0.8, step * 0.6), 1.8, 1.2,
+                                location=((i + 1) * step, 0.225, 1.4)) for i in range(n)]
+    with instrument.phase("boolean"):
+        bpy.context.view_layer.objects.active = wall
+        for cutter in cutters:
+            mod = wall.modifiers.new(cutter.name, 'BOOLEAN')
+            mod.operation = 'DIFFERENCE'
+            mod.solver = 'EXACT'
+            mod.object = cutter
+            bpy.ops.object.modifier_apply(modifier=mod.name)
+            cutter.hide_render = True
+
+
+def _case_materials(n):
+    """n materiali PBR distinti sullo stesso set di texture (immagini condivise)."""
+    from homeforge import geometry as geo, instrument, materials as hfm
+    with instrument.phase("materials"):
+        mats = [hfm.preset_material("pietra_muro", name=f"Pietra_{i}", scale=(1.0 + i * 0.1,) * 3)
+                for i in range(n)]
+    with instrument.phase("geometry"):
+        for i, mat in enumerate(mats):
+            geo.make_box(f"Blocco_{i}", 1.0, 1.0, 1.0, location=(i * 1.2, 0, 0.5), material=mat)
+    with instrument.phase("images"):
+        instrument.load_images()
+
+
+def _render_probe():
+    """Render minimo (1 sample, 10%): misura sync scena + BVH del caso."""
+    import bpy
+    from homeforge import instrument
+    scene = bpy.context.scene
+    scene.render.engine = 'CYCLES'
+    scene.cycles.device = 'CPU'
+    scene.cycles.samples = 1
+    scene.cycles.seed = 0
+    scene.cycles.use_denoising = False
+    scene.render.resolution_percentage = 10
+    if scene.camera is None:
+        cam = bpy.data.objects.new("Camera", bpy.data.cameras.new("Camera"))
+        scene.collection.objects.link(cam)
+        cam.location, cam.rotation_euler = (5.0, -18.0, 3.0), (1.48, 0, 0)
+        scene.camera = cam
+    with instrument.render_phases():
+        bpy.ops.render.render(write_still=False)
+
+
+def run_case_in_blender(case, n):
+    from homeforge import instrument, scene_setup
+    scene_setup.new_scene(template=False)
+    {"beams": _case_beams, "openings": _case_openings, "materials": _case_materials}[case](n)
+    _render_probe()
+    instrument.finish(f"{case}:{n}", case=case, n=n)
+
+
+# ============================================================
+# DRIVER (fuori da Blender)
+# ============================================================
+def _run_blender(cmd, env_extra, timeout):
+    fd, out = tempfile.mkstemp(prefix="hf_phases_", suffix=".json")
+    os.close(fd)
+    env = dict(os.environ, HF_PHASES_JSON=out, HF_RUN_LOG="0", HF_RENDER_CACHE="0", **env_extra)
+    try:
+        proc = subprocess.run(cmd, env=env, capture_output=True, text=True, timeout=timeout)
+        data = json.loads(Path(out).read_text()) if Path(out).stat().st_size else None
+        # status FAILED: eccezione nello script (record scritto dall'excepthook di instrument)
+        if proc.returncode != 0 or data is None or data.get("status") != "SUCCESS":
+            tail = "\n".join((proc.stdout + proc.stderr).splitlines()[-15:])
+            status = data.get("status") if data else None
+            raise RuntimeError(f"{' '.join(map(str, cmd[:6]))}: exit {proc.returncode}, "
+                               f"status {status}\n{tail}")
+        return data
+    finally:
+        Path(out).unlink(missing_ok=True)
+
+
+def run_script(name, tier, seed, timeout=3600):
+    cmd = [BLENDER, "--background", "--python-exit-code", "1", "--python", str(SCRIPTS[name]),
+           "--", "--tier", tier]
+    return _run_blender(cmd, dict(HF_SEED=str(seed), HF_TIER=tier), timeout)
+
+
+def run_case(case, n, seed, timeout=3600):
+    cmd = [BLENDER, "--background", "--factory-startup", "--python-exit-code", "1",
+           "--python", str(SCRIPT), "--",
+           "--case", case, "--n", str(n)]
+    return _run_blender(cmd, dict(HF_SEED=str(seed)), timeout)
+
+
+def _median_phases(samples):
+    keys = list(dict.fromkeys(k for s in samples for k in s["phases"]))
+    return {k: statistics.median(s["phases"].get(k, 0.0) for s in samples) for k in keys}
+
+
+def run_suite(scripts, cases, tier="draft", seed=0, repeats=1):
+    """{chiave: {fasi mediane}} per script ('tetto') e casi ('beams:200')."""
+    results = {}
+    jobs = [(name, lambda name=name: run_script(name, tier, seed)) for name in scripts]
+    jobs += [(f"{case}:{n}", lambda case=case, n=n: run_case(case, n, seed))
+             for case in cases for n in CASES[case]]
+    blender_version = None
+    for key, job in jobs:
+        samples = []
+        for r in range(repeats):
+            print(f"  [{key}] run {r + 1}/{repeats}", flush=True)
+            samples.append(job())
+        blender_version = samples[-1].get("blender", blender_version)
+        results[key] = _median_phases(samples)
+    return results, blender_version
+
+
+# ============================================================
+# STORICO / BASELINE
+# ============================================================
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_record(results, tier, seed, repeats, blender_version):
+    return dict(timestamp=datetime.now().isoformat(timespec="seconds"),
+                commit=_git_commit(), host=socket.gethostname(), blender=blender_version,
+                tier=tier, seed=seed, repeats=repeats, results=results)
+
+
+def append_history(record, path=HISTORY_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    history = json.loads(path.read_text()) if path.exists() else []
+    history.append(record)
+    path.write_text(json.dumps(history, indent=2))
+
+
+def compare(results, baseline):
+    """Righe (chiave, fase, base, attuale, rapporto, regressione) per fasi in comune."""
+    rows = []
+    for key, phases in results.items():
+        base = baseline.get("results", {}).get(key)
+        if not base:
+            continue
+        for phase, now in phases.items():
+            if phase not in base:
+                continue
+            ref = base[phase]
+            ratio = now / ref if ref > 0 else float("inf")
+            rows.append((key, phase, ref, now, ratio,
+                         ratio > 1 + REGRESSION and now - ref > MIN_DELTA_S))
+    return rows
+
+
+def print_report(results, rows=None):
+    print("=" * 72)
+    for key, phases in results.items():
+        total = sum(phases.values())
+        print(f"{key}  (totale {total:.2f}s)")
+        for phase, seconds in phases.items():
+            print(f"  {phase:<22} {seconds:8.2f}s")
+    if rows:
+        print("-" * 72)
+        print("Confronto con baseline:")
+        for key, phase, ref, now, ratio, regressed in rows:
+            flag = "  REGRESSIONE" if regressed else ""
+            print(f"  {key:<16} {phase:<22} {ref:7.2f}s → {now:7.2f}s  {ratio:5.2f}×{flag}")
+    print("=" * 72)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — benchmark per fase")
+    ap.add_argument("--scripts", nargs="*", choices=sorted(SCRIPTS), default=None,
+                    help="script da misurare (default: tutti)")
+    ap.add_argument("--cases", nargs="*", choices=sorted(CASES), default=None,
+                    help="casi sintetici (default: tutti)")
+    ap.add_argument("--tier", default="draft")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeats", type=int, default=1)
+    ap.add_argument("--set-baseline", action="store_true")
+    ap.add_argument("--case", help=argparse.SUPPRESS)         # worker dentro Blender
+    ap.add_argument("--n", type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args(script_args() if argv is None else argv)
+
+    if args.case:
+        run_case_in_blender(args.case, args.n)
+        return
+
+    scripts = list(SCRIPTS) if args.scripts is None else args.scripts
+    cases = list(CASES) if args.cases is None else args.cases
+    results, version = run_suite(scripts, cases, args.tier, args.seed, args.repeats)
+    record = make_record(results, args.tier, args.seed, args.repeats, version)
+    append_history(record)
+
+    rows = None
+    if BASELINE_PATH.exists():
+        rows = compare(results, json.loads(BASELINE_PATH.read_text()))
+    print_report(results, rows)
+    if args.set_baseline:
+        BASELINE_PATH.write_text(json.dumps(record, indent=2))
+        print(f"Baseline aggiornata: {BASELINE_PATH}")
+    if rows and any(r[-1] for r in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+HomeForge AI — Esecuzione incrementale della chain L1 → L4
+"Cambi una decisione → rigiri solo i livelli toccati": ogni livello ha un
+insieme di input (knowledge, output del livello precedente, foto, texture);
+il loro hash viene salvato in chain/.chain_state.json quando il livello è
+completato. Un livello è da rifare solo se i suoi input sono cambiati (o
+l'output manca); i livelli a valle restano in attesa finché non lo è.
+
+L1–L3 sono scritti dagli agenti (agents/L*.md): il runner dice quale rifare e
+con quali input; l'agente, finito il suo file, lo registra con --done.
+L4 il runner lo esegue da sé (render daemon o Blender nuovo; senza
+L4_script.py interpreta direttamente L3 con homeforge/l3_exec.py) e lo
+registra se il render va a buon fine.
+
+Dentro L3 il confronto è per OP: ogni `### OP-xxx` ha il suo hash; cambiare
+una finestra sporca la sua OP di taglio più le OP che ne dipendono (il muro
+bersaglio, le altre aperture sullo stesso muro, le OP globali che seguono).
+Con l3_exec il runner salva la scena (chain/.l3_scene.blend) e, se dall'ultima
+esecuzione è cambiato solo L3, la riapre rieseguendo solo quelle OP + il render.
+
+    python chain/homeforge/chain_runner.py                  # piano (default)
+    python chain/homeforge/chain_runner.py --done L2        # L2 rigenerato dall'agente
+    python chain/homeforge/chain_runner.py --run --tier draft
+"""
+import os
+import sys
+import json
+import hashlib
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import CHAIN_DIR, PROJECT_DIR, file_hash, script_args
+from homeforge.quality import DEFAULT_TIER, ENV_VAR as TIER_ENV, tier_output
+from homeforge.l3_ops import L3_PATH, op_names, split_ops
+
+STATE_PATH = CHAIN_DIR / ".chain_state.json"
+
+# Input per livello (glob relativi alla root del progetto), come in agents/L*.md
+LEVELS = {
+    "L1": dict(agent="agents/L1_architect.md",
+               inputs=("knowledge/*.md", "references/*.md"),
+               outputs=("chain/L1_architect_decisions.md",)),
+    "L2": dict(agent="agents/L2_geometry.md",
+               inputs=("chain/L1_architect_decisions.md",),
+               outputs=("chain/L2_geometry_spec.md",)),
+    "L3": dict(agent="agents/L3_translator.md",
+               inputs=("chain/L2_geometry_spec.md", "references/06-render-blender.md"),
+               outputs=("chain/L3_blender_ops.md",)),
+    "L4": dict(agent="agents/L4_executor.md",
+               inputs=("chain/L3_blender_ops.md", "chain/L4_script.py", "chain/homeforge/*.py",
+                       "chain/materials/*.md", "chain/materials/textures/*.*", "photos/*.*"),
+               outputs=("output/render_model.png", "output/1_render.png")),
+}
+ORDER = tuple(LEVELS)
+L4_SCRIPT = CHAIN_DIR / "L4_script.py"
+L3_EXEC = CHAIN_DIR / "homeforge" / "l3_exec.py"     # senza L4_script: L3 interpretato direttamente
+L3_SCENE = CHAIN_DIR / ".l3_scene.blend"              # scena dell'ultimo l3_exec (--save-state)
+
+# Stati del piano
+UP_TO_DATE = "aggiornato"
+STALE = "da rifare"
+WAITING = "in attesa"
+
+
+# ============================================================
+# HASH INPUT
+# ============================================================
+def _files(patterns):
+    files = set()
+    for pattern in patterns:
+        files.update(p for p in PROJECT_DIR.glob(pattern) if p.is_file())
+    return sorted(files)
+
+
+def _rel(path):
+    return str(path.relative_to(PROJECT_DIR))
+
+
+def input_hashes(level):
+    """{percorso relativo: sha1} degli input presenti del livello."""
+    return {_rel(p): file_hash(p) for p in _files(LEVELS[level]["inputs"])}
+
+
+def _tier(tier=None):
+    return tier or os.environ.get(TIER_ENV) or DEFAULT_TIER
+
+
+def outputs(level, tier=None):
+    """Output attesi del livello; L4 per livello qualità (render_model_draft.png, ...)."""
+    if level != "L4":
+        return list(LEVELS[level]["outputs"])
+    return [str(Path(tier_output(out, _tier(tier)))) for out in LEVELS[level]["outputs"]]
+
+
+def state_key(level, tier=None):
+    """Chiave in state["levels"]: L4 registrato per livello qualità ("L4:draft")."""
+    return f"L4:{_tier(tier)}" if level == "L4" else level
+
+
+def output_hashes(level, tier=None):
+    return {out: file_hash(PROJECT_DIR / out) for out in outputs(level, tier)
+            if (PROJECT_DIR / out).exists()}
+
+
+def read_state(path=STATE_PATH):
+    return json.loads(path.read_text()) if path.exists() else {"levels": {}, "ops": {}}
+
+
+def write_state(state, path=STATE_PATH):
+    path.write_text(json.dumps(state, indent=2, sort_keys=True))
+
+
+def _diff(old, new):
+    """Chiavi aggiunte / tolte / cambiate tra due dict di hash."""
+    return sorted(k for k in set(old) | set(new) if old.get(k) != new.get(k))
+
+
+# ============================================================
+# OP DI L3
+# ============================================================
+def op_hashes(text):
+    return {op: hashlib.sha1(block.encode()).hexdigest() for op, block in split_ops(text).items()}
+
+
+def dirty_ops(text, old_hashes):
+    """OP da rieseguire: cambiate/nuove + chiusura sulle dipendenze.
+
+    - B usa un nome creato da A: A sporca → B sporca;
+    - B modifica (Target) un oggetto creato da A: B sporca → A sporca
+      (l'oggetto si ricostruisce da capo, quindi tutte le OP che lo usano);
+    - OP senza nomi (apply modifier, camera, render, ...) dipendono da tutto
+      ciò che le precede.
+    """
+    blocks = split_ops(text)
+    ids = list(blocks)
+    names = {op: op_names(block) for op, block in blocks.items()}
+    new_hashes = op_hashes(text)
+    dirty = {op for op in ids if old_hashes.get(op) != new_hashes[op]}
+    removed = set(old_hashes) - set(new_hashes)
+    producers = {}
+    for op in ids:
+        for name in names[op][0]:
+            producers.setdefault(name, op)
+
+    changed = True
+    while changed:
+        changed = False
+        for i, op in enumerate(ids):
+            if op in dirty:
+                continue
+            made, used, _ = names[op]
+            if (any(producers.get(n) in dirty for n in used)
+                    or (not made and not used and (removed or any(o in dirty for o in ids[:i])))
+                    or any(names[o][2] & made for o in dirty)):
+                dirty.add(op)
+                changed = True
+    return [op for op in ids if op in dirty]
+
+
+def incremental_ops(state, tier=None):
+    """OP di L3 da rieseguire sulla scena salvata (l3_exec --resume --only), o None
+    se serve un'esecuzione completa: scena assente o di un altro livello qualità,
+    input di L4 cambiati oltre a L3, OP di reset scena (la prima) sporca."""
+    scene = state.get("scene")
+    if not L3_SCENE.exists() or not L3_PATH.exists() or not state.get("ops") or not scene:
+        return None
+    if scene.get("tier") != _tier(tier):
+        return None
+    changed = _diff(scene["inputs"], input_hashes("L4"))
+    if changed and changed != [_rel(L3_PATH)]:
+        return None
+    text = L3_PATH.read_text()
+    ids = list(split_ops(text))
+    dirty = dirty_ops(text, state["ops"])
+    if not ids or ids[0] in dirty:
+        return None
+    return dirty
+
+
+# ============================================================
+# PIANO
+# ============================================================
+def level_status(level, state, tier=None):
+    """(stato, motivi) di un livello rispetto all'ultimo completamento registrato
+    (L4: per il livello qualità, default $HF_TIER o final)."""
+    done = state["levels"].get(state_key(level, tier))
+    if done is None and level == "L4" and _tier(tier) == "final":
+        done = state["levels"].get("L4")                 # stato scritto prima dei livelli qualità
+    if not all((PROJECT_DIR / out).exists() for out in outputs(level, tier)):
+        return STALE, ["output mancante"]
+    if done is None:
+        return STALE, ["mai registrato"]
+    reasons = [f"input cambiato: {p}" for p in _diff(done["inputs"], input_hashes(level))]
+    return (STALE if reasons else UP_TO_DATE), reasons
+
+
+def plan(state=None, tier=None):
+    """[{level, status, reasons, agent}] in ordine; a valle di un livello da rifare → in attesa."""
+    state = read_state() if state is None else state
+    rows, blocked = [], False
+    for level in ORDER:
+        status, reasons = level_status(level, state, tier)
+        if blocked:
+            status, reasons = WAITING, [f"dopo {rows[-1]['level']}"] + reasons
+        rows.append(dict(level=level, status=status, reasons=reasons, agent=LEVELS[level]["agent"]))
+        blocked = blocked or status != UP_TO_DATE
+    return rows
+
+
+def mark_done(level, state=None, path=STATE_PATH, tier=None):
+    """Registra il livello come completato con gli input attuali (L4: per livello qualità)."""
+    state = read_state(path) if state is None else state
+    state["levels"][state_key(level, tier)] = dict(
+        inputs=input_hashes(level), outputs=output_hashes(level, tier),
+        at=datetime.now().astimezone().isoformat(timespec="seconds"))
+    if level == "L4" and L3_PATH.exists():
+        state["ops"] = op_hashes(L3_PATH.read_text())
+    write_state(state, path)
+    return state
+
+
+def print_plan(rows, state):
+    print("=" * 60)
+    for row in rows:
+        print(f"  {row['level']}  {row['status']:<11} {row['agent']}")
+        for reason in row["reasons"][:8]:
+            print(f"        - {reason}")
+        if len(row["reasons"]) > 8:
+            print(f"        - ... altri {len(row['reasons']) - 8}")
+    if L3_PATH.exists() and state.get("ops"):
+        ops = dirty_ops(L3_PATH.read_text(), state["ops"])
+        print(f"  OP di L3 da rieseguire: {', '.join(ops) if ops else 'nessuna'}")
+    print("=" * 60)
+
+
+# ============================================================
+# ESECUZIONE L4
+# ============================================================
+def run_l4(tier=None, force=False, state=None):
+    """Esegue L4 se è da rifare (e L1–L3 sono aggiornati).
+
+    L4_script.py se esiste (prima passato da l4_lint: con errori non parte),
+    altrimenti l3_exec.py che interpreta L3_blender_ops.md: se solo L3 è cambiato
+    riapre la scena salvata e riesegue le OP di dirty_ops (incremental_ops).
+    """
+    state = read_state() if state is None else state
+    rows = {row["level"]: row for row in plan(state, tier)}
+    row = rows["L4"]
+    if row["status"] == WAITING and not force:
+        print(f"L4 in attesa: prima {row['reasons'][0]}")
+        return None
+    if row["status"] == UP_TO_DATE and not force:
+        print("L4 aggiornato: niente da renderizzare")
+        return None
+    script = L4_SCRIPT if L4_SCRIPT.exists() else L3_EXEC
+    print(f"L4: {_rel(script)}")
+    if script == L4_SCRIPT:
+        from homeforge import l4_lint           # API 5.0 e anti-pattern: niente Blender se fallisce
+        findings = l4_lint.lint(script)
+        if l4_lint.errors(findings):
+            l4_lint.print_report(script, findings)
+            return dict(event="error", message=f"lint: {len(l4_lint.errors(findings))} errori",
+                        findings=findings)
+    args = []
+    if script == L3_EXEC:
+        args = ["--save-state", str(L3_SCENE)]
+        only = incremental_ops(state, tier)
+        if only is not None:
+            print(f"L4 incrementale: OP {', '.join(only) or 'nessuna'} + render")
+            args += ["--resume", str(L3_SCENE), "--only", ",".join(only)]
+    from homeforge import render_daemon
+    event = render_daemon.submit(script, tier=tier, args=args, output=outputs("L4", tier)[0])
+    # STOPPED (render fermato dall'hook progressive): solo checkpoint, L4 non è completo
+    if event.get("event") == "done" and event.get("record", {}).get("status", "SUCCESS") == "SUCCESS":
+        if script == L3_EXEC:
+            state["scene"] = dict(tier=_tier(tier), inputs=input_hashes("L4"))
+        else:
+            state.pop("scene", None)             # L3_SCENE non corrisponde più all'ultimo L4
+        mark_done("L4", state, tier=tier)
+    return event
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — chain incrementale L1 → L4")
+    ap.add_argument("--done", choices=ORDER + ("all",), action="append", default=[],
+                    help="registra il livello come rigenerato (ripetibile; all = stato attuale)")
+    ap.add_argument("--run", action="store_true", help="esegui L4 se da rifare")
+    ap.add_argument("--force", action="store_true", help="con --run: esegui comunque")
+    ap.add_argument("--tier", choices=("draft", "preview", "final"))
+    ap.add_argument("--json", action="store_true", help="piano in JSON")
+    args = ap.parse_args(script_args() if argv is None else argv)
+
+    state = read_state()
+    for level in (ORDER if "all" in args.done else args.done):
+        state = mark_done(level, state, tier=args.tier)
+        print(f"{level} registrato")
+    if args.run:
+        run_l4(args.tier, args.force, state)
+        state = read_state()
+    rows = plan(state, args.tier)
+    if args.json:
+        ops = dirty_ops(L3_PATH.read_text(), state["ops"]) if L3_PATH.exists() and state.get("ops") else None
+        print(json.dumps(dict(levels=rows, dirty_ops=ops), indent=2))
+    else:
+        print_plan(rows, state)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+HomeForge AI — Compositing vettoriale (fotoinserimento)
+Alpha over del render modello (RGBA, film_transparent) sulla foto del sito,
+con buffer NumPy float32 letti/scritti via foreach_get/foreach_set.
+Sostituisce il loop per-pixel di composite_on_photo() (L4_executor.md / SKILL.md):
+nessuna copia list(img.pixels), nessuna operazione Python per pixel.
+
+Uso da riga di comando:
+    blender --background --python chain/homeforge/compositing.py -- \
+        --model output/render_model.png --photos photos/ --out output/
+    blender --background --python chain/homeforge/compositing.py -- \
+        --model output/render_model.png --photos photos/site_photo.jpg --benchmark
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import bpy
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import PHOTOS_DIR, OUTPUT_DIR, script_args
+from homeforge import instrument
+
+PHOTO_EXT = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".exr")
+
+
+# ============================================================
+# PIXEL I/O
+# ============================================================
+def read_pixels(img):
+    """Pixel di un'immagine Blender come array float32 (h, w, 4)."""
+    w, h = img.size
+    buf = np.empty(w * h * 4, dtype=np.float32)
+    img.pixels.foreach_get(buf)
+    return buf.reshape(h, w, 4)
+
+
+def write_pixels(img, arr):
+    """Scrive un array (h, w, 4) float32 nei pixel dell'immagine."""
+    img.pixels.foreach_set(np.ascontiguousarray(arr, dtype=np.float32).ravel())
+    img.update()
+
+
+def load_image(path, name=None):
+    """Carica un'immagine senza riusare un datablock esistente con lo stesso path."""
+    img = bpy.data.images.load(str(path), check_existing=False)
+    if name:
+        img.name = name
+    return img
+
+
+def save_png(arr, output_path, name="Composite"):
+    """Salva un array (h, w, 4) come PNG e libera il datablock temporaneo."""
+    h, w = arr.shape[:2]
+    result = bpy.data.images.new(name, width=w, height=h, alpha=True)
+    write_pixels(result, arr)
+    result.filepath_raw = str(output_path)
+    result.file_format = 'PNG'
+    result.save()
+    bpy.data.images.remove(result)
+    return str(output_path)
+
+
+# ============================================================
+# ALPHA OVER
+# ============================================================
+def alpha_over(fg, bg, premultiplied=False, out=None):
+    """Alpha over a array interi: fg (h, w, 4) sopra bg (h, w, 3|4).
+
+    premultiplied=False: fg RGB non premoltiplicato (PNG salvato da Cycles),
+    viene premoltiplicato qui. Il risultato è opaco (alpha = 1).
+    """
+    h, w = fg.shape[:2]
+    if out is None:
+        out = np.empty((h, w, 4), dtype=np.float32)
+    alpha = fg[..., 3:4]
+    # out = bg * (1 - a)
+    np.subtract(1.0, alpha, out=out[..., 3:4])
+    np.multiply(bg[..., :3], out[..., 3:4], out=out[..., :3])
+    # out += fg * a  (oppure fg se già premoltiplicato)
+    if premultiplied:
+        out[..., :3] += fg[..., :3]
+    else:
+        out[..., :3] += fg[..., :3] * alpha
+    out[..., 3] = 1.0
+    return out
+
+
+# ============================================================
+# COMPOSITING
+# ============================================================
+def _model_for_size(model_img, size, cache):
+    """Pixel del modello alla risoluzione della foto (scalati una volta per size)."""
+    size = tuple(size)
+    if size not in cache:
+        if tuple(model_img.size) == size:
+            cache[size] = read_pixels(model_img)
+        else:
+            scaled = model_img.copy()
+            scaled.scale(*size)
+            cache[size] = read_pixels(scaled)
+            bpy.data.images.remove(scaled)
+    return cache[size]
+
+
+def composite_on_photo(model_path, photo_path, output_path, premultiplied=False):
+    """Alpha over: modello RGBA su foto RGB. Stessa firma della versione L4."""
+    return composite_batch(model_path, [photo_path], outputs=[output_path],
+                           premultiplied=premultiplied)[0]
+
+
+@instrument.span("compositing")
+def composite_batch(model_path, photo_paths, output_dir=None, outputs=None,
+                    premultiplied=False):
+    """Un render modello su N foto del sito. Il modello viene letto una sola
+    volta e riscalato una volta per ogni risoluzione di foto diversa.
+
+    outputs: path espliciti (uno per foto); altrimenti output_dir/<foto>_composite.png
+    """
+    photo_paths = [Path(p) for p in photo_paths]
+    if outputs is None:
+        output_dir = Path(output_dir or OUTPUT_DIR)
+        outputs = [output_dir / f"{p.stem}_composite.png" for p in photo_paths]
+    if len(outputs) != len(photo_paths):
+        raise ValueError("outputs e photo_paths devono avere la stessa lunghezza")
+
+    model = load_image(model_path, "Comp_Model")
+    cache = {}
+    written = []
+    try:
+        for photo_path, output_path in zip(photo_paths, outputs):
+            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            foto = load_image(photo_path, "Comp_Foto")
+            try:
+                bg = read_pixels(foto)
+                fg = _model_for_size(model, foto.size, cache)
+                res = alpha_over(fg, bg, premultiplied=premultiplied)
+                written.append(save_png(res, output_path))
+            finally:
+                bpy.data.images.remove(foto)
+            print(f"  Composite: {Path(photo_path).name} → {output_path}")
+    finally:
+        bpy.data.images.remove(model)
+    return written
+
+
+def site_photos(photos_dir=PHOTOS_DIR):
+    """Foto del sito in photos/ (ordinate per nome)."""
+    return sorted(p for p in Path(photos_dir).iterdir()
+                  if p.suffix.lower() in PHOTO_EXT)
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+def _composite_loop_reference(model_path, photo_path):
+    """Versione originale per-pixel (L4_executor.md), solo per il benchmark."""
+    foto = load_image(photo_path)
+    model = load_image(model_path)
+    fw, fh = foto.size
+    if tuple(model.size) != (fw, fh):
+        model.scale(fw, fh)
+    foto_px = list(foto.pixels)
+    mod_px = list(model.pixels)
+    res = [0.0] * (fw * fh * 4)
+    for i in range(fw * fh):
+        idx = i * 4
+        a = mod_px[idx + 3]
+        res[idx] = mod_px[idx] * a + foto_px[idx] * (1 - a)
+        res[idx + 1] = mod_px[idx + 1] * a + foto_px[idx + 1] * (1 - a)
+        res[idx + 2] = mod_px[idx + 2] * a + foto_px[idx + 2] * (1 - a)
+        res[idx + 3] = 1.0
+    bpy.data.images.remove(foto)
+    bpy.data.images.remove(model)
+    return np.asarray(res, dtype=np.float32).reshape(fh, fw, 4)
+
+
+def benchmark(model_path, photo_path, repeats=3, skip_loop=False):
+    """Confronta loop per-pixel e versione NumPy sulla stessa coppia di immagini."""
+    foto = load_image(photo_path)
+    model = load_image(model_path)
+    bg = read_pixels(foto)
+    fg = _model_for_size(model, foto.size, {})
+    bpy.data.images.remove(foto)
+    bpy.data.images.remove(model)
+
+    out = np.empty_like(fg)
+    t_np = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        alpha_over(fg, bg, out=out)
+        t_np.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    composite_on_photo(model_path, photo_path, OUTPUT_DIR / "_bench_composite.png")
+    t_full = time.perf_counter() - t0
+    (OUTPUT_DIR / "_bench_composite.png").unlink(missing_ok=True)
+
+    h, w = bg.shape[:2]
+    print("=" * 60)
+    print(f"Benchmark compositing {w}×{h}")
+    print(f"  NumPy alpha_over (best of {repeats}): {min(t_np) * 1000:.1f} ms")
+    print(f"  NumPy end-to-end (load+blend+save):  {t_full:.2f} s")
+    result = {"width": w, "height": h, "numpy_ms": min(t_np) * 1000,
+              "numpy_total_s": t_full}
+    if not skip_loop:
+        t0 = time.perf_counter()
+        ref = _composite_loop_reference(model_path, photo_path)
+        t_loop = time.perf_counter() - t0
+        diff = float(np.abs(ref - out).max())
+        print(f"  Loop per-pixel end-to-end:           {t_loop:.2f} s")
+        print(f"  Speedup end-to-end: {t_loop / t_full:.1f}×  (max diff {diff:.2e})")
+        result.update(loop_total_s=t_loop, max_abs_diff=diff)
+    print("=" * 60)
+    return result
+
+
+# ============================================================
+# MAIN
+# ============================================================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — compositing NumPy")
+    ap.add_argument("--model", default=str(OUTPUT_DIR / "render_model.png"))
+    ap.add_argument("--photos", default=str(PHOTOS_DIR),
+                    help="foto singola o cartella (default: photos/)")
+    ap.add_argument("--out", default=str(OUTPUT_DIR), help="cartella output")
+    ap.add_argument("--premultiplied", action="store_true")
+    ap.add_argument("--benchmark", action="store_true")
+    ap.add_argument("--repeats", type=int, default=3)
+    ap.add_argument("--skip-loop", action="store_true",
+                    help="benchmark senza il loop per-pixel (lento)")
+    args = ap.parse_args(script_args() if argv is None else argv)
+
+    photos = Path(args.photos)
+    photo_list = site_photos(photos) if photos.is_dir() else [photos]
+    if not photo_list:
+        raise FileNotFoundError(f"Nessuna foto in {photos}")
+
+    if args.benchmark:
+        benchmark(args.model, photo_list[0], repeats=args.repeats,
+                  skip_loop=args.skip_loop)
+        return
+
+    t0 = time.perf_counter()
+    composite_batch(args.model, photo_list, output_dir=args.out,
+                    premultiplied=args.premultiplied)
+    print(f"Compositing: {len(photo_list)} foto in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+HomeForge AI — Geometria senza operatori
+Box, cilindri e profili estrusi creati direttamente con Mesh.from_pydata o
+foreach_set: nessun bpy.ops.mesh.primitive_* / transform_apply, quindi nessun
+update del depsgraph per ogni elemento.
+
+Elementi ripetuti (puntoni, staffe, travi gronda) condividono UN datablock mesh:
+shared=True → istanze linkate, memoria e sync scena costanti al crescere di N.
+
+Benchmark (tetto sintetico con 500 travi, operatori vs builder):
+    blender --background --python chain/homeforge/geometry.py -- --benchmark --beams 500
+"""
+import sys
+import math
+import time
+import argparse
+from pathlib import Path
+
+import bpy
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import id_alive, script_args
+
+# chiave geometria → Mesh condivisa
+_SHARED_MESHES = {}
+
+# Facce del box (normali verso l'esterno), vertici indicizzati come _box_verts
+BOX_FACES = [(0, 3, 2, 1), (4, 5, 6, 7), (0, 1, 5, 4),
+             (1, 2, 6, 5), (2, 3, 7, 6), (3, 0, 4, 7)]
+
+
+# ============================================================
+# MESH DATA
+# ============================================================
+def _box_verts(w, d, h, center=(0.0, 0.0, 0.0)):
+    cx, cy, cz = center
+    x, y, z = w / 2, d / 2, h / 2
+    return [(cx - x, cy - y, cz - z), (cx + x, cy - y, cz - z),
+            (cx + x, cy + y, cz - z), (cx - x, cy + y, cz - z),
+            (cx - x, cy - y, cz + z), (cx + x, cy - y, cz + z),
+            (cx + x, cy + y, cz + z), (cx - x, cy + y, cz + z)]
+
+
+def _new_mesh(name, verts, faces, material=None):
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(verts, [], faces)
+    mesh.update()
+    if material is not None:
+        mesh.materials.append(material)
+    return mesh
+
+
+def box_data(w, d, h):
+    """(verts, faces) di un box w × d × h centrato nell'origine."""
+    if min(w, d, h) <= 0:
+        raise ValueError(f"dimensioni box non valide ({w}, {d}, {h})")
+    return _box_verts(w, d, h), list(BOX_FACES)
+
+
+def plane_data(size_x, size_y):
+    x, y = size_x / 2, size_y / 2
+    return [(-x, -y, 0), (x, -y, 0), (x, y, 0), (-x, y, 0)], [(0, 1, 2, 3)]
+
+
+def cylinder_data(radius, depth, segments=32):
+    """(verts, faces) di un cilindro lungo Z centrato nell'origine."""
+    verts = []
+    for z in (-depth / 2, depth / 2):
+        for i in range(segments):
+            a = 2 * math.pi * i / segments
+            verts.append((radius * math.cos(a), radius * math.sin(a), z))
+    faces = [(i, (i + 1) % segments, segments + (i + 1) % segments, segments + i)
+             for i in range(segments)]
+    faces.append(tuple(range(segments, 2 * segments)))          # tappo superiore
+    faces.append(tuple(reversed(range(segments))))              # tappo inferiore
+    return verts, faces
+
+
+def profile_data(profile, length, caps=True):
+    """(verts, faces) di un profilo 2D (y, z) estruso lungo X da 0 a length."""
+    n = len(profile)
+    verts = [(0.0, y, z) for y, z in profile] + [(length, y, z) for y, z in profile]
+    faces = [(j, j + 1, n + j + 1, n + j) for j in range(n - 1)]
+    if caps:
+        faces.append(tuple(range(n)))
+        faces.append(tuple(reversed(range(n, 2 * n))))
+    return verts, faces
+
+
+def box_mesh(name, w, d, h, material=None):
+    """Mesh box w × d × h centrata nell'origine (come primitive_cube_add + scale applicata)."""
+    if min(w, d, h) <= 0:
+        raise ValueError(f"{name}: dimensioni box non valide ({w}, {d}, {h})")
+    return _new_mesh(name, *box_data(w, d, h), material)
+
+
+def plane_mesh(name, size_x, size_y, material=None):
+    """Piano orizzontale size_x × size_y centrato nell'origine."""
+    return _new_mesh(name, *plane_data(size_x, size_y), material)
+
+
+def cylinder_mesh(name, radius, depth, segments=32, material=None):
+    """Cilindro lungo Z centrato nell'origine (come primitive_cylinder_add)."""
+    return _new_mesh(name, *cylinder_data(radius, depth, segments), material)
+
+
+def profile_mesh(name, profile, length, caps=True, material=None):
+    """Estrude un profilo 2D (y, z) lungo X da 0 a length (grondaie, scossaline)."""
+    return _new_mesh(name, *profile_data(profile, length, caps), material)
+
+
+def mesh_from_arrays(name, verts, faces, loop_totals=None, material_indices=None,
+                     materials=(), point_vectors=None):
+    """Mesh da array NumPy via foreach_set (migliaia di facce senza liste Python).
+
+    verts: (V, 3) float; faces: (F, k) int (tutte k-gon) oppure indici piatti
+    con loop_totals (F,) per poligoni di lunghezza variabile.
+    point_vectors: {nome: (V, 3)} → attributi FLOAT_VECTOR sui vertici.
+    """
+    verts = np.asarray(verts, dtype=np.float32).reshape(-1, 3)
+    faces = np.asarray(faces, dtype=np.int32)
+    if loop_totals is None:
+        loop_totals = np.full(len(faces), faces.shape[1], dtype=np.int32)
+    loop_totals = np.asarray(loop_totals, dtype=np.int32)
+    loop_starts = np.zeros(len(loop_totals), dtype=np.int32)
+    np.cumsum(loop_totals[:-1], out=loop_starts[1:])
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(verts))
+    mesh.vertices.foreach_set("co", verts.ravel())
+    mesh.loops.add(int(loop_totals.sum()))
+    mesh.loops.foreach_set("vertex_index", faces.ravel())
+    mesh.polygons.add(len(loop_totals))
+    mesh.polygons.foreach_set("loop_start", loop_starts)
+    for mat in materials:
+        mesh.materials.append(mat)
+    if material_indices is not None:
+        mesh.polygons.foreach_set("material_index",
+                                  np.asarray(material_indices, dtype=np.int32))
+    for attr_name, values in (point_vectors or {}).items():
+        attr = mesh.attributes.new(attr_name, 'FLOAT_VECTOR', 'POINT')
+        attr.data.foreach_set("vector", np.asarray(values, dtype=np.float32).ravel())
+    mesh.update(calc_edges=True)
+    mesh.validate()
+    return mesh
+
+
+def custom_mesh(name, verts, faces=(), material=None, smooth=False):
+    """Mesh da vertici + facce di lunghezza qualsiasi (tetti, timpani L3).
+    Senza facce: inviluppo convesso dei vertici (bmesh)."""
+    if not faces:
+        import bmesh
+        bm = bmesh.new()
+        for co in verts:
+            bm.verts.new(co)
+        bmesh.ops.convex_hull(bm, input=bm.verts)
+        mesh = bpy.data.meshes.new(name)
+        bm.to_mesh(mesh)
+        bm.free()
+        if material is not None:
+            mesh.materials.append(material)
+    else:
+        mesh = mesh_from_arrays(name, verts, [i for f in faces for i in f],
+                                loop_totals=[len(f) for f in faces],
+                                materials=[material] if material is not None else ())
+    if smooth:
+        mesh.shade_smooth()
+    return mesh
+
+
+def shared_mesh(key, factory):
+    """Mesh condivisa per chiave geometrica: factory() viene chiamata una volta."""
+    mesh = _SHARED_MESHES.get(key)
+    if mesh is None or not id_alive(mesh):
+        mesh = factory()
+        _SHARED_MESHES[key] = mesh
+    return mesh
+
+
+def clear_shared():
+    _SHARED_MESHES.clear()
+
+
+# ============================================================
+# OGGETTI
+# ============================================================
+def make_object(name, mesh, location=(0, 0, 0), rotation=(0, 0, 0), collection=None):
+    """Oggetto da mesh esistente, linkato alla collection (default: quella attiva,
+    come fanno gli operatori primitive_*)."""
+    obj = bpy.data.objects.new(name, mesh)
+    obj.location = location
+    obj.rotation_euler = rotation
+    (collection or bpy.context.collection).objects.link(obj)
+    return obj
+
+
+def make_box(name, w, d, h, location=(0, 0, 0), rotation=(0, 0, 0),
+             material=None, shared=False, collection=None):
+    """Box w × d × h. shared=True riusa la mesh di box identici (stesse dim. e materiale)."""
+    if shared:
+        key = ("box", round(w, 6), round(d, 6), round(h, 6),
+               material.name if material else None)
+        mesh = shared_mesh(key, lambda: box_mesh(f"{name}_mesh", w, d, h, material))
+    else:
+        mesh = box_mesh(f"{name}_mesh", w, d, h, material)
+    return make_object(name, mesh, location, rotation, collection)
+
+
+def make_plane(name, size_x, size_y=None, location=(0, 0, 0), material=None,
+               collection=None):
+    mesh = plane_mesh(f"{name}_mesh", size_x, size_y or size_x, material)
+    return make_object(name, mesh, location, (0, 0, 0), collection)
+
+
+def make_cylinder(name, radius, depth, location=(0, 0, 0), rotation=(0, 0, 0),
+                  material=None, segments=32, shared=False, collection=None):
+    if shared:
+        key = ("cyl", round(radius, 6), round(depth, 6), segments,
+               material.name if material else None)
+        mesh = shared_mesh(key, lambda: cylinder_mesh(f"{name}_mesh", radius, depth,
+                                                      segments, material))
+    else:
+        mesh = cylinder_mesh(f"{name}_mesh", radius, depth, segments, material)
+    return make_object(name, mesh, location, rotation, collection)
+
+
+def make_profile(name, profile, length, location=(0, 0, 0), rotation=(0, 0, 0),
+                 material=None, caps=True, collection=None):
+    mesh = profile_mesh(f"{name}_mesh", profile, length, caps, material)
+    return make_object(name, mesh, location, rotation, collection)
+
+
+def semicircle_profile(radius, segments=16):
+    """Profilo grondaia semicircolare aperto verso l'alto."""
+    return [(radius * math.cos(math.pi * j / segments),
+             -radius * math.sin(math.pi * j / segments)) for j in range(segments + 1)]
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+def _beam_transforms(n, spacing=0.5, length=5.45, angle=math.radians(35), base_z=2.5):
+    for i in range(n):
+        mid = length / 2 - 0.45
+        yield (f"Trave_{i:03d}", (i * spacing, mid * math.cos(angle),
+                                  base_z + mid * math.sin(angle)), (angle, 0, 0))
+
+
+def _clear_objects():
+    bpy.data.batch_remove(list(bpy.data.objects))
+    bpy.data.batch_remove([m for m in bpy.data.meshes if m.users == 0])
+    clear_shared()
+
+
+def _build_with_ops(n, dims):
+    for name, loc, rot in _beam_transforms(n):
+        bpy.ops.mesh.primitive_cube_add(size=1.0)
+        obj = bpy.context.active_object
+        obj.name = name
+        obj.scale = dims
+        bpy.ops.object.transform_apply(scale=True)
+        obj.location = loc
+        obj.rotation_euler = rot
+
+
+def _build_with_builder(n, dims, shared):
+    for name, loc, rot in _beam_transforms(n):
+        make_box(name, *dims, location=loc, rotation=rot, shared=shared)
+
+
+def benchmark(n_beams=500, dims=(0.22, 5.45, 0.26)):
+    """Tempi di costruzione di un tetto sintetico con n_beams puntoni."""
+    results = {}
+    for label, build in (("operatori", lambda: _build_with_ops(n_beams, dims)),
+                         ("builder (mesh uniche)", lambda: _build_with_builder(n_beams, dims, False)),
+                         ("builder (mesh condivisa)", lambda: _build_with_builder(n_beams, dims, True))):
+        _clear_objects()
+        t0 = time.perf_counter()
+        build()
+        bpy.context.view_layer.update()
+        results[label] = time.perf_counter() - t0
+        results[label + " mesh"] = len(bpy.data.meshes)
+    _clear_objects()
+
+    base = results["operatori"]
+    print("=" * 60)
+    print(f"Benchmark geometria: {n_beams} travi")
+    for label in ("operatori", "builder (mesh uniche)", "builder (mesh condivisa)"):
+        t = results[label]
+        print(f"  {label:<26} {t:8.3f}s  {base / t:6.1f}×  "
+              f"mesh datablock: {results[label + ' mesh']}")
+    print("=" * 60)
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — geometry builder")
+    ap.add_argument("--benchmark", action="store_true")
+    ap.add_argument("--beams", type=int, default=500)
+    args = ap.parse_args(script_args() if argv is None else argv)
+    if args.benchmark:
+        benchmark(args.beams)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,472 @@
+"""
+HomeForge AI — Strumentazione degli script della chain
+Span (context manager o decoratore) sulle fasi calde — materiali, geometria,
+modifier, render, compositing — con tempo, RSS e picco RSS del processo. Il
+render viene diviso in sync scena + BVH, path tracing, denoise e scrittura file
+con gli handler render_stats / render_post / render_write di Cycles, dalle cui
+statistiche si leggono anche memoria di picco e samples.
+
+    from homeforge import instrument
+    with instrument.span("materials"):
+        mats = hflib.load_materials([...])
+    with instrument.span("images"):
+        instrument.load_images()            # decodifica esplicita (altrimenti nel sync)
+
+    @instrument.span("compositing")
+    def composite_batch(...): ...
+
+    with instrument.render_phases():
+        bpy.ops.render.render(write_still=True)
+    instrument.finish("L4_script.py", output=OUTPUT)
+
+Negli script lineari (senza blocchi `with`): instrument.mark("geometry") chiude
+la fase in corso e apre la successiva.
+
+finish() aggiunge un record a chain/L4_runs.jsonl (fasi, span, statistiche
+Cycles, oggetti/triangoli/texture, warning, errori) e rigenera
+chain/L4_execution_log.md con la tabella dei trend: le regressioni tra
+un'iterazione e l'altra si vedono senza scrivere il log a mano. Un'eccezione
+non gestita produce un record FAILED. HF_RUN_LOG=0 disattiva il log (bench.py);
+con $HF_PHASES_JSON il record viene scritto anche lì.
+"""
+import os
+import re
+import sys
+import json
+import time
+import warnings
+import functools
+import traceback
+from datetime import datetime
+from pathlib import Path
+from contextlib import contextmanager
+
+import bpy
+
+from homeforge import CHAIN_DIR, PROJECT_DIR
+
+try:
+    import resource
+except ImportError:          # Windows
+    resource = None
+
+PHASES_ENV = "HF_PHASES_JSON"
+RUN_LOG_ENV = "HF_RUN_LOG"
+RUNS_PATH = CHAIN_DIR / "L4_runs.jsonl"
+EXECUTION_LOG = CHAIN_DIR / "L4_execution_log.md"
+LOG_RUNS = 30                # run con sezione di dettaglio nel markdown (il trend le ha tutte)
+
+# nome fase → secondi (fasi ripetute si sommano), in ordine di prima apertura
+_PHASES = {}
+# span chiusi: {name, s, rss_mb, peak_rss_mb}
+_SPANS = []
+# statistiche Cycles di ogni render
+_RENDERS = []
+_WARNINGS = []
+_ERRORS = []
+# fase aperta da mark(): (nome, t0)
+_OPEN = None
+# span aperti: uno span annidato con lo stesso nome non viene contato due volte
+_ACTIVE = set()
+_HOOKED = False
+
+
+def reset():
+    global _OPEN
+    for lst in (_SPANS, _RENDERS, _WARNINGS, _ERRORS):
+        lst.clear()
+    _PHASES.clear()
+    _ACTIVE.clear()
+    _OPEN = None
+
+
+# ============================================================
+# MEMORIA
+# ============================================================
+def rss_mb():
+    """RSS corrente del processo in MB (0 se /proc non è disponibile)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+
+def peak_rss_mb():
+    """Picco RSS del processo dall'avvio in MB."""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+# ============================================================
+# SPAN
+# ============================================================
+def record(name, seconds):
+    _PHASES[name] = _PHASES.get(name, 0.0) + seconds
+
+
+def _close(name, t0):
+    seconds = time.perf_counter() - t0
+    record(name, seconds)
+    _SPANS.append(dict(name=name, s=round(seconds, 4), rss_mb=round(rss_mb(), 1),
+                       peak_rss_mb=round(peak_rss_mb(), 1)))
+
+
+class span:
+    """Fase misurata: context manager (`with span("x")`) o decoratore (`@span("x")`)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.t0 = None
+        self.counted = False
+
+    def __enter__(self):
+        _install_hooks()
+        self.counted = self.name not in _ACTIVE
+        _ACTIVE.add(self.name)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.counted:
+            _ACTIVE.discard(self.name)
+            _close(self.name, self.t0)
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(self.name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+phase = span
+
+
+def mark(name):
+    """Chiude la fase aperta da mark() e apre `name` (None: chiude e basta)."""
+    global _OPEN
+    _install_hooks()
+    if _OPEN is not None:
+        _close(*_OPEN)
+    _OPEN = (name, time.perf_counter()) if name else None
+
+
+def phases():
+    return dict(_PHASES)
+
+
+def warn(message):
+    """Warning per il log della run (es. modifier non applicato, texture mancante)."""
+    _WARNINGS.append(str(message))
+    print(f"  WARN: {message}")
+
+
+def error(message):
+    _ERRORS.append(str(message))
+    print(f"  ERROR: {message}")
+
+
+def load_images():
+    """Decodifica le immagini non ancora caricate (Cycles riusa gli stessi buffer)."""
+    for img in bpy.data.images:
+        if img.source == 'FILE' and not img.has_data:
+            img.size[0]
+
+
+# ============================================================
+# RENDER
+# ============================================================
+_RE_PEAK = re.compile(r"Peak[: ]\s*([\d.]+)M")
+_RE_TIME = re.compile(r"Time:(?:(\d+):)?(\d+):([\d.]+)")
+_RE_SAMPLE = re.compile(r"Sample (\d+)/(\d+)")
+
+
+class _RenderClock:
+    """Tempi di transizione e statistiche dagli stati di Cycles (render_stats)."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.first_sample = None
+        self.denoise = None
+        self.last_stats = None
+        self.post = None
+        self.written = None
+        self.peak_mem_mb = 0.0
+        self.cycles_time_s = None
+        self.samples = None
+
+    def on_stats(self, stats, *_):
+        now = time.perf_counter()
+        stats = str(stats)
+        if self.first_sample is None and "Sample" in stats:
+            self.first_sample = now
+        if self.denoise is None and "Denois" in stats:
+            self.denoise = now
+        self.last_stats = now
+        for peak in _RE_PEAK.findall(stats):
+            self.peak_mem_mb = max(self.peak_mem_mb, float(peak))
+        m = _RE_TIME.search(stats)
+        if m:
+            h, mnt, sec = m.groups()
+            self.cycles_time_s = int(h or 0) * 3600 + int(mnt) * 60 + float(sec)
+        m = _RE_SAMPLE.search(stats)
+        if m:
+            self.samples = int(m.group(1))
+
+    def on_post(self, *_):
+        self.post = time.perf_counter()
+
+    def on_write(self, *_):
+        self.written = time.perf_counter()
+
+    def split(self, end):
+        """{render_sync, render_path_tracing, render_denoise, render_write} in secondi."""
+        done = self.last_stats or self.post or end          # ultimo stato di Cycles
+        sample = self.first_sample or done
+        denoise = self.denoise or done
+        return {
+            "render_sync": sample - self.t0,
+            "render_path_tracing": max(0.0, denoise - sample),
+            "render_denoise": max(0.0, done - denoise),
+            "render_write": max(0.0, (self.written or self.post or end) - done),
+        }
+
+    def stats(self, split):
+        """Statistiche del render per il record: memoria Cycles, samples, ms/sample."""
+        tracing = split["render_path_tracing"]
+        return dict(peak_mem_mb=round(self.peak_mem_mb, 1), cycles_time_s=self.cycles_time_s,
+                    samples=self.samples,
+                    sample_ms=round(1000 * tracing / self.samples, 2) if self.samples else None,
+                    **{k: round(v, 3) for k, v in split.items()})
+
+
+@contextmanager
+def render_phases():
+    """Divide bpy.ops.render.render in sync/BVH, path tracing, denoise, scrittura."""
+    _install_hooks()
+    clock = _RenderClock()
+    handlers = ((bpy.app.handlers.render_stats, clock.on_stats),
+                (bpy.app.handlers.render_post, clock.on_post),
+                (bpy.app.handlers.render_write, clock.on_write))
+    for lst, fn in handlers:
+        lst.append(fn)
+    try:
+        yield clock
+    finally:
+        for lst, fn in handlers:
+            if fn in lst:
+                lst.remove(fn)
+        split = clock.split(time.perf_counter())
+        for name, seconds in split.items():
+            record(name, seconds)
+        _RENDERS.append(clock.stats(split))
+
+
+# ============================================================
+# SCENA
+# ============================================================
+def scene_counts(scene=None):
+    """Oggetti, triangoli valutati (istanze GN incluse) e texture decodificate."""
+    scene = scene or bpy.context.scene
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    per_mesh = {}
+    triangles = 0
+    for inst in depsgraph.object_instances:
+        obj = inst.object
+        if obj.type != 'MESH':
+            continue
+        key = obj.data.name
+        if key not in per_mesh:
+            per_mesh[key] = len(obj.data.loop_triangles)
+        triangles += per_mesh[key]
+    images = [img for img in bpy.data.images if img.has_data]
+    tex_bytes = sum(img.size[0] * img.size[1] * img.channels * (4 if img.is_float else 1)
+                    for img in images)
+    return dict(objects=len(scene.objects), triangles=triangles, textures=len(images),
+                texture_mb=round(tex_bytes / 2**20, 1))
+
+
+# ============================================================
+# RECORD
+# ============================================================
+def _rel(path):
+    if not path:
+        return None
+    try:
+        return str(Path(path).resolve().relative_to(PROJECT_DIR))
+    except ValueError:
+        return str(path)
+
+
+def _script_name():
+    for arg in sys.argv:
+        if arg.endswith(".py"):
+            return Path(arg).name
+    return Path(bpy.data.filepath or "sessione").name
+
+
+def _install_hooks():
+    """Eccezioni non gestite → record FAILED; warnings Python → log della run."""
+    global _HOOKED
+    if _HOOKED:
+        return
+    _HOOKED = True
+    previous_hook = sys.excepthook
+    previous_warning = warnings.showwarning
+
+    def excepthook(exc_type, exc, tb):
+        error("".join(traceback.format_exception_only(exc_type, exc)).strip())
+        try:
+            finish(status="FAILED", traceback="".join(traceback.format_tb(tb))[-2000:])
+        except Exception as e:                   # il log non deve nascondere l'errore originale
+            print(f"  instrument: record non scritto ({e})")
+        previous_hook(exc_type, exc, tb)
+
+    def showwarning(message, category, filename, lineno, file=None, line=None):
+        _WARNINGS.append(f"{category.__name__}: {message} ({Path(filename).name}:{lineno})")
+        previous_warning(message, category, filename, lineno, file, line)
+
+    sys.excepthook = excepthook
+    warnings.showwarning = showwarning
+
+
+def finish(script=None, output=None, status="SUCCESS", log_path=EXECUTION_LOG, **extra):
+    """Chiude la run: riepilogo, record in L4_runs.jsonl, execution log, $HF_PHASES_JSON.
+
+    log_path=None (o HF_RUN_LOG=0): nessun record nel log L4.
+    """
+    mark(None)
+    try:
+        counts = scene_counts()
+    except Exception as e:                       # scena non valutabile (errore a metà script)
+        counts = {}
+        _WARNINGS.append(f"scene_counts: {e}")
+    data = dict(timestamp=datetime.now().isoformat(timespec="seconds"),
+                script=script or _script_name(), status=status,
+                blender=bpy.app.version_string, output=_rel(output),
+                phases={k: round(v, 4) for k, v in phases().items()},
+                spans=list(_SPANS), renders=list(_RENDERS), scene=counts,
+                peak_rss_mb=round(peak_rss_mb(), 1),
+                warnings=list(_WARNINGS), errors=list(_ERRORS), **extra)
+
+    total = sum(data["phases"].values())
+    print("=" * 60)
+    print(f"Fasi ({status}):")
+    for name, seconds in data["phases"].items():
+        print(f"  {name:<22} {seconds:8.2f}s  {100 * seconds / max(total, 1e-9):5.1f}%")
+    print(f"  {'totale':<22} {total:8.2f}s   picco RSS {data['peak_rss_mb']:.0f} MB")
+    print("=" * 60)
+
+    out = os.environ.get(PHASES_ENV)
+    if out:
+        Path(out).write_text(json.dumps(data, indent=2))
+    if log_path and os.environ.get(RUN_LOG_ENV, "1") != "0":
+        append_run(data, log_path=log_path)
+    return data
+
+
+# ============================================================
+# EXECUTION LOG
+# ============================================================
+def append_run(data, runs_path=RUNS_PATH, log_path=EXECUTION_LOG):
+    """Aggiunge un record a L4_runs.jsonl e rigenera L4_execution_log.md."""
+    with open(runs_path, "a") as f:
+        f.write(json.dumps(data) + "\n")
+    write_execution_log(read_runs(runs_path), log_path)
+
+
+def read_runs(runs_path=RUNS_PATH):
+    runs_path = Path(runs_path)
+    if not runs_path.exists():
+        return []
+    return [json.loads(line) for line in runs_path.read_text().splitlines() if line.strip()]
+
+
+def render_seconds(run):
+    return sum(v for k, v in run.get("phases", {}).items() if k.startswith("render_"))
+
+
+def _peak_mem(run):
+    return max((r.get("peak_mem_mb") or 0 for r in run.get("renders", [])), default=0)
+
+
+def _run_section(run, previous):
+    """Sezione markdown di una run (template L4) con le differenze dalla precedente."""
+    tier = f" (qualità {run['tier']})" if run.get("tier") else ""
+    lines = [
+        f"## Timestamp: {run['timestamp']}",
+        f"## Script: {run['script']}{tier}",
+        "",
+        "### Result",
+        f"- Status: {run['status']}",
+        f"- Render time: {render_seconds(run):.1f}s",
+        f"- Output: {run.get('output') or '—'}",
+        f"- Warnings: {'; '.join(run.get('warnings', [])) or 'nessuno'}",
+        f"- Errors: {'; '.join(run.get('errors', [])) or 'nessuno'}",
+    ]
+    if run.get("renders"):
+        r = run["renders"][-1]
+        sample_ms = f", {r['sample_ms']:.1f} ms/sample" if r.get("sample_ms") else ""
+        lines.append(f"- Cycles: picco memoria {_peak_mem(run):.0f} MB, "
+                     f"{r.get('samples') or '?'} samples{sample_ms}")
+    if run.get("scene"):
+        s = run["scene"]
+        lines.append(f"- Scena: {s['objects']} oggetti, {s['triangles']} triangoli, "
+                     f"{s['textures']} texture ({s['texture_mb']} MB)")
+    lines.append(f"- Picco RSS: {run.get('peak_rss_mb', 0):.0f} MB")
+
+    if run.get("views"):
+        lines += ["", "### Viste",
+                  "| Vista | Render (s) | Fotoinserimento (s) | Output |",
+                  "|-------|-----------:|--------------------:|--------|"]
+        for v in run["views"]:
+            comp = f"{v['composite_s']:.1f}" if v.get("composite_s") is not None else "—"
+            lines.append(f"| {v['name']} | {v['render_s']:.1f} | {comp} | {v['output']} |")
+    if run.get("phases"):
+        lines += ["", "### Fasi", "| Fase | s |", "|------|---:|"]
+        lines += [f"| {k} | {v:.2f} |" for k, v in run["phases"].items()]
+
+    lines += ["", "### Changes from previous"]
+    if previous is None:
+        lines.append("- Prima run registrata per questo script")
+        return lines
+    before, now = render_seconds(previous), render_seconds(run)
+    if before > 0:
+        lines.append(f"- Render: {before:.1f}s → {now:.1f}s ({100 * (now - before) / before:+.0f}%)")
+    for key in ("objects", "triangles", "textures", "texture_mb"):
+        a, b = previous.get("scene", {}).get(key), run.get("scene", {}).get(key)
+        if a is not None and b is not None and a != b:
+            lines.append(f"- {key}: {a} → {b}")
+    if previous["status"] != run["status"]:
+        lines.append(f"- Status: {previous['status']} → {run['status']}")
+    return lines
+
+
+def write_execution_log(runs, log_path=EXECUTION_LOG):
+    """Rigenera il markdown: trend di tutte le run + dettaglio delle ultime LOG_RUNS."""
+    lines = [
+        "# L4 — Execution Log",
+        "",
+        f"Generato da homeforge/instrument.py da {_rel(RUNS_PATH)}: non modificare a mano.",
+        "",
+        "## Trend",
+        "| Timestamp | Script | Qualità | Status | Render (s) | Picco Cycles (MB) | Triangoli |",
+        "|-----------|--------|---------|--------|-----------:|------------------:|----------:|",
+    ]
+    for run in runs:
+        lines.append(f"| {run['timestamp']} | {run['script']} | {run.get('tier', '—')} | "
+                     f"{run['status']} | {render_seconds(run):.1f} | {_peak_mem(run):.0f} | "
+                     f"{run.get('scene', {}).get('triangles', '—')} |")
+
+    previous = {}
+    sections = []
+    for run in runs:
+        sections.append(_run_section(run, previous.get(run["script"])))
+        previous[run["script"]] = run
+    for section in reversed(sections[-LOG_RUNS:]):          # più recente in alto
+        lines += [""] + section
+    Path(log_path).write_text("\n".join(lines) + "\n")
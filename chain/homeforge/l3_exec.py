@@ -0,0 +1,473 @@
+"""
+HomeForge AI — Esecutore delle operazioni L3
+Da chain/L3_blender_ops.md ai pixel con un solo lancio di Blender, senza
+scrivere L4_script.py: homeforge/l3_ops.py fa parse + validazione (si ferma
+alla prima OP non valida, prima di toccare la scena), qui ogni kind ha il suo
+handler.
+
+- Oggetti creati con homeforge/geometry (nessun operatore) nella collection
+  "L3"; le travi dei loop condividono la mesh.
+- Aperture (boolean_cut DIFFERENCE) raccolte per muro e tagliate in un
+  passaggio da homeforge/openings.py: mesh diretta sui box, altrimenti un solo
+  boolean con tutti i cutter.
+- Modifier (subdiv + boolean) applicati in blocco con UNA valutazione del
+  depsgraph (Mesh.new_from_object), non modifier_apply oggetto per oggetto.
+- Errore in un handler → OpError con l'id dell'OP, nessuna OP successiva.
+- Tempo per OP a video e nel log di esecuzione (instrument, campo "ops").
+
+    blender --background --python chain/homeforge/l3_exec.py -- --tier draft
+    blender --background --python chain/homeforge/l3_exec.py -- --until OP-082 --save scena.blend
+
+Esecuzione incrementale (chain_runner.py --run): --save-state salva la scena con
+gli oggetti e i materiali creati da ogni OP; --resume la riapre, rimuove ciò che
+avevano creato le OP di --only (sporche secondo chain_runner.dirty_ops) e
+riesegue solo quelle, più render_setup/render/composite.
+
+    blender ... l3_exec.py -- --resume chain/.l3_scene.blend --only OP-022,OP-029 --save-state chain/.l3_scene.blend
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import bpy
+from mathutils import Vector
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import PROJECT_DIR, script_args
+from homeforge import bake_cache, compositing, instrument, preflight, progressive, quality, render_cache
+from homeforge import openings, scene_diff, scene_setup, texture_cache
+from homeforge import geometry as geo
+from homeforge import materials as hfm
+from homeforge.l3_ops import L3_PATH, OpError, load, material_spec
+
+COLLECTION = "L3"
+DEFAULT_OUTPUT = "output/render_model.png"
+STATE_PROP = "hf_l3_state"          # JSON nella scena salvata con --save-state
+RERUN_KINDS = ("render_setup", "render", "composite")      # sempre rieseguite con --resume
+
+# kind → fase del log di esecuzione (stesse fasi degli script)
+PHASES = {
+    "utility": "clear", "material": "materials",
+    "box": "geometry", "box_loop": "geometry", "boolean_cut": "geometry",
+    "apply_modifiers": "geometry", "mesh_custom": "geometry",
+    "camera_setup": "setup", "world_setup": "setup", "render_setup": "setup",
+    "composite": "compositing",
+}
+
+MODIFIER_ATTRS = {"viewport_levels": "levels"}
+
+HANDLERS = {}
+
+
+def handler(kind):
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+class Run:
+    """Stato condiviso tra gli handler di un'esecuzione."""
+
+    def __init__(self, tier):
+        self.tier = tier
+        self.tier_settings = None
+        self.scene = bpy.context.scene
+        self.collection = None
+        self.materials = {}         # nome L3 → Material
+        self.objects = {}           # nome L3 → Object
+        self.cutters = []
+        self.openings = {}          # muro → {solver, cutters} in attesa (homeforge/openings.py)
+        self.opening_reports = []
+        self.target = (0.0, 0.0, 0.0)
+        self.output = None
+        self.cached = None
+        self.baked = []             # slot con materiali baked (homeforge/bake_cache.py)
+        self.timings = []
+        self.created = {}           # id OP → {objects, materials} (esecuzione incrementale)
+
+    def collection_for(self):
+        if self.collection is None:
+            self.collection = bpy.data.collections.new(COLLECTION)
+            self.scene.collection.children.link(self.collection)
+        return self.collection
+
+    def material(self, name):
+        return self.materials[name] if name else None
+
+
+def _path(rel, tier=None):
+    path = PROJECT_DIR / rel
+    return quality.tier_output(path, tier) if tier else str(path)
+
+
+def _aim(obj, target):
+    """Orienta camera/luce (-Z locale) verso target, Y in alto: niente constraint."""
+    direction = Vector(target) - obj.location
+    obj.rotation_euler = direction.to_track_quat('-Z', 'Y').to_euler()
+
+
+# ============================================================
+# HANDLER
+# ============================================================
+@handler("utility")
+def _utility(run, op):
+    run.scene = scene_setup.new_scene()
+    run.collection = None
+    run.collection_for()
+
+
+@handler("material")
+def _material(run, op):
+    run.materials[op.params["name"]] = hfm.from_spec(material_spec(op.params), op.params["name"])
+
+
+def _add_modifier(obj, spec, op):
+    spec = dict(spec)
+    kind = spec.pop("type")
+    if kind == "SUBSURF":
+        instrument.warn(f"{op.id}: Subdivision Surface su {obj.name} arrotonda i box "
+                        "(agents/L3_translator.md, Anti-Pattern)")
+    mod = obj.modifiers.new(kind.title(), kind)
+    for key, value in spec.items():
+        setattr(mod, MODIFIER_ATTRS.get(key, key), value)
+    return mod
+
+
+@handler("box")
+@handler("box_loop")
+def _boxes(run, op):
+    p = op.params
+    mat = run.material(p["material"])
+    collection = run.collection_for()
+    for o in p["objects"]:
+        obj = geo.make_box(o["name"], *o["dims"], location=o["location"], material=mat,
+                           shared=p["shared"], collection=collection)
+        for spec in p["modifiers"]:
+            _add_modifier(obj, spec, op)
+        run.objects[o["name"]] = obj
+
+
+@handler("boolean_cut")
+def _boolean_cut(run, op):
+    p = op.params
+    c = p["cutter"]
+    if p["operation"] == "DIFFERENCE":      # tagliata con le altre aperture del muro
+        pending = run.openings.setdefault(p["target"], dict(solver=p["solver"], cutters=[]))
+        pending["cutters"].append(c)
+        return
+    cutter = geo.make_box(c["name"], *c["dims"], location=c["location"],
+                          collection=run.collection_for())
+    cutter.display_type = 'WIRE'
+    cutter.hide_render = True
+    mod = run.objects[p["target"]].modifiers.new(c["name"], 'BOOLEAN')
+    mod.operation = p["operation"]
+    mod.solver = p["solver"]
+    mod.object = cutter
+    run.cutters.append(cutter)
+    run.objects[c["name"]] = cutter
+
+
+def _flush_openings(run):
+    """Aperture in attesa → un passaggio per muro; il boolean unico (muri non box)
+    resta modifier e si applica con gli altri in apply_modifiers."""
+    pending, run.openings = run.openings, {}
+    with instrument.span("geometry"):
+        for target, p in pending.items():
+            report = openings.cut(run.objects[target], p["cutters"], solver=p["solver"],
+                                  apply=False, collection=run.collection_for())
+            if not report["manifold"]:
+                instrument.warn(f"{target}: aperture non manifold (bordo {report['boundary']}, "
+                                f">2 facce {report['nonmanifold']})")
+            run.opening_reports.append(report)
+    openings.print_report(run.opening_reports[-len(pending):])
+
+
+@handler("apply_modifiers")
+def _apply_modifiers(run, op):
+    """Tutti i modifier di tutti gli oggetti con una sola valutazione del depsgraph."""
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    stale, removed_cuts = [], []
+    for obj in [o for o in run.objects.values() if o.modifiers and o not in run.cutters]:
+        try:
+            mesh = bpy.data.meshes.new_from_object(obj.evaluated_get(depsgraph),
+                                                   preserve_all_data_layers=True,
+                                                   depsgraph=depsgraph)
+        except RuntimeError as e:
+            if op.params["fallback"] != "remove":
+                raise
+            instrument.warn(f"{op.id}: modifier di {obj.name} rimossi senza applicarli ({e})")
+            removed_cuts += openings.release(obj)
+            obj.modifiers.clear()
+            continue
+        stale.append(obj.data)
+        removed_cuts += openings.release(obj)
+        obj.modifiers.clear()
+        obj.data = mesh
+    # cutter e mesh rimaste senza utenti (le mesh condivise restano) in un'unica rimozione
+    for cutter in run.cutters:
+        run.objects.pop(cutter.name, None)
+    removed = run.cutters + [c.data for c in run.cutters] + removed_cuts
+    removed += [m for m in stale if m.users == 0]
+    run.cutters = []
+    bpy.data.batch_remove(removed)
+
+
+@handler("mesh_custom")
+def _mesh_custom(run, op):
+    p = op.params
+    name = p["name"]
+    mesh = geo.custom_mesh(f"{name}_mesh", p["verts"], p["faces"],
+                           material=run.material(p["material"]), smooth=p["smooth"])
+    run.objects[name] = geo.make_object(name, mesh, collection=run.collection_for())
+
+
+@handler("camera_setup")
+def _camera(run, op):
+    p = op.params
+    data = bpy.data.cameras.new("Camera")
+    data.lens = p["lens"]
+    data.sensor_width = p["sensor"]
+    data.clip_end = p["clip_end"]
+    cam = geo.make_object("Camera", data, p["location"], collection=run.collection_for())
+    _aim(cam, p["target"])
+    run.scene.camera = cam
+    run.target = p["target"]
+
+
+def _light(run, name, kind, spec, location, target):
+    data = bpy.data.lights.new(name, kind)
+    data.energy = spec.get("energy", data.energy)
+    if kind == 'SUN':
+        data.angle = spec.get("angle", data.angle)
+    if kind == 'AREA':
+        data.size = spec.get("size", data.size)
+    obj = geo.make_object(name, data, location, collection=run.collection_for())
+    _aim(obj, target)
+    return obj
+
+
+@handler("world_setup")
+def _world(run, op):
+    p = op.params
+    scene_diff.build_world(run.scene, p, warn=lambda msg: instrument.warn(f"{op.id}: {msg}"))
+
+    if p["sun"]:
+        direction = Vector(p["sun"].get("direction", (0, 0, -1)))
+        location = Vector(run.target) - direction.normalized() * 20
+        _light(run, "Sun", 'SUN', p["sun"], location, run.target)
+    if p["fill"]:
+        _light(run, "Fill", 'AREA', p["fill"], p["fill"].get("position", (0, -8, 6)), run.target)
+
+
+def _use_gpu(scene):
+    try:
+        prefs = bpy.context.preferences.addons['cycles'].preferences
+        prefs.compute_device_type = 'CUDA'
+        prefs.get_devices()
+        for d in prefs.devices:
+            d.use = True
+        scene.cycles.device = 'GPU' if prefs.has_active_device() else 'CPU'
+    except (KeyError, TypeError, AttributeError):
+        scene.cycles.device = 'CPU'
+
+
+@handler("render_setup")
+def _render_setup(run, op):
+    """Impostazioni L3 + livello qualità (samples, % risoluzione, bounces: li decide il tier)."""
+    p = op.params
+    scene = run.scene
+    scene.render.engine = p["engine"]
+    if p["device"] == "GPU":
+        _use_gpu(scene)
+    else:
+        scene.cycles.device = 'CPU'
+    scene.cycles.samples = p["samples"]
+    scene.cycles.use_denoising = p["denoising"]
+    scene.render.resolution_x, scene.render.resolution_y = p["resolution"]
+    scene.render.film_transparent = p["film_transparent"]
+    scene.render.image_settings.file_format = p["file_format"]
+    scene.render.image_settings.color_mode = p["color_mode"]
+    run.tier_settings = quality.apply_tier(scene, run.tier)
+    texture_cache.apply_variants(tier=run.tier)
+    run.baked = bake_cache.apply(scene, tier=run.tier)
+    run.output = _path(p["output"] or DEFAULT_OUTPUT, run.tier)
+    scene.render.filepath = run.output
+
+
+@handler("render")
+def _render(run, op):
+    if op.params["output"]:
+        run.output = _path(op.params["output"], run.tier)
+    preflight.gate(run.scene, tier=run.tier, output=run.output)   # PreflightError → OpError
+    t0 = time.time()
+    run.cached = render_cache.render(run.scene, run.output, prepare=instrument.load_images,
+                                     renderer=progressive.renderer_from_args(run.scene, run.output))
+    elapsed = time.time() - t0
+    if not run.cached["complete"]:
+        raise OpError(op.id, "render fermato dall'hook progressivo (checkpoint in output/)")
+    quality.record_render(run.output, run.tier_settings, elapsed, cached=run.cached["hit"])
+    print(f"  Render {elapsed:.1f}s" + (" (cache)" if run.cached["hit"] else "") + f" → {run.output}")
+
+
+@handler("composite")
+def _composite(run, op):
+    p = op.params
+    model = run.output if run.output else _path(p["model"], run.tier)
+    output = _path(p["output"], run.tier)
+    compositing.composite_on_photo(model, str(PROJECT_DIR / p["photo"]), output)
+    print(f"  Composite → {output}")
+
+
+# ============================================================
+# ESECUZIONE
+# ============================================================
+def _names(run):
+    objects = {o.name for o in run.collection.all_objects} if run.collection else set()
+    return objects, set(run.materials)
+
+
+def execute(ops, tier=None, until=None, only=None, run=None):
+    """Esegue le OP in ordine (fino a `until` compreso) → Run con tempi per OP.
+
+    only + run (da resume): solo le OP in only e le RERUN_KINDS."""
+    for op in ops:
+        if op.kind not in HANDLERS:
+            raise OpError(op.id, f"nessun handler per {op.kind!r}")
+    run = run or Run(tier or quality.get_tier())
+    for op in ops:
+        if only is not None and op.id not in only and op.kind not in RERUN_KINDS:
+            if op.id == until:
+                break
+            continue
+        if run.openings and op.kind != "boolean_cut":
+            _timed_flush(run)
+        objects, materials = _names(run)
+        t0 = time.perf_counter()
+        phase = PHASES.get(op.kind)
+        try:
+            if phase:
+                with instrument.span(phase):
+                    HANDLERS[op.kind](run, op)
+            else:
+                HANDLERS[op.kind](run, op)
+        except OpError:
+            raise
+        except Exception as e:
+            raise OpError(op.id, f"{type(e).__name__}: {e}") from e
+        run.timings.append(dict(op=op.id, kind=op.kind, s=round(time.perf_counter() - t0, 4)))
+        after_objects, after_materials = _names(run)
+        if op.kind != "utility":
+            run.created[op.id] = dict(objects=sorted(after_objects - objects),
+                                      materials=sorted(after_materials - materials))
+        if op.id == until:
+            break
+    if run.openings:
+        _timed_flush(run)
+    return run
+
+
+def _timed_flush(run):
+    t0 = time.perf_counter()
+    _flush_openings(run)
+    run.timings.append(dict(op="aperture", kind="openings", s=round(time.perf_counter() - t0, 4)))
+
+
+# ============================================================
+# STATO PER L'ESECUZIONE INCREMENTALE
+# ============================================================
+def save_state(run, path):
+    """Scena + {OP: oggetti/materiali creati} per un --resume successivo."""
+    live = {o.name for o in run.collection.all_objects} if run.collection else set()
+    ops = {op: dict(objects=[n for n in c["objects"] if n in live], materials=c["materials"])
+           for op, c in run.created.items()}
+    run.scene[STATE_PROP] = json.dumps(dict(
+        ops=ops, materials={k: m.name for k, m in run.materials.items()},
+        target=list(run.target), tier=run.tier))
+    bpy.ops.wm.save_as_mainfile(filepath=str(Path(path).resolve()), copy=True)
+    print(f"Stato L3 salvato: {path}")
+
+
+def resume(path, ops, only, tier=None):
+    """Riapre la scena di save_state e rimuove gli oggetti (e i materiali senza più
+    utenti) creati dalle OP in only o sparite da L3 → Run per execute(only=...)."""
+    bpy.ops.wm.open_mainfile(filepath=str(Path(path).resolve()))
+    scene = bpy.context.scene
+    state = json.loads(scene.get(STATE_PROP, "{}"))
+    collection = bpy.data.collections.get(COLLECTION)
+    if not state or collection is None:
+        raise OpError("resume", f"{path}: nessuno stato L3 (eseguire con --save-state)")
+    run = Run(tier or state["tier"])
+    run.scene, run.collection = scene, collection
+    run.target = tuple(state["target"])
+    run.created = state["ops"]
+    run.materials = {k: bpy.data.materials[v] for k, v in state["materials"].items()
+                     if v in bpy.data.materials}
+
+    stale = set(only) | (set(state["ops"]) - {op.id for op in ops})
+    objects = [bpy.data.objects[n] for op in stale for n in state["ops"].get(op, {}).get("objects", ())
+               if n in bpy.data.objects]
+    data = [o.data for o in objects if o.data is not None]
+    bpy.data.batch_remove(objects)
+    bpy.data.batch_remove([d for d in set(data) if d.users == 0])
+    for op in stale:
+        record = run.created.pop(op, {})
+        for name in record.get("materials", ()):
+            mat = run.materials.pop(name, None)
+            if mat is not None and mat.users == 0:
+                bpy.data.materials.remove(mat)
+    run.objects = {o.name: o for o in collection.all_objects}
+    print(f"Ripresa da {path}: {len(objects)} oggetti rimossi, OP da rieseguire: "
+          f"{', '.join(sorted(only)) or 'solo render'}")
+    return run
+
+
+def print_timings(timings, top=10):
+    total = sum(t["s"] for t in timings) or 1.0
+    print("=" * 60)
+    print(f"{len(timings)} OP in {total:.2f}s — più lente:")
+    for t in sorted(timings, key=lambda t: -t["s"])[:top]:
+        print(f"  {t['op']:<11} {t['kind']:<16} {t['s']:8.3f}s  {100 * t['s'] / total:5.1f}%")
+    print("=" * 60)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — esegue L3_blender_ops.md in Blender")
+    ap.add_argument("--ops", default=str(L3_PATH), help="file operazioni L3")
+    ap.add_argument("--tier", choices=tuple(quality.TIERS))
+    ap.add_argument("--until", help="ferma dopo questa OP (es. OP-082: scena senza render)")
+    ap.add_argument("--save", help="salva la scena risultante in questo .blend")
+    ap.add_argument("--save-state", help="salva scena + OP → oggetti per un --resume successivo")
+    ap.add_argument("--resume", help="scena di --save-state: riesegue solo le OP di --only")
+    ap.add_argument("--only", help="OP da rieseguire, separate da virgole (con --resume)")
+    args = ap.parse_args(script_args() if argv is None else argv)
+
+    ops = load(args.ops)
+    print(f"L3: {len(ops)} OP valide da {args.ops}")
+    only = {o for o in (args.only or "").split(",") if o} if args.resume else None
+    run = None
+    if only is not None and any(op.kind == "utility" and op.id in only for op in ops):
+        print("OP di reset scena da rieseguire: esecuzione completa")
+        only = None
+    elif only is not None:
+        run = resume(args.resume, ops, only, args.tier)
+    run = execute(ops, args.tier, args.until, only=only, run=run)
+    print_timings(run.timings)
+    if args.save or args.save_state:
+        bake_cache.restore(run.baked)
+    if args.save:
+        bpy.ops.wm.save_as_mainfile(filepath=str(Path(args.save).resolve()), copy=True)
+        print(f"Scena salvata: {args.save}")
+    if args.save_state:
+        save_state(run, args.save_state)
+    instrument.finish(f"l3_exec.py ({Path(args.ops).name})", output=run.output, tier=run.tier,
+                      ops=run.timings, openings=run.opening_reports)
+    return run
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,625 @@
+"""
+HomeForge AI — Parser delle operazioni L3
+chain/L3_blender_ops.md descrive la scena come OP numerate (`### OP-xxx`, campi
+`- Chiave: valore`). Qui diventano una rappresentazione intermedia tipizzata:
+ogni Op ha `kind` (box, boolean_cut, material, ...) e `params` già convertiti
+(tuple di float, nomi, chiamate make_box espanse, loop srotolati).
+
+Un'OP non interpretabile o un riferimento a un nome mai creato → OpError con
+l'id dell'OP: il parser si ferma alla prima, prima di aprire Blender.
+L'esecuzione è in homeforge/l3_exec.py (bpy); questo modulo è puro Python.
+
+    python chain/homeforge/l3_ops.py                 # riepilogo + validazione
+    python chain/homeforge/l3_ops.py --json          # IR completa
+    python chain/homeforge/l3_ops.py --describe      # stato scena desiderato (scene_diff)
+"""
+import re
+import ast
+import sys
+import json
+import argparse
+from pathlib import Path
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import CHAIN_DIR, script_args
+
+L3_PATH = CHAIN_DIR / "L3_blender_ops.md"
+
+# Materiali L3 → libreria condivisa (homeforge/materials.py), come da agents/L3_translator.md
+LIBRARY_MATERIALS = {
+    "Pietra": "pietra_muro",
+    "Piode": "piode",
+    "LegnoTravi": "legno_travi",
+    "Rame": "rame_brunito",
+}
+
+# "- Tipo:" → kind; OP senza Tipo: kind dal titolo
+KIND_ALIASES = {"loop di box": "box_loop", "loop": "box_loop"}
+TITLE_KINDS = (("applica tutti i modifier", "apply_modifiers"),)
+
+
+class OpError(ValueError):
+    """OP non valida: op_id + motivo."""
+
+    def __init__(self, op_id, message):
+        super().__init__(f"{op_id}: {message}")
+        self.op_id = op_id
+
+
+class Op:
+    """Un'operazione L3: testo grezzo (fields/details/code) + params tipizzati."""
+
+    def __init__(self, op_id, title, line, block):
+        self.id = op_id
+        self.title = title
+        self.line = line
+        self.block = block
+        self.fields = {}        # chiave minuscola → valore della riga "- Chiave: valore"
+        self.details = {}       # chiave minuscola → righe indentate sotto il campo
+        self.bullets = []       # tutte le righe "- ..." di primo livello
+        self.code = ""
+        self.kind = None
+        self.params = {}
+
+    def field(self, *keys, default=None):
+        for key in keys:
+            if key in self.fields:
+                return self.fields[key]
+        return default
+
+    def require(self, *keys):
+        value = self.field(*keys)
+        if value in (None, ""):
+            raise OpError(self.id, f"manca '{keys[0]}'")
+        return value
+
+    @property
+    def objects(self):
+        """Nomi degli oggetti creati (box, cutter, mesh custom)."""
+        return [o["name"] for o in self.params.get("objects", ())] + (
+            [self.params["cutter"]["name"]] if "cutter" in self.params else []) + (
+            [self.params["name"]] if self.kind == "mesh_custom" else [])
+
+    def as_dict(self):
+        return dict(id=self.id, title=self.title, kind=self.kind, params=self.params)
+
+
+# ============================================================
+# VALORI
+# ============================================================
+_NUM = r"[-+]?\d+(?:\.\d+)?"
+_TUPLE = re.compile(rf"\(\s*({_NUM}(?:\s*,\s*{_NUM})+)\s*\)")
+_LABELED = re.compile(rf"\b([A-Z]+\d+)\s*\(\s*({_NUM}(?:\s*,\s*{_NUM}){{2}})\s*\)")
+_QUOTED = re.compile(r"""["']([^"']+)["']""")
+_CALL = re.compile(r"`?(make_\w+\(.*?\))`?(?:\s*@\s*(\([^)]*\)))?")
+_HEX = re.compile(r"#([0-9A-Fa-f]{6})\b")
+_KV = re.compile(r"(\w+)\s*=\s*(\([^)]*\)|'[^']*'|\"[^\"]*\"|[^,]+)")
+
+
+def number(text, op_id=None):
+    m = re.search(_NUM, str(text))
+    if not m:
+        raise OpError(op_id or "?", f"numero atteso in {text!r}")
+    return float(m.group())
+
+
+def vector(text, size=3, op_id=None):
+    m = _TUPLE.search(str(text))
+    values = tuple(float(v) for v in m.group(1).split(",")) if m else ()
+    if len(values) != size:
+        raise OpError(op_id or "?", f"tupla di {size} valori attesa in {text!r}")
+    return values
+
+
+def quoted(text, op_id=None):
+    m = _QUOTED.search(str(text))
+    if not m:
+        raise OpError(op_id or "?", f"nome tra virgolette atteso in {text!r}")
+    return m.group(1)
+
+
+def color(hex_text):
+    """#RRGGBB (sRGB) → RGBA lineare."""
+    def lin(c):
+        return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+    h = _HEX.search(hex_text).group(1)
+    return tuple(lin(int(h[i:i + 2], 16) / 255) for i in (0, 2, 4)) + (1.0,)
+
+
+def flag(text):
+    return str(text).strip().lower().split()[0] in ("true", "sì", "si", "yes", "1")
+
+
+def key_values(text):
+    """'energy=3.0, direction=(-0.3, 0.4, -0.8)' → {energy: 3.0, direction: (...)}."""
+    out = {}
+    for key, raw in _KV.findall(text):
+        raw = raw.strip()
+        try:
+            out[key] = ast.literal_eval(raw)
+        except (ValueError, SyntaxError):
+            out[key] = raw.strip("'\"")
+    return out
+
+
+_ARITH = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Load,
+          ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.USub, ast.UAdd)
+
+
+def arith(expr, names, op_id=None):
+    """Espressione aritmetica dei loop L3 (x = 0.30 + i * 0.60), niente altro."""
+    tree = ast.parse(expr.strip(), mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, _ARITH) or (isinstance(node, ast.Name) and node.id not in names):
+            raise OpError(op_id or "?", f"espressione non ammessa: {expr!r}")
+    return eval(compile(tree, "<L3>", "eval"), {"__builtins__": {}}, dict(names))
+
+
+def make_call(text, names=None, op_id=None):
+    """`make_box("Nome", w, d, h)` → dict(func, name, dims); f-string valutate con names."""
+    m = _CALL.search(text)
+    if not m:
+        raise OpError(op_id or "?", f"chiamata make_*() attesa in {text!r}")
+    call = ast.parse(m.group(1), mode="eval").body
+    if not call.args:
+        raise OpError(op_id or "?", f"{m.group(1)}: argomenti mancanti")
+    head = call.args[0]
+    if isinstance(head, ast.JoinedStr):
+        name = "".join(str(v.value) if isinstance(v, ast.Constant)
+                       else str(arith(ast.unparse(v.value), names or {}, op_id))
+                       for v in head.values)
+    elif isinstance(head, ast.Constant) and isinstance(head.value, str):
+        name = head.value
+    else:
+        raise OpError(op_id or "?", f"{m.group(1)}: primo argomento = nome")
+    dims = tuple(float(arith(ast.unparse(a), names or {}, op_id)) for a in call.args[1:])
+    out = dict(func=call.func.id, name=name, dims=dims)
+    if m.group(2):
+        out["location"] = vector(m.group(2), op_id=op_id)
+    return out
+
+
+def modifier(text, op_id=None):
+    """'Subdivision Surface, render_levels=2, viewport_levels=1' → dict modifier."""
+    kinds = {"subdivision": "SUBSURF", "bevel": "BEVEL", "solidify": "SOLIDIFY"}
+    head = text.split(",")[0].strip().lower()
+    kind = next((v for k, v in kinds.items() if head.startswith(k)), None)
+    if kind is None:
+        raise OpError(op_id or "?", f"modifier non supportato: {text!r}")
+    return dict(type=kind, **key_values(text))
+
+
+# ============================================================
+# SPLIT
+# ============================================================
+_OP_HEADING = re.compile(r"^### (OP-\d{3}(?:-\d{3})?)\b:?\s*(.*)$", re.M)
+_BULLET = re.compile(r"^- (?:([^:`(]+?(?:\([^)]*\))?):\s*)?(.*)$")
+_MAKES = re.compile(r"""\bmake_\w+\(\s*f?["']([^"']+)["']""")
+_NAME = re.compile(r"""^- Nome:\s*["']([^"']+)["']""", re.M)
+_TARGET = re.compile(r"""^- Target:\s*["']([^"']+)["']""", re.M)
+_MATERIAL = re.compile(r"""^\s*- Materiale:\s*["']([^"']+)["']""", re.M)
+_LOOP = re.compile(r"^- Per (\w+) da (\d+) a (\d+)", re.M)
+
+
+def split_ops(text):
+    """{id OP: testo del blocco} nell'ordine del file (intestazione esclusa)."""
+    heads = list(_OP_HEADING.finditer(text))
+    return {m.group(1): text[m.start():heads[i + 1].start() if i + 1 < len(heads) else len(text)].strip()
+            for i, m in enumerate(heads)}
+
+
+def _expand(name, loop):
+    """Nome f-string di un loop di box ("TraveSud_{i}") → un nome per iterazione."""
+    if loop is None or "{" not in name:
+        return {name}
+    var, lo, hi = loop.group(1), int(loop.group(2)), int(loop.group(3))
+    if set(re.findall(r"\{([^}]*)\}", name)) != {var}:
+        return {name}                          # espressione nel nome: resta il modello
+    return {name.replace(f"{{{var}}}", str(i)) for i in range(lo, hi + 1)}
+
+
+def op_names(block):
+    """(nomi creati, nomi usati, nomi modificati) di un blocco OP, senza parsing completo."""
+    loop = _LOOP.search(block)
+    made = {n for name in _MAKES.findall(block) for n in _expand(name, loop)} | set(_NAME.findall(block))
+    targets = set(_TARGET.findall(block))
+    used = targets | set(_MATERIAL.findall(block))
+    return made, used, targets
+
+
+def _read_block(op):
+    lines = op.block.splitlines()[1:]
+    key, in_code, code = None, False, []
+    for line in lines:
+        if line.startswith("```"):
+            in_code = not in_code
+            continue
+        if in_code:
+            code.append(line)
+            continue
+        if line.startswith("- "):
+            op.bullets.append(line[2:])
+            m = _BULLET.match(line)
+            key = (m.group(1) or "").strip().lower() or None
+            if key:
+                op.fields[key] = m.group(2).strip()
+        elif line.startswith((" ", "\t")) and line.strip() and key:
+            op.details.setdefault(key, []).append(line.strip().lstrip("-").strip())
+    op.code = "\n".join(code)
+
+
+def _kind(op):
+    tipo = op.field("tipo")
+    if tipo:
+        tipo = tipo.strip().lower()
+        return KIND_ALIASES.get(tipo, tipo.split()[0])
+    title = op.title.lower()
+    return next((kind for key, kind in TITLE_KINDS if key in title), None)
+
+
+# ============================================================
+# PARSER PER TIPO
+# ============================================================
+PARSERS = {}
+
+
+def parser(kind):
+    def register(fn):
+        PARSERS[kind] = fn
+        return fn
+    return register
+
+
+def _material_ref(op):
+    value = op.field("materiale")
+    return quoted(value, op.id) if value else None
+
+
+@parser("utility")
+def _utility(op):
+    text = op.field("funzione", default="") + op.code
+    if "clear_scene" in text or "delete" in op.code:
+        return dict(action="clear_scene")
+    raise OpError(op.id, "utility sconosciuta (supportata: clear_scene)")
+
+
+@parser("material")
+def _material(op):
+    name = quoted(op.require("nome"), op.id)
+    preset = op.field("preset") or LIBRARY_MATERIALS.get(name)
+    if preset:
+        return dict(name=name, source="library", preset=preset.strip("`\"' "))
+    bsdf = op.field("principled bsdf")
+    if bsdf:
+        out = dict(name=name, source="flat", color=color(bsdf) if _HEX.search(bsdf) else None)
+        for key, label in (("roughness", "Roughness"), ("specular", "Specular IOR Level")):
+            m = re.search(rf"{label}\s*[:=]?\s*({_NUM})", bsdf)
+            if m:
+                out[key] = float(m.group(1))
+        return out
+    tree = " ".join(op.details.get("node tree", ()))
+    if "Glass BSDF" in tree:
+        glass = re.search(r"Glass BSDF \(([^)]*)\)", tree).group(1)
+        outer = re.search(r"Principled BSDF \(([^)]*)\)", tree)
+        out = dict(name=name, source="glass", color=color(glass),
+                   roughness=number(re.search(rf"roughness:\s*{_NUM}", glass).group(), op.id),
+                   ior=number(re.search(rf"IOR:\s*{_NUM}", glass).group(), op.id))
+        if outer:
+            o = outer.group(1)
+            out["outer"] = dict(color=color(o),
+                                metallic=number(re.search(rf"metallic:\s*{_NUM}", o).group()),
+                                roughness=number(re.search(rf"roughness:\s*{_NUM}", o).group()))
+        return out
+    raise OpError(op.id, f"materiale {name!r}: node tree non interpretabile, indicare '- Preset:'")
+
+
+def _check_box(op, obj):
+    if len(obj["dims"]) != 3 or min(obj["dims"]) <= 0:
+        raise OpError(op.id, f"{obj['name']}: dimensioni non valide {obj['dims']}")
+    if "location" not in obj:
+        raise OpError(op.id, f"{obj['name']}: location mancante (`make_box(...)` @ (x, y, z))")
+    return obj
+
+
+@parser("box")
+def _box(op):
+    objects = []
+    if op.field("funzione"):
+        call = make_call(op.field("funzione"), op_id=op.id)
+        call["location"] = vector(op.require("location"), op_id=op.id)
+        objects.append(call)
+    for bullet in op.bullets:
+        if "make_" in bullet and "@" in bullet and not bullet.startswith("Funzione"):
+            objects.append(make_call(bullet, op_id=op.id))
+    if not objects:
+        raise OpError(op.id, "nessun make_box(...)")
+    for obj in objects:
+        _check_box(op, obj)
+    mods = [modifier(op.field("modifier"), op.id)] if op.field("modifier") else []
+    return dict(objects=objects, material=_material_ref(op), modifiers=mods, shared=False)
+
+
+@parser("box_loop")
+def _box_loop(op):
+    head = next((k for k in op.details if k.startswith("per ")), None)
+    m = re.match(r"per (\w+) da (\d+) a (\d+)", head or "")
+    if not m:
+        raise OpError(op.id, "loop atteso: '- Per i da A a B:'")
+    var, lo, hi = m.group(1), int(m.group(2)), int(m.group(3))
+    body = op.details[head]
+    objects, material = [], None
+    for i in range(lo, hi + 1):
+        names, call, location = {var: i}, None, None
+        for line in body:
+            if "make_" in line:
+                call = make_call(line, names, op.id)
+            elif line.lower().startswith("location:"):
+                loc = _TUPLE.search(line) or re.search(r"\(([^)]*)\)", line)
+                location = tuple(round(float(arith(v, names, op.id)), 6) for v in loc.group(1).split(","))
+            elif line.lower().startswith("materiale:"):
+                material = quoted(line, op.id)
+            elif re.match(r"^\w+\s*=", line):
+                k, expr = line.split("=", 1)
+                names[k.strip()] = round(arith(expr, names, op.id), 6)
+        if call is None or location is None:
+            raise OpError(op.id, "il corpo del loop deve avere make_box(...) e Location")
+        call["location"] = location
+        objects.append(_check_box(op, call))
+    return dict(objects=objects, material=material or _material_ref(op), modifiers=[], shared=True)
+
+
+@parser("boolean_cut")
+def _boolean_cut(op):
+    cutter = make_call(op.require("cutter"), op_id=op.id)
+    cutter["location"] = vector(op.require("cutter location"), op_id=op.id)
+    _check_box(op, cutter)
+    return dict(target=quoted(op.require("target"), op.id), cutter=cutter,
+                operation=op.field("operation", default="DIFFERENCE").strip().upper(),
+                solver=op.field("solver", default="EXACT").strip().upper())
+
+
+@parser("apply_modifiers")
+def _apply_modifiers(op):
+    return dict(fallback="remove" if "fallback" in op.fields else "raise")
+
+
+@parser("mesh_custom")
+def _mesh_custom(op):
+    name = quoted(op.require("nome"), op.id)
+    labels, verts = {}, []
+    for key in (k for k in op.fields if k.startswith("vertici")):
+        text = op.fields[key]
+        labeled = _LABELED.findall(text)
+        if labeled:
+            for label, xyz in labeled:
+                labels[label] = len(verts)
+                verts.append(tuple(float(v) for v in xyz.split(",")))
+        else:
+            verts += [tuple(float(v) for v in t.split(",")) for t in _TUPLE.findall(text)]
+    if len(verts) < 4:
+        raise OpError(op.id, "mesh_custom: servono almeno 4 vertici")
+    faces = []
+    face_text = " ".join([op.field("facce", default="")] + op.details.get("facce", []))
+    for token in re.findall(r"\w+(?:-\w+){2,}", face_text):
+        face = [labels[t] if t in labels else int(t) for t in token.split("-")
+                if t in labels or t.isdigit()]
+        if len(face) != len(token.split("-")) or max(face) >= len(verts):
+            raise OpError(op.id, f"faccia non valida: {token}")
+        faces.append(tuple(face))
+    smooth = op.field("smooth shading")
+    return dict(name=name, verts=verts, faces=faces, hull=not faces, material=_material_ref(op),
+                smooth=flag(smooth) if smooth else False)
+
+
+@parser("camera_setup")
+def _camera(op):
+    return dict(location=vector(op.require("posizione"), op_id=op.id),
+                target=vector(op.require("target"), op_id=op.id),
+                lens=number(op.field("focale", default="50"), op.id),
+                sensor=number(op.field("sensor", default="36"), op.id),
+                clip_end=number(op.field("clip end", default="100"), op.id))
+
+
+@parser("world_setup")
+def _world(op):
+    sky = op.field("sky", default="")
+    return dict(sky=key_values(sky) if "ShaderNodeTexSky" in sky else None,
+                strength=number(op.field("background strength", default="1.0"), op.id),
+                sun=key_values(op.field("sun lamp", default="")) or None,
+                fill=key_values(op.field("area light (fill)", "area light", default="")) or None)
+
+
+@parser("render_setup")
+def _render_setup(op):
+    res = re.findall(r"\d+", op.field("resolution", default="1920 × 1080"))
+    fmt = op.field("output format", default="PNG RGB").split()
+    output = re.search(r"output/[\w./-]+", op.field("output path", default=""))
+    return dict(engine=op.field("engine", default="CYCLES").split()[0].upper(),
+                device=op.field("device", default="CPU").split()[0].upper(),
+                samples=int(number(op.field("samples", default="128"), op.id)),
+                denoising=flag(op.field("denoising", default="True")),
+                resolution=(int(res[0]), int(res[1])),
+                film_transparent=flag(op.field("film transparent", default="False")),
+                file_format=fmt[0].upper(), color_mode=(fmt[1] if len(fmt) > 1 else "RGB").upper(),
+                output=output.group() if output else None)
+
+
+@parser("render")
+def _render(op):
+    output = re.search(r"output/[\w./-]+", op.field("salva in", default=""))
+    return dict(output=output.group() if output else None)
+
+
+@parser("composite")
+def _composite(op):
+    def path(key):
+        m = re.search(r"(?:photos|output)/[\w./-]+", op.require(key))
+        if not m:
+            raise OpError(op.id, f"percorso atteso in '{key}'")
+        return m.group()
+    return dict(photo=path("input foto"), model=path("input modello"), output=path("output"))
+
+
+# ============================================================
+# PARSE + VALIDAZIONE
+# ============================================================
+def parse_op(op_id, title, line, block):
+    op = Op(op_id, title, line, block)
+    _read_block(op)
+    op.kind = _kind(op)
+    if op.kind is None:
+        raise OpError(op_id, "'- Tipo:' mancante")
+    if op.kind not in PARSERS:
+        raise OpError(op_id, f"tipo sconosciuto {op.kind!r} (supportati: {', '.join(sorted(PARSERS))})")
+    op.params = PARSERS[op.kind](op)
+    return op
+
+
+def validate(ops):
+    """Controlli tra OP: nomi duplicati, materiali e target mai creati, render senza setup."""
+    materials, objects = set(), set()
+    seen_kinds = set()
+    for op in ops:
+        p = op.params
+        if op.kind == "material":
+            materials.add(p["name"])
+        material = p.get("material")
+        if material and material not in materials:
+            raise OpError(op.id, f"materiale {material!r} non creato da un'OP precedente")
+        if op.kind == "boolean_cut" and p["target"] not in objects:
+            raise OpError(op.id, f"target {p['target']!r} non creato da un'OP precedente")
+        for name in op.objects:
+            if name in objects:
+                raise OpError(op.id, f"oggetto {name!r} già creato")
+            objects.add(name)
+        if op.kind == "render" and "render_setup" not in seen_kinds:
+            raise OpError(op.id, "render prima di render_setup")
+        seen_kinds.add(op.kind)
+    return ops
+
+
+def parse(text):
+    """Testo L3 → [Op] validate; OpError alla prima OP non valida."""
+    blocks, ops = split_ops(text), []
+    for m in _OP_HEADING.finditer(text):
+        if any(op.id == m.group(1) for op in ops):
+            raise OpError(m.group(1), "id OP duplicato")
+        ops.append(parse_op(m.group(1), m.group(2).strip(), text.count("\n", 0, m.start()) + 1,
+                            blocks[m.group(1)]))
+    if not ops:
+        raise OpError("L3", "nessuna '### OP-xxx' trovata")
+    return validate(ops)
+
+
+def load(path=L3_PATH):
+    return parse(Path(path).read_text(encoding="utf-8"))
+
+
+# ============================================================
+# DESCRIZIONE DICHIARATIVA (modalità MCP LIVE)
+# ============================================================
+SUN_DISTANCE = 20.0
+
+
+def material_spec(p):
+    """params di un'OP material → spec per materials.from_spec()."""
+    if p["source"] == "library":
+        if p["preset"] == "rame_brunito":
+            return dict(builder="rame", overrides={})
+        return dict(builder="preset", key=p["preset"], overrides={})
+    if p["source"] == "glass":
+        return dict(builder="glass", color=p["color"], roughness=p["roughness"], ior=p["ior"],
+                    outer=p.get("outer"))
+    return dict(builder="flat", color=p["color"] or (0.8, 0.8, 0.8, 1.0),
+                roughness=p.get("roughness", 0.5), specular=p.get("specular"))
+
+
+def scene_description(ops):
+    """IR → stato desiderato della scena, per nome stabile (homeforge/scene_diff.py).
+
+    {materials: {nome: spec}, objects: {nome: {data, location, rotation|target,
+    material, modifiers, role}}, world, render}. I boolean restano modifier vivi
+    (apply_modifiers è ignorata): spostare un'apertura = spostare il suo cutter.
+    render e composite non fanno parte dello stato.
+    """
+    desc = dict(materials={}, objects={}, world=None, render=None)
+    objects = desc["objects"]
+    target = (0.0, 0.0, 0.0)
+    for op in ops:
+        p = op.params
+        if op.kind == "material":
+            desc["materials"][p["name"]] = material_spec(p)
+        elif op.kind in ("box", "box_loop"):
+            for o in p["objects"]:
+                objects[o["name"]] = dict(
+                    data=dict(type="box", dims=list(o["dims"]), shared=p["shared"]),
+                    location=list(o["location"]), rotation=[0.0, 0.0, 0.0],
+                    material=p["material"], modifiers=[dict(m) for m in p["modifiers"]])
+        elif op.kind == "boolean_cut":
+            c = p["cutter"]
+            objects[c["name"]] = dict(data=dict(type="box", dims=list(c["dims"]), shared=False),
+                                      location=list(c["location"]), rotation=[0.0, 0.0, 0.0],
+                                      material=None, modifiers=[], role="cutter")
+            objects[p["target"]]["modifiers"].append(
+                dict(type="BOOLEAN", object=c["name"], operation=p["operation"], solver=p["solver"]))
+        elif op.kind == "mesh_custom":
+            objects[p["name"]] = dict(
+                data=dict(type="custom", verts=[list(v) for v in p["verts"]],
+                          faces=[list(f) for f in p["faces"]], smooth=p["smooth"]),
+                location=[0.0, 0.0, 0.0], rotation=[0.0, 0.0, 0.0],
+                material=p["material"], modifiers=[])
+        elif op.kind == "camera_setup":
+            target = p["target"]
+            objects["Camera"] = dict(
+                data=dict(type="camera", lens=p["lens"], sensor_width=p["sensor"],
+                          clip_end=p["clip_end"]),
+                location=list(p["location"]), target=list(target), material=None, modifiers=[])
+        elif op.kind == "world_setup":
+            desc["world"] = dict(sky=p["sky"], strength=p["strength"])
+            if p["sun"]:
+                d = p["sun"].get("direction", (0, 0, -1))
+                norm = sum(v * v for v in d) ** 0.5 or 1.0
+                location = [t - v / norm * SUN_DISTANCE for t, v in zip(target, d)]
+                objects["Sun"] = dict(data=dict(type="light", light="SUN", energy=p["sun"].get("energy", 1.0),
+                                                angle=p["sun"].get("angle", 0.00918)),
+                                      location=location, target=list(target), material=None, modifiers=[])
+            if p["fill"]:
+                objects["Fill"] = dict(data=dict(type="light", light="AREA", energy=p["fill"].get("energy", 10.0),
+                                                 size=p["fill"].get("size", 1.0)),
+                                       location=list(p["fill"].get("position", (0, -8, 6))),
+                                       target=list(target), material=None, modifiers=[])
+        elif op.kind == "render_setup":
+            desc["render"] = {k: p[k] for k in ("engine", "resolution", "film_transparent",
+                                                "file_format", "color_mode")}
+    return desc
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — parser operazioni L3")
+    ap.add_argument("path", nargs="?", default=str(L3_PATH))
+    ap.add_argument("--json", action="store_true", help="stampa l'IR completa")
+    ap.add_argument("--describe", action="store_true", help="stampa lo stato scena desiderato")
+    args = ap.parse_args(script_args() if argv is None else argv)
+    try:
+        ops = load(args.path)
+    except OpError as e:
+        print(f"L3 non valido — {e}")
+        return 1
+    if args.json:
+        print(json.dumps([op.as_dict() for op in ops], indent=2, default=list))
+        return 0
+    if args.describe:
+        print(json.dumps(scene_description(ops), indent=2, default=list))
+        return 0
+    for op in ops:
+        names = op.objects or ([op.params["name"]] if op.kind == "material" else [])
+        label = ", ".join(names[:4]) + (f" … (+{len(names) - 4})" if len(names) > 4 else "")
+        print(f"  {op.id:<11} {op.kind:<16} {label}")
+    print(f"{len(ops)} OP valide")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
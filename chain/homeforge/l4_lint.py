@@ -0,0 +1,463 @@
+"""
+HomeForge AI — Lint statico di chain/L4_script.py (senza Blender)
+La checklist pre-generazione e gli anti-pattern di agents/L4_executor.md
+(`scene.node_tree`, sky NISHITA, boolean FAST, `mat.cycles.displacement_method`,
+`AgX - Medium Contrast`, ...) sono controllati a mano: ogni svista costa un
+avvio di Blender e un render parziale. Qui lo script è letto con `ast`, in
+pochi millisecondi, e ogni violazione diventa un finding
+{rule, level, line, col, message, fix} — L4 corregge e rilancia il lint
+prima del render.
+
+Oltre ai pattern testuali: path relativi, directory di output inesistenti e mai
+create, compositing senza film_transparent = True, texture che non esistono in
+chain/materials/textures/. I path sono valutati staticamente quando sono
+costanti (Path(__file__).parent / "materials" / ..., f-string con costanti).
+
+    python chain/homeforge/l4_lint.py                     # chain/L4_script.py
+    python chain/homeforge/l4_lint.py --json              # findings in JSON
+    python chain/homeforge/l4_lint.py chain/*.py --strict # anche i warning → exit 1
+
+Exit code 1 se c'è almeno un errore (con --strict anche un warning).
+"""
+import os
+import re
+import ast
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import CHAIN_DIR, PROJECT_DIR, TEX_DIR, script_args
+
+L4_SCRIPT = CHAIN_DIR / "L4_script.py"
+
+ERROR = "error"
+WARN = "warn"
+
+# id → (livello, correzione suggerita); il messaggio è costruito dal controllo
+RULES = {
+    "syntax": (ERROR, "correggere la sintassi: Blender non carica lo script"),
+    "scene-node-tree": (ERROR, "Blender 5.0: usare scene.compositing_node_group"),
+    "sky-nishita": (ERROR, "sky_type = 'HOSEK_WILKIE' (NISHITA rimosso in 5.0)"),
+    "boolean-fast": (ERROR, "solver = 'EXACT' (o 'FLOAT' / 'MANIFOLD'); FAST non esiste in 5.0"),
+    "cycles-displacement": (ERROR, "usare mat.displacement_method"),
+    "cycles-feature-set": (ERROR, "rimosso in 5.0: displacement solo BUMP, nessun feature_set"),
+    "agx-look": (ERROR, "look = 'AgX - Base Contrast'"),
+    "agx-look-fallback": (WARN, "look = 'AgX - Base Contrast' senza try/except: il ramo try fallisce sempre"),
+    "subdiv-box": (WARN, "niente Subdivision Surface su box architettonici (box → sfera)"),
+    "texcoord-object": (WARN, "TexCoord 'Generated' + projection 'BOX' sui box"),
+    "relative-path": (ERROR, "usare Path(__file__) o un path assoluto"),
+    "output-dir": (ERROR, "OUTPUT_DIR.mkdir(parents=True, exist_ok=True) prima del render"),
+    "film-transparent": (ERROR, "scene.render.film_transparent = True prima del render da compositare"),
+    "texture-missing": (ERROR, "texture assente in chain/materials/textures/: scaricarla o correggere il nome"),
+}
+
+# Chiamate/attributi che ricevono un path di file
+PATH_KEYWORDS = {"filepath", "filepath_raw", "directory"}
+PATH_CALLS = {"load", "open", "save_as_mainfile", "open_mainfile", "save_render", "load_image",
+              "composite_on_photo", "composite_batch", "imread", "imwrite"}
+MKDIR_CALLS = {"mkdir", "makedirs"}
+COMPOSITE_NAMES = {"composite_on_photo", "composite_batch", "alpha_over", "composite"}
+AGX_INVALID = "AgX - Medium Contrast"
+AGX_VALID = "AgX - Base Contrast"
+IMAGE_EXT = (".jpg", ".jpeg", ".png", ".exr", ".hdr", ".tif", ".tiff")
+# Come materials.TEX_MAPS (materials.py importa bpy)
+TEX_MAPS = {"diff": "diff_2k.jpg", "nor": "nor_gl_2k.jpg", "rough": "rough_2k.jpg",
+            "disp": "disp_2k.png", "ao": "ao_2k.jpg"}
+# Nomi Poly Haven (asset_diff_2k.jpg, asset_nor_gl_4k.png, ...)
+POLYHAVEN_RE = re.compile(r"^[a-z0-9_]+_(diff|nor_gl|nor_dx|rough|disp|ao|arm|metal|spec)_\d+k\.\w+$")
+
+
+def finding(rule, node, message):
+    level, fix = RULES[rule]
+    return dict(rule=rule, level=level, line=getattr(node, "lineno", 0),
+                col=getattr(node, "col_offset", 0), message=message, fix=fix)
+
+
+def _dotted(node):
+    """ast di a.b.c → 'a.b.c' (None se non è una catena di nomi/attributi)."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+        return ".".join(reversed(parts))
+    if isinstance(node, ast.Subscript):                 # bpy.data.scenes["Scene"]
+        inner = _dotted(node.value)
+        return None if inner is None else ".".join([inner + "[]"] + list(reversed(parts)))
+    if isinstance(node, ast.Call):                      # bpy.data.scenes.get("Scene")
+        inner = _dotted(node.func)
+        return None if inner is None else ".".join([inner + "()"] + list(reversed(parts)))
+    return None
+
+
+def _call_name(node):
+    func = node.func
+    return func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+
+
+def _const(node):
+    return node.value if isinstance(node, ast.Constant) else None
+
+
+# ============================================================
+# VALUTAZIONE STATICA DEI PATH
+# ============================================================
+class PathEval:
+    """Valuta espressioni di path costanti: Path(__file__), .parent, /, str(),
+    os.path.join, f-string e nomi assegnati una sola volta. None se non costante."""
+
+    def __init__(self, script):
+        self.script = Path(script).resolve()
+        self.env = {}
+        self.ambiguous = set()
+
+    def bind(self, tree):
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 \
+                    and isinstance(node.targets[0], ast.Name):
+                name = node.targets[0].id
+                value = self(node.value)
+                if name in self.env and self.env[name] != value:
+                    self.ambiguous.add(name)    # riassegnato: valore non statico
+                self.env[name] = value
+        for name in self.ambiguous:
+            self.env[name] = None
+
+    def __call__(self, node):
+        try:
+            return self._eval(node)
+        except (TypeError, ValueError, AttributeError):
+            return None
+
+    def _eval(self, node):
+        if isinstance(node, ast.Constant):
+            return node.value if isinstance(node.value, str) else None
+        if isinstance(node, ast.Name):
+            if node.id == "__file__":
+                return self.script
+            if node.id in ("CHAIN_DIR", "PROJECT_DIR", "TEX_DIR") and node.id not in self.env:
+                return {"CHAIN_DIR": CHAIN_DIR, "PROJECT_DIR": PROJECT_DIR, "TEX_DIR": TEX_DIR}[node.id]
+            return self.env.get(node.id)
+        if isinstance(node, ast.Attribute):
+            base = self._eval(node.value)
+            if base is None:
+                return None
+            if node.attr == "parent":
+                return Path(base).parent
+            if node.attr in ("stem", "name"):
+                return getattr(Path(base), node.attr)
+            return None
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Div):
+            left, right = self._eval(node.left), self._eval(node.right)
+            return None if left is None or right is None else Path(left) / right
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            left, right = self._eval(node.left), self._eval(node.right)
+            return left + right if isinstance(left, str) and isinstance(right, str) else None
+        if isinstance(node, ast.JoinedStr):
+            parts = []
+            for value in node.values:
+                part = self._eval(value.value) if isinstance(value, ast.FormattedValue) else value.value
+                if part is None or (isinstance(value, ast.FormattedValue) and value.format_spec):
+                    return None
+                parts.append(str(part))
+            return "".join(parts)
+        if isinstance(node, ast.Call):
+            name = _dotted(node.func) or ""
+            args = [self._eval(a) for a in node.args]
+            if any(a is None for a in args):
+                return None
+            if name in ("Path", "pathlib.Path") and args:
+                return Path(*args)
+            if name == "str" and len(args) == 1:
+                return str(args[0])
+            if name == "os.path.join" and args:
+                return os.path.join(*map(str, args))
+            if name in ("os.path.dirname",) and len(args) == 1:
+                return os.path.dirname(str(args[0]))
+            if name in ("os.path.abspath", "os.path.realpath") and len(args) == 1:
+                return os.path.abspath(str(args[0]))
+            if isinstance(node.func, ast.Attribute) and node.func.attr in ("resolve", "absolute") \
+                    and not node.args:
+                base = self._eval(node.func.value)
+                return None if base is None else Path(base)
+            if isinstance(node.func, ast.Attribute) and node.func.attr == "with_suffix" and len(args) == 1:
+                base = self._eval(node.func.value)
+                return None if base is None else Path(base).with_suffix(args[0])
+        return None
+
+
+def _relative(text):
+    """Path relativo alla directory di lancio (non '//' di Blender, non assoluto)."""
+    return bool(text) and not text.startswith("//") and not os.path.isabs(text) \
+        and ("/" in text or "\\" in text or Path(text).suffix != "")
+
+
+# ============================================================
+# CONTROLLI
+# ============================================================
+class Linter(ast.NodeVisitor):
+
+    def __init__(self, script):
+        self.script = Path(script)
+        self.paths = PathEval(script)
+        self.findings = []
+        self.scenes = {"scene"}          # nomi che riferiscono una scena
+        self.outputs = []                # (nodo, path) dei file scritti
+        self.created = []                # directory create (mkdir / makedirs), se statiche
+        self.guarded = set()             # id dei nodi nel try di un fallback AgX documentato
+        self.composite = None            # primo nodo di compositing
+        self.transparent = []            # valori assegnati a film_transparent
+        self.textures = set()
+
+    def add(self, rule, node, message):
+        self.findings.append(finding(rule, node, message))
+
+    def run(self, tree):
+        self.paths.bind(tree)
+        for node in ast.walk(tree):      # alias: s = bpy.context.scene, ...
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 \
+                    and isinstance(node.targets[0], ast.Name) and self._is_scene(node.value):
+                self.scenes.add(node.targets[0].id)
+            # try: look = 'AgX - Medium Contrast' / except: look = 'AgX - Base Contrast'
+            if isinstance(node, ast.Try) and any(
+                    _const(n) == AGX_VALID for h in node.handlers for n in ast.walk(h)):
+                self.guarded.update(id(n) for stmt in node.body for n in ast.walk(stmt))
+        self.visit(tree)
+        self._finish(tree)
+        self.findings.sort(key=lambda f: (f["line"], f["col"], f["rule"]))
+        return self.findings
+
+    def _is_scene(self, node):
+        dotted = _dotted(node) or ""
+        last = dotted.rsplit(".", 1)[-1]
+        return last in self.scenes or last in ("scene", "scenes[]", "new_scene()") \
+            or dotted.endswith("scenes.get()") or dotted.endswith("scenes.new()")
+
+    # --- API Blender 5.0 ---
+    def visit_Attribute(self, node):
+        dotted = _dotted(node) or ""
+        if node.attr == "node_tree" and self._is_scene(node.value):
+            self.add("scene-node-tree", node, f"`{dotted}` non esiste in Blender 5.0")
+        elif node.attr == "displacement_method" and dotted.endswith(".cycles.displacement_method"):
+            self.add("cycles-displacement", node, f"`{dotted}` rimosso in Blender 5.0")
+        elif node.attr == "feature_set" and ".cycles" in f".{dotted}":
+            self.add("cycles-feature-set", node, f"`{dotted}` rimosso in Blender 5.0")
+        self.generic_visit(node)
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, str):
+            if node.value.upper() == "NISHITA":
+                self.add("sky-nishita", node, "sky_type 'NISHITA' rimosso in Blender 5.0")
+            elif node.value == AGX_INVALID and id(node) in self.guarded:
+                self.add("agx-look-fallback", node,
+                         f"look {AGX_INVALID!r} non esiste in Blender 5.0 (ripiega sul ramo except)")
+            elif node.value == AGX_INVALID:
+                self.add("agx-look", node, f"look {AGX_INVALID!r} non esiste in Blender 5.0")
+            elif node.value.lower().endswith(IMAGE_EXT):
+                self._texture_literal(node, node.value)
+
+    def visit_JoinedStr(self, node):
+        text = self.paths(node)
+        if isinstance(text, str) and text.lower().endswith(IMAGE_EXT):
+            self._texture_literal(node, text)
+            # le parti costanti ("/x_diff_2k.jpg") sono già nel path: solo le espressioni
+            for value in node.values:
+                if isinstance(value, ast.FormattedValue):
+                    self.visit(value)
+            return
+        self.generic_visit(node)
+
+    def visit_Assign(self, node):
+        for target in node.targets:
+            self._assigned(target, node.value, node)
+        self.generic_visit(node)
+
+    def _assigned(self, target, value, node):
+        if not isinstance(target, ast.Attribute):
+            return
+        if target.attr == "solver" and _const(value) == "FAST":
+            self.add("boolean-fast", value, "boolean solver 'FAST' non esiste in Blender 5.0")
+        elif target.attr == "film_transparent":
+            self.transparent.append(_const(value))
+        elif target.attr in PATH_KEYWORDS:
+            self._path_value(value, target.attr, output=True)
+
+    def visit_Call(self, node):
+        name = _call_name(node)
+        dotted = _dotted(node.func) or ""
+        for kw in node.keywords:
+            if kw.arg == "solver" and _const(kw.value) == "FAST":
+                self.add("boolean-fast", kw.value, "boolean solver 'FAST' non esiste in Blender 5.0")
+            elif kw.arg in PATH_KEYWORDS:
+                self._path_value(kw.value, kw.arg, output=name in ("save_as_mainfile", "save_render"))
+            elif kw.arg == "type" and _const(kw.value) == "SUBSURF":
+                self.add("subdiv-box", node, "modifier SUBSURF: sui box arrotonda tutto")
+        if name == "new" and dotted.endswith("modifiers.new") \
+                and any(_const(a) == "SUBSURF" for a in node.args):
+            self.add("subdiv-box", node, "modifier SUBSURF: sui box arrotonda tutto")
+        if dotted.endswith("ops.object.subdivision_set"):
+            self.add("subdiv-box", node, "subdivision_set: sui box arrotonda tutto")
+        if name in PATH_CALLS:
+            for i, arg in enumerate(node.args):     # composite_on_photo(model, foto, output)
+                self._path_value(arg, name, output=name == "composite_on_photo" and i == 2)
+        if name in ("Path",) and node.args and isinstance(node.args[0], ast.Constant) \
+                and isinstance(node.args[0].value, str) and _relative(node.args[0].value):
+            self.add("relative-path", node, f"Path({node.args[0].value!r}) dipende dalla directory di lancio")
+        if name in MKDIR_CALLS:
+            self._created(node, name)
+        if name in COMPOSITE_NAMES and self.composite is None:
+            self.composite = node
+        if name == "texture_set" and node.args:
+            asset = self.paths(node.args[0])
+            if isinstance(asset, str):
+                self._texture_asset(node, asset)
+        self.generic_visit(node)
+
+    def visit_Subscript(self, node):
+        # TexCoord.outputs["Object"] → proiezione che stira le texture sui box
+        if _const(node.slice) == "Object" and (_dotted(node.value) or "").endswith("outputs"):
+            self.add("texcoord-object", node, "TexCoord 'Object' su box stira le texture")
+        self.generic_visit(node)
+
+    # --- path ---
+    def _path_value(self, value, where, output):
+        text = _const(value)
+        if isinstance(text, str) and _relative(text):
+            self.add("relative-path", value, f"{where} = {text!r} dipende dalla directory di lancio")
+            return
+        if output:
+            path = self.paths(value)
+            if path is not None:
+                self.outputs.append((value, Path(str(path))))
+
+    def _created(self, node, name):
+        # OUT_DIR.mkdir(...) / os.makedirs(OUT_DIR, ...): conta solo se il path è statico
+        if name == "mkdir" and isinstance(node.func, ast.Attribute):
+            target = self.paths(node.func.value)
+        else:
+            target = self.paths(node.args[0]) if node.args else None
+        if target is not None:
+            self.created.append(Path(str(target)))
+
+    def _covered(self, directory):
+        """True se la directory esiste o è creata dallo script (anche come parent)."""
+        return directory.exists() or any(
+            directory == made or directory in made.parents for made in self.created)
+
+    # --- texture ---
+    def _texture_literal(self, node, text):
+        name = Path(text).name
+        if not POLYHAVEN_RE.match(name):
+            return
+        full = Path(text)
+        if not full.is_absolute():
+            full = TEX_DIR / name
+        self._texture_check(node, full)
+
+    def _texture_check(self, node, path):
+        key = str(path)
+        if key in self.textures:
+            return
+        self.textures.add(key)
+        if not Path(path).exists():
+            self.add("texture-missing", node, f"{Path(path).name} non trovata in {_rel(TEX_DIR)}")
+
+    def _texture_asset(self, node, asset):
+        maps = ("diff",)
+        for kw in node.keywords:
+            if kw.arg == "maps" and isinstance(kw.value, (ast.Tuple, ast.List)):
+                maps = tuple(_const(e) for e in kw.value.elts if isinstance(_const(e), str))
+        if len(node.args) > 1 and isinstance(node.args[1], (ast.Tuple, ast.List)):
+            maps = tuple(_const(e) for e in node.args[1].elts if isinstance(_const(e), str))
+        for m in maps:
+            if m in TEX_MAPS:
+                self._texture_check(node, TEX_DIR / f"{asset}_{TEX_MAPS[m]}")
+
+    # --- controlli globali ---
+    def _finish(self, tree):
+        if self.composite is not None:
+            if not self.transparent:
+                self.add("film-transparent", self.composite,
+                         "compositing senza scene.render.film_transparent = True")
+            elif True not in self.transparent:
+                self.add("film-transparent", self.composite,
+                         "compositing con film_transparent = False: lo sfondo copre la foto")
+        seen = set()
+        for node, path in self.outputs:
+            directory = path.parent if path.suffix else path
+            if str(directory) in seen or self._covered(directory):
+                continue
+            seen.add(str(directory))
+            self.add("output-dir", node, f"{_rel(directory)} non esiste e lo script non la crea")
+
+
+def _rel(path):
+    try:
+        return str(Path(path).resolve().relative_to(PROJECT_DIR))
+    except ValueError:
+        return str(path)
+
+
+# ============================================================
+# API
+# ============================================================
+def lint_source(source, path=L4_SCRIPT):
+    """Findings per il sorgente di uno script L4 (path: per i path relativi a __file__)."""
+    try:
+        tree = ast.parse(source, filename=str(path))
+    except SyntaxError as exc:
+        node = ast.Module(body=[], type_ignores=[])
+        node.lineno, node.col_offset = exc.lineno or 0, max((exc.offset or 1) - 1, 0)
+        return [finding("syntax", node, exc.msg)]
+    return Linter(path).run(tree)
+
+
+def lint(path=L4_SCRIPT):
+    """Findings di uno script: lista di {rule, level, line, col, message, fix}."""
+    path = Path(path)
+    return lint_source(path.read_text(encoding="utf-8"), path)
+
+
+def errors(findings, strict=False):
+    return [f for f in findings if f["level"] == ERROR or strict]
+
+
+def print_report(path, findings):
+    for f in findings:
+        print(f"{_rel(path)}:{f['line']}:{f['col']}: {f['level']} [{f['rule']}] {f['message']}")
+        print(f"    → {f['fix']}")
+    n_err = len(errors(findings))
+    print(f"{_rel(path)}: {n_err} errori, {len(findings) - n_err} warning")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — lint statico degli script L4")
+    ap.add_argument("paths", nargs="*", default=[str(L4_SCRIPT)])
+    ap.add_argument("--json", action="store_true", help="findings in JSON (per L4)")
+    ap.add_argument("--strict", action="store_true", help="anche i warning danno exit 1")
+    args = ap.parse_args(script_args() if argv is None else argv)
+    t0 = time.perf_counter()
+    report = {}
+    for path in args.paths:
+        if not Path(path).exists():
+            ap.error(f"{path} non esiste")
+        report[path] = lint(path)
+    if args.json:
+        files = {_rel(path): findings for path, findings in report.items()}
+        print(json.dumps(dict(files=files, ms=round(1000 * (time.perf_counter() - t0), 1)),
+                         indent=2, ensure_ascii=False))
+    else:
+        for path, findings in report.items():
+            print_report(path, findings)
+    failed = any(errors(f, args.strict) for f in report.values())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,483 @@
+"""
+HomeForge AI — Libreria materiali PBR condivisa
+Nata da create_pbr_material() di render_piode_roof_pbr.py, usata da tutti gli
+script in chain/.
+
+- Immagini: cache per (path assoluto, colorspace) → ogni texture viene
+  decodificata una sola volta per sessione, anche se più materiali la usano;
+  map e ORM alla variante del livello qualità (homeforge.texture_cache).
+- Materiali: cache per fingerprint dei parametri → stesso set di parametri,
+  stesso datablock (nessun node tree ricostruito e poi buttato).
+- Report memoria immagini per materiale: memory_report() / print_memory_report().
+
+Parametri dei preset = valori finali di materials/stone_wall.md e roof_piode.md.
+"""
+import json
+import math
+import hashlib
+from pathlib import Path
+
+import bpy
+
+from homeforge import TEX_DIR, id_alive
+from homeforge import texture_cache
+
+# (path assoluto, colorspace) → bpy.types.Image
+_IMAGE_CACHE = {}
+# fingerprint → bpy.types.Material
+_MATERIAL_CACHE = {}
+
+FINGERPRINT_PROP = "hf_fingerprint"
+
+# Suffissi file Poly Haven per ogni map (disp è PNG, il resto JPG)
+TEX_MAPS = {
+    "diff": "diff_2k.jpg",
+    "nor": "nor_gl_2k.jpg",
+    "rough": "rough_2k.jpg",
+    "disp": "disp_2k.png",
+    "ao": "ao_2k.jpg",
+}
+
+# ============================================================
+# PRESET (parametri tarati nel training)
+# ============================================================
+PRESETS = {
+    # roof_piode.md §1 — patterned_slate_tiles
+    "piode": dict(
+        name="Piode_PBR", asset="patterned_slate_tiles", maps=("diff", "rough", "nor", "disp"),
+        scale=(3.0, 3.0, 3.0), rotation=(0.0, 0.0, math.radians(90)),
+        sat=0.55, val=0.70, normal_strength=2.5,
+        bump_strength=1.0, bump_distance=0.05,
+        micro_bump=dict(scale=100.0, detail=12.0, strength=0.04, distance=0.001),
+    ),
+    # roof_piode.md §2 — weathered_brown_planks
+    "legno_travi": dict(
+        name="Legno_Travi_PBR", asset="weathered_brown_planks", maps=("diff", "rough", "nor", "disp"),
+        scale=(3.0, 0.8, 3.0), sat=0.65, val=0.55, normal_strength=2.0,
+        bump_strength=0.7, bump_distance=0.015,
+    ),
+    # stone_wall.md — rock_wall_08
+    "pietra_muro": dict(
+        name="Pietra_Muro", asset="rock_wall_08", maps=("diff", "rough", "nor", "disp"),
+        scale=(1.5, 1.5, 1.5), sat=0.85, val=0.95, normal_strength=2.0,
+        bump_strength=0.8, bump_distance=0.04,
+        micro_bump=dict(scale=150.0, detail=16.0, roughness=0.8, strength=0.05, distance=0.002),
+    ),
+}
+
+# roof_piode.md §3 — procedurale, nessuna texture
+RAME_BRUNITO = dict(
+    name="Rame_Brunito", scale=(10.0, 10.0, 10.0),
+    metallic=0.95, roughness=0.35,
+    noise=dict(scale=6.0, detail=10.0, roughness=0.6),
+    color_stops=[(0.20, (0.55, 0.30, 0.15, 1.0)),   # rame caldo chiaro
+                 (0.50, (0.35, 0.18, 0.08, 1.0)),   # rame bruno medio
+                 (0.75, (0.22, 0.12, 0.06, 1.0)),   # rame scuro
+                 (0.92, (0.15, 0.08, 0.04, 1.0))],  # molto scuro
+    rough_stops=[(0.25, (0.20, 0.20, 0.20, 1.0)),   # lucido
+                 (0.70, (0.50, 0.50, 0.50, 1.0))],  # opaco
+    micro_noise=dict(scale=100.0, detail=14.0),
+    bump_strength=0.15, bump_distance=0.003,
+)
+
+
+def texture_set(asset, maps=tuple(TEX_MAPS), tex_dir=TEX_DIR):
+    """Path delle map Poly Haven di un asset: {'diff': .../asset_diff_2k.jpg, ...}."""
+    return {m: str(Path(tex_dir) / f"{asset}_{TEX_MAPS[m]}") for m in maps}
+
+
+# ============================================================
+# CACHE IMMAGINI
+# ============================================================
+def load_image(filepath, colorspace='sRGB'):
+    """Carica un'immagine una sola volta per (path assoluto, colorspace).
+
+    colorspace=None lascia quello assegnato da Blender (es. HDRI lineari).
+    Le map Poly Haven e le ORM vengono caricate alla variante 512/1K del
+    livello qualità della run (texture_cache.resolve): il 2K solo nei final.
+    """
+    key = (str(Path(texture_cache.resolve(filepath)).resolve()), colorspace)
+    img = _IMAGE_CACHE.get(key)
+    if img is not None and id_alive(img):
+        return img
+    # Datablock già presente (es. sessione MCP live, modulo ricaricato)
+    for img in bpy.data.images:
+        if (colorspace in (None, img.colorspace_settings.name) and img.filepath
+                and str(Path(bpy.path.abspath(img.filepath)).resolve()) == key[0]):
+            _IMAGE_CACHE[key] = img
+            return img
+    img = bpy.data.images.load(key[0], check_existing=False)
+    if colorspace:
+        img.colorspace_settings.name = colorspace
+    _IMAGE_CACHE[key] = img
+    return img
+
+
+# ============================================================
+# CACHE MATERIALI
+# ============================================================
+def fingerprint(kind, **params):
+    """Hash stabile dei parametri di un materiale (path texture inclusi)."""
+    blob = json.dumps([kind, params], sort_keys=True, default=list)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+
+def _cached_material(fp):
+    mat = _MATERIAL_CACHE.get(fp)
+    if mat is not None and id_alive(mat):
+        return mat
+    for mat in bpy.data.materials:
+        if mat.get(FINGERPRINT_PROP) == fp:
+            _MATERIAL_CACHE[fp] = mat
+            return mat
+    return None
+
+
+def _new_material(name, fp):
+    mat = bpy.data.materials.new(name)
+    mat.use_nodes = True
+    mat[FINGERPRINT_PROP] = fp
+    mat.node_tree.nodes.clear()
+    _MATERIAL_CACHE[fp] = mat
+    return mat
+
+
+def clear_caches():
+    """Svuota le cache (i datablock restano in bpy.data)."""
+    _IMAGE_CACHE.clear()
+    _MATERIAL_CACHE.clear()
+
+
+# ============================================================
+# MATERIALE PBR
+# ============================================================
+def create_pbr_material(name, tex_files, scale=(1.0, 1.0, 1.0), sat=1.0, val=1.0,
+                        rotation=(0.0, 0.0, 0.0), normal_strength=2.0,
+                        bump_strength=0.6, bump_distance=0.03, micro_bump=None,
+                        projection_blend=0.3, orm_maps=("ao", "rough", "disp")):
+    """Crea (o riusa) un materiale PBR da texture Poly Haven.
+
+    tex_files: {'diff', 'nor', 'rough'[, 'disp', 'ao']} → path. AO e disp sono
+    opzionali: AO moltiplica il diffuse, disp → Bump sul Normal Map.
+    Variante impacchettata (homeforge.orm_pack): {'diff', 'nor', 'orm'}, con
+    ao/rough/disp nei canali R/G/B letti da Separate Color; orm_maps = canali
+    che contengono dati (gli altri sono ignorati).
+    micro_bump: dict(scale, detail[, roughness], strength, distance) per il
+    secondo livello di bump con Noise (rugosità del singolo sasso).
+    Con gli stessi parametri ritorna il materiale già creato (anche se `name`
+    è diverso).
+    """
+    tex_files = {k: str(Path(v).resolve()) for k, v in tex_files.items()}
+    params = dict(tex_files=tex_files, scale=scale, sat=sat, val=val, rotation=rotation,
+                  normal_strength=normal_strength, bump_strength=bump_strength,
+                  bump_distance=bump_distance, micro_bump=micro_bump,
+                  projection_blend=projection_blend)
+    if "orm" in tex_files:
+        params["orm_maps"] = sorted(orm_maps)
+    fp = fingerprint("pbr", **params)
+    mat = _cached_material(fp)
+    if mat is not None:
+        return mat
+
+    mat = _new_material(name, fp)
+    mat.displacement_method = 'BUMP'
+    nt = mat.node_tree
+
+    # Output + BSDF
+    node_out = nt.nodes.new("ShaderNodeOutputMaterial")
+    node_out.location = (1200, 0)
+    node_bsdf = nt.nodes.new("ShaderNodeBsdfPrincipled")
+    node_bsdf.location = (800, 0)
+    nt.links.new(node_bsdf.outputs["BSDF"], node_out.inputs["Surface"])
+
+    # Texture Coordinate (Generated) + Mapping
+    node_tc = nt.nodes.new("ShaderNodeTexCoord")
+    node_tc.location = (-1000, 0)
+    node_map = nt.nodes.new("ShaderNodeMapping")
+    node_map.location = (-800, 0)
+    node_map.inputs["Scale"].default_value = scale
+    node_map.inputs["Rotation"].default_value = rotation
+    nt.links.new(node_tc.outputs["Generated"], node_map.inputs["Vector"])
+
+    def add_tex(label, key, colorspace, loc):
+        node = nt.nodes.new("ShaderNodeTexImage")
+        node.name = label
+        node.label = label
+        node.location = loc
+        node.image = load_image(tex_files[key], colorspace)
+        node.projection = 'BOX'
+        node.projection_blend = projection_blend
+        nt.links.new(node_map.outputs["Vector"], node.inputs["Vector"])
+        return node
+
+    # Map a un canale: immagini separate o canali R/G/B della texture ORM
+    channel = {m: add_tex(label, m, "Non-Color", loc).outputs["Color"]
+               for m, label, loc in (("ao", "AO", (-400, 150)),
+                                     ("rough", "Roughness", (-400, -100)),
+                                     ("disp", "Displacement", (-400, -600)))
+               if m in tex_files}
+    if "orm" in tex_files:
+        tex_orm = add_tex("ORM", "orm", "Non-Color", (-400, -100))
+        node_sep = nt.nodes.new("ShaderNodeSeparateColor")
+        node_sep.mode = 'RGB'
+        node_sep.location = (-150, -100)
+        nt.links.new(tex_orm.outputs["Color"], node_sep.inputs["Color"])
+        for m, out in (("ao", "Red"), ("rough", "Green"), ("disp", "Blue")):
+            if m in orm_maps:
+                channel[m] = node_sep.outputs[out]
+
+    # Diffuse (× AO) → Hue/Sat → Base Color
+    tex_diff = add_tex("Diffuse", "diff", "sRGB", (-400, 400))
+    color_out = tex_diff.outputs["Color"]
+    if "ao" in channel:
+        node_mix = nt.nodes.new("ShaderNodeMix")
+        node_mix.data_type = 'RGBA'
+        node_mix.blend_type = 'MULTIPLY'
+        node_mix.location = (0, 300)
+        node_mix.inputs["Factor"].default_value = 1.0
+        nt.links.new(color_out, node_mix.inputs[6])              # A (color)
+        nt.links.new(channel["ao"], node_mix.inputs[7])          # B (color)
+        color_out = node_mix.outputs[2]
+
+    node_hsv = nt.nodes.new("ShaderNodeHueSaturation")
+    node_hsv.location = (300, 300)
+    node_hsv.inputs["Saturation"].default_value = sat
+    node_hsv.inputs["Value"].default_value = val
+    nt.links.new(color_out, node_hsv.inputs["Color"])
+    nt.links.new(node_hsv.outputs["Color"], node_bsdf.inputs["Base Color"])
+
+    # Roughness
+    if "rough" in channel:
+        nt.links.new(channel["rough"], node_bsdf.inputs["Roughness"])
+
+    # Normal Map
+    tex_nor = add_tex("Normal", "nor", "Non-Color", (-400, -350))
+    node_normal = nt.nodes.new("ShaderNodeNormalMap")
+    node_normal.location = (0, -350)
+    node_normal.inputs["Strength"].default_value = normal_strength
+    nt.links.new(tex_nor.outputs["Color"], node_normal.inputs["Color"])
+    normal_out = node_normal.outputs["Normal"]
+
+    # Displacement → Bump (livello 1: giunti e lastre)
+    if "disp" in channel:
+        node_bump = nt.nodes.new("ShaderNodeBump")
+        node_bump.location = (300, -500)
+        node_bump.inputs["Strength"].default_value = bump_strength
+        node_bump.inputs["Distance"].default_value = bump_distance
+        nt.links.new(channel["disp"], node_bump.inputs["Height"])
+        nt.links.new(normal_out, node_bump.inputs["Normal"])
+        normal_out = node_bump.outputs["Normal"]
+
+    # Noise micro → Bump (livello 2: rugosità singolo sasso)
+    if micro_bump:
+        node_noise = nt.nodes.new("ShaderNodeTexNoise")
+        node_noise.location = (0, -800)
+        node_noise.inputs["Scale"].default_value = micro_bump["scale"]
+        node_noise.inputs["Detail"].default_value = micro_bump["detail"]
+        if "roughness" in micro_bump:
+            node_noise.inputs["Roughness"].default_value = micro_bump["roughness"]
+        nt.links.new(node_map.outputs["Vector"], node_noise.inputs["Vector"])
+        node_bump2 = nt.nodes.new("ShaderNodeBump")
+        node_bump2.location = (550, -650)
+        node_bump2.inputs["Strength"].default_value = micro_bump["strength"]
+        node_bump2.inputs["Distance"].default_value = micro_bump["distance"]
+        nt.links.new(node_noise.outputs["Fac"], node_bump2.inputs["Height"])
+        nt.links.new(normal_out, node_bump2.inputs["Normal"])
+        normal_out = node_bump2.outputs["Normal"]
+
+    nt.links.new(normal_out, node_bsdf.inputs["Normal"])
+    return mat
+
+
+def preset_material(key, name=None, packed=False, **overrides):
+    """Materiale PBR da PRESETS; overrides sostituisce singoli parametri.
+
+    packed=True: rough/disp (e ao) da una texture ORM (homeforge.orm_pack), se
+    l'asset ha almeno due di queste map; altrimenti le map separate.
+    """
+    params = dict(PRESETS[key], **overrides)
+    asset = params.pop("asset")
+    maps = params.pop("maps")
+    default_name = params.pop("name")
+    if packed:
+        from homeforge.orm_pack import packed_texture_set
+        tex_files, params["orm_maps"] = packed_texture_set(asset, maps)
+    else:
+        tex_files = texture_set(asset, maps)
+    return create_pbr_material(name or default_name, tex_files, **params)
+
+
+def create_rame_brunito(name=None, **overrides):
+    """Rame brunito procedurale (roof_piode.md §3): Noise → 2 ColorRamp + micro Bump."""
+    p = dict(RAME_BRUNITO, **overrides)
+    default_name = p.pop("name")
+    fp = fingerprint("rame", **p)
+    mat = _cached_material(fp)
+    if mat is not None:
+        return mat
+
+    mat = _new_material(name or default_name, fp)
+    nt = mat.node_tree
+    ns, lk = nt.nodes, nt.links
+
+    out = ns.new("ShaderNodeOutputMaterial"); out.location = (1400, 0)
+    bsdf = ns.new("ShaderNodeBsdfPrincipled"); bsdf.location = (1000, 0)
+    bsdf.inputs["Metallic"].default_value = p["metallic"]
+    bsdf.inputs["Roughness"].default_value = p["roughness"]
+    lk.new(bsdf.outputs["BSDF"], out.inputs["Surface"])
+
+    tc = ns.new("ShaderNodeTexCoord"); tc.location = (-800, 0)
+    mapping = ns.new("ShaderNodeMapping"); mapping.location = (-600, 0)
+    mapping.inputs["Scale"].default_value = p["scale"]
+    lk.new(tc.outputs["Generated"], mapping.inputs["Vector"])
+
+    noise = ns.new("ShaderNodeTexNoise"); noise.location = (-300, 200)
+    noise.inputs["Scale"].default_value = p["noise"]["scale"]
+    noise.inputs["Detail"].default_value = p["noise"]["detail"]
+    noise.inputs["Roughness"].default_value = p["noise"]["roughness"]
+    lk.new(mapping.outputs["Vector"], noise.inputs["Vector"])
+
+    def ramp(stops, loc, target):
+        node = ns.new("ShaderNodeValToRGB"); node.location = loc
+        elements = node.color_ramp.elements
+        for i, (pos, color) in enumerate(stops):
+            el = elements[i] if i < 2 else elements.new(pos)
+            el.position = pos
+            el.color = color
+        lk.new(noise.outputs["Fac"], node.inputs["Fac"])
+        lk.new(node.outputs["Color"], bsdf.inputs[target])
+        return node
+
+    ramp(p["color_stops"], (200, 200), "Base Color")
+    ramp(p["rough_stops"], (200, -100), "Roughness")
+
+    micro = ns.new("ShaderNodeTexNoise"); micro.location = (200, -400)
+    micro.inputs["Scale"].default_value = p["micro_noise"]["scale"]
+    micro.inputs["Detail"].default_value = p["micro_noise"]["detail"]
+    lk.new(mapping.outputs["Vector"], micro.inputs["Vector"])
+    bump = ns.new("ShaderNodeBump"); bump.location = (600, -300)
+    bump.inputs["Strength"].default_value = p["bump_strength"]
+    bump.inputs["Distance"].default_value = p["bump_distance"]
+    lk.new(micro.outputs["Fac"], bump.inputs["Height"])
+    lk.new(bump.outputs["Normal"], bsdf.inputs["Normal"])
+    return mat
+
+
+def create_flat_material(name, color, roughness=0.5, specular=None):
+    """Principled semplice (terreno, legno scuro OP-005, porta OP-006)."""
+    fp = fingerprint("flat", color=color, roughness=roughness, specular=specular)
+    mat = _cached_material(fp)
+    if mat is not None:
+        return mat
+    mat = bpy.data.materials.new(name)
+    mat.use_nodes = True
+    mat[FINGERPRINT_PROP] = fp
+    bsdf = mat.node_tree.nodes["Principled BSDF"]
+    bsdf.inputs["Base Color"].default_value = color
+    bsdf.inputs["Roughness"].default_value = roughness
+    if specular is not None:
+        bsdf.inputs["Specular IOR Level"].default_value = specular
+    _MATERIAL_CACHE[fp] = mat
+    return mat
+
+
+def create_glass_material(name, color, roughness=0.0, ior=1.5, outer=None):
+    """Vetro OP-003: Glass BSDF; con outer={color, metallic, roughness} mix Fresnel
+    verso un Principled scuro (riflesso esterno del vetro)."""
+    fp = fingerprint("glass", color=color, roughness=roughness, ior=ior, outer=outer)
+    mat = _cached_material(fp)
+    if mat is not None:
+        return mat
+    mat = _new_material(name, fp)
+    nt = mat.node_tree
+    ns, lk = nt.nodes, nt.links
+
+    out = ns.new("ShaderNodeOutputMaterial"); out.location = (600, 0)
+    glass = ns.new("ShaderNodeBsdfGlass"); glass.location = (0, 100)
+    glass.inputs["Color"].default_value = color
+    glass.inputs["Roughness"].default_value = roughness
+    glass.inputs["IOR"].default_value = ior
+    if outer is None:
+        lk.new(glass.outputs["BSDF"], out.inputs["Surface"])
+        return mat
+
+    fresnel = ns.new("ShaderNodeFresnel"); fresnel.location = (0, 300)
+    fresnel.inputs["IOR"].default_value = ior
+    bsdf = ns.new("ShaderNodeBsdfPrincipled"); bsdf.location = (0, -200)
+    bsdf.inputs["Base Color"].default_value = outer["color"]
+    bsdf.inputs["Metallic"].default_value = outer["metallic"]
+    bsdf.inputs["Roughness"].default_value = outer["roughness"]
+    mix = ns.new("ShaderNodeMixShader"); mix.location = (300, 0)
+    lk.new(fresnel.outputs["Fac"], mix.inputs["Fac"])
+    lk.new(glass.outputs["BSDF"], mix.inputs[1])
+    lk.new(bsdf.outputs["BSDF"], mix.inputs[2])
+    lk.new(mix.outputs["Shader"], out.inputs["Surface"])
+    return mat
+
+
+def from_spec(spec, name=None):
+    """Materiale da spec dichiarativa {builder, ...} (homeforge/l3_ops.material_spec)."""
+    spec = dict(spec)
+    builder = spec.pop("builder")
+    if builder == "preset":
+        return preset_material(spec["key"], **{"packed": True, **spec.get("overrides", {})})
+    if builder == "rame":
+        return create_rame_brunito(**spec.get("overrides", {}))
+    if builder == "glass":
+        return create_glass_material(name or "Vetro", **spec)
+    if builder == "flat":
+        return create_flat_material(name or "Flat", **spec)
+    raise ValueError(f"Builder materiale sconosciuto: {builder!r}")
+
+
+# ============================================================
+# REPORT MEMORIA
+# ============================================================
+def image_bytes(img):
+    """Memoria stimata del buffer decodificato (w × h × canali × byte/canale)."""
+    w, h = img.size
+    return w * h * img.channels * (4 if img.is_float else 1)
+
+
+def material_images(mat):
+    """Immagini usate dal node tree di un materiale (gruppi inclusi)."""
+    found = []
+
+    def walk(tree):
+        for node in tree.nodes:
+            if node.type == 'TEX_IMAGE' and node.image and node.image not in found:
+                found.append(node.image)
+            elif node.type == 'GROUP' and node.node_tree:
+                walk(node.node_tree)
+
+    if mat.node_tree:
+        walk(mat.node_tree)
+    return found
+
+
+def memory_report(materials=None):
+    """[{material, images, bytes, shared}] — shared = immagini usate anche da altri materiali."""
+    materials = list(materials or bpy.data.materials)
+    users = {}
+    per_mat = []
+    for mat in materials:
+        imgs = material_images(mat)
+        per_mat.append((mat, imgs))
+        for img in imgs:
+            users[img.name] = users.get(img.name, 0) + 1
+    return [dict(material=mat.name,
+                 images=[img.name for img in imgs],
+                 bytes=sum(image_bytes(img) for img in imgs),
+                 shared=[img.name for img in imgs if users[img.name] > 1])
+            for mat, imgs in per_mat]
+
+
+def print_memory_report(materials=None):
+    rows = memory_report(materials)
+    total = sum(image_bytes(img) for img in bpy.data.images if img.has_data)
+    print(f"{'Materiale':<24} {'Img':>4} {'MB':>8}  Condivise")
+    for r in rows:
+        print(f"{r['material']:<24} {len(r['images']):>4} {r['bytes'] / 2**20:>8.1f}  "
+              f"{', '.join(r['shared']) or '-'}")
+    print(f"{'Immagini in memoria':<24} {len(bpy.data.images):>4} {total / 2**20:>8.1f}")
+    return rows
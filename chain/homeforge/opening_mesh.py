@@ -0,0 +1,106 @@
+"""
+HomeForge AI — Geometria delle aperture (NumPy, senza bpy)
+Nucleo di homeforge.openings: rettangolo di un foro passante sul muro, mesh di
+un box con fori passanti costruita direttamente, controllo manifold da indici
+di loop. Modulo puro: testabile senza Blender.
+
+    verts, faces = holed_box((0, 0, 0), (8, 0.45, 3), 1, [(1.0, 2.2, 0.9, 2.1)])
+    edge_use(faces, np.full(len(faces), 4))["manifold"]    # True
+"""
+import numpy as np
+
+EPS = 1e-5
+
+
+def _breaks(lo, hi, edges):
+    """Coordinate ordinate e senza doppioni (entro EPS) tra lo e hi."""
+    values = np.sort(np.clip(np.concatenate(([lo, hi], edges)), lo, hi))
+    return values[np.concatenate(([True], np.diff(values) > EPS))]
+
+
+def opening_rect(lo, hi, axis, cut_lo, cut_hi):
+    """Cutter [cut_lo, cut_hi] sul muro [lo, hi] (spessore lungo axis) →
+    ("through", (u0, u1, v0, v1)) | ("partial", None) | ("miss", None).
+    u = asse orizzontale del muro, v = Z."""
+    ua = 1 - axis
+    u0, u1 = max(cut_lo[ua], lo[ua]), min(cut_hi[ua], hi[ua])
+    v0, v1 = max(cut_lo[2], lo[2]), min(cut_hi[2], hi[2])
+    t0, t1 = max(cut_lo[axis], lo[axis]), min(cut_hi[axis], hi[axis])
+    if u1 - u0 <= EPS or v1 - v0 <= EPS or t1 - t0 <= EPS:
+        return "miss", None
+    if cut_lo[axis] > lo[axis] + EPS or cut_hi[axis] < hi[axis] - EPS:
+        return "partial", None
+    return "through", (u0, u1, v0, v1)
+
+
+def holed_box(lo, hi, axis, rects):
+    """Box [lo, hi] con fori passanti rects [(u0, u1, v0, v1)] lungo axis (0 = X, 1 = Y)
+    → (verts (V, 3), faces (F, 4)), normali uscenti.
+
+    Le linee dei fori attraversano tutto il muro: celle adiacenti condividono
+    gli spigoli, nessun T-junction. Facce: celle piene sulle due facce del muro
+    + un quad per ogni lato tra cella piena e cella vuota (o bordo del muro)."""
+    lo, hi = np.asarray(lo, dtype=np.float64), np.asarray(hi, dtype=np.float64)
+    ua = 1 - axis
+    us = _breaks(lo[ua], hi[ua], [u for r in rects for u in r[:2]])
+    vs = _breaks(lo[2], hi[2], [v for r in rects for v in r[2:]])
+    cu, cv = (us[:-1] + us[1:]) / 2, (vs[:-1] + vs[1:]) / 2
+    solid = np.ones((len(cu), len(cv)), dtype=bool)
+    for u0, u1, v0, v1 in rects:
+        solid &= ~(((cu > u0) & (cu < u1))[:, None] & ((cv > v0) & (cv < v1))[None, :])
+
+    nu, nv = len(us), len(vs)
+    verts = np.zeros((2, nu, nv, 3))
+    verts[..., ua], verts[..., 2] = np.meshgrid(us, vs, indexing="ij")
+    verts[0, ..., axis], verts[1, ..., axis] = lo[axis], hi[axis]
+    idx = np.arange(2 * nu * nv).reshape(2, nu, nv)
+
+    quads, normals = [], []
+
+    def add(q, axis_index, sign):
+        n = np.zeros((len(q), 3))
+        n[:, axis_index] = sign
+        quads.append(q)
+        normals.append(n)
+
+    i, j = np.nonzero(solid)
+    for side, sign in ((0, -1.0), (1, 1.0)):                    # facce del muro
+        f = idx[side]
+        add(np.stack([f[i, j], f[i + 1, j], f[i + 1, j + 1], f[i, j + 1]], 1), axis, sign)
+    padded = np.pad(solid, 1)
+    a, b = padded[:-1, 1:-1], padded[1:, 1:-1]                  # celle ai lati della linea u = us[k]
+    k, j = np.nonzero(a != b)
+    add(np.stack([idx[0, k, j], idx[0, k, j + 1], idx[1, k, j + 1], idx[1, k, j]], 1),
+        ua, np.where(a[k, j], 1.0, -1.0))
+    a, b = padded[1:-1, :-1], padded[1:-1, 1:]                  # celle sotto/sopra la linea v = vs[k]
+    i, k = np.nonzero(a != b)
+    add(np.stack([idx[0, i, k], idx[0, i + 1, k], idx[1, i + 1, k], idx[1, i, k]], 1),
+        2, np.where(a[i, k], 1.0, -1.0))
+
+    faces = np.concatenate(quads).astype(np.int64)
+    want = np.concatenate(normals)
+    flat = verts.reshape(-1, 3)
+    p = flat[faces]
+    normal = np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0])
+    flip = np.einsum("ij,ij->i", normal, want) < 0
+    faces[flip] = faces[flip, ::-1]
+    used, faces = np.unique(faces, return_inverse=True)         # via i vertici interni ai fori
+    return flat[used], faces.reshape(-1, 4)
+
+
+def edge_use(loop_verts, loop_totals):
+    """Controllo manifold da (indici vertice per loop, loop per faccia)
+    → {manifold, boundary, nonmanifold, faces}."""
+    loop_verts = np.asarray(loop_verts, dtype=np.int64).ravel()
+    totals = np.asarray(loop_totals, dtype=np.int64)
+    if not len(totals):
+        return dict(manifold=False, boundary=0, nonmanifold=0, faces=0)
+    starts = np.zeros(len(totals), dtype=np.int64)
+    np.cumsum(totals[:-1], out=starts[1:])
+    nxt = np.arange(1, len(loop_verts) + 1)
+    nxt[starts + totals - 1] = starts                            # ultimo loop → primo della faccia
+    edges = np.sort(np.stack([loop_verts, loop_verts[nxt]], 1), axis=1)
+    _, counts = np.unique(edges, axis=0, return_counts=True)
+    boundary, nonmanifold = int(np.sum(counts == 1)), int(np.sum(counts > 2))
+    return dict(manifold=boundary == 0 and nonmanifold == 0, boundary=boundary,
+                nonmanifold=nonmanifold, faces=len(totals))
@@ -0,0 +1,309 @@
+"""
+HomeForge AI — Aperture dei muri in blocco
+L3 taglia le aperture A1–A9 con un modifier Boolean EXACT per apertura,
+valutati in sequenza: ogni cutter rifà il boolean sull'intero muro. Qui tutte le
+aperture di un muro passano in un colpo solo:
+
+- muro box allineato agli assi, senza modifier, fori passanti → mesh costruita
+  direttamente (homeforge.opening_mesh): griglia delle linee dei fori sulle due
+  facce, celle piene come facce, mazzette (spallette, davanzale, architrave)
+  sui bordi pieno/vuoto. Nessun boolean, risultato esatto e manifold;
+- altrimenti (muro ruotato o con modifier, es. Subdivision Surface; foro cieco)
+  → UN boolean con i cutter in una collection (operand COLLECTION): un solo
+  passaggio del solver invece di uno per apertura.
+
+Report per muro: metodo, aperture, tempo, controllo manifold (spigoli di bordo
+e spigoli con più di due facce).
+
+    from homeforge import openings
+    report = openings.cut(muro, [dict(name="cut_A1", dims=(2.4, 1.8, 2.4), location=(1.2, 0.225, 1.6))])
+
+    blender --background --python chain/homeforge/openings.py -- --benchmark
+    blender --background --python chain/homeforge/openings.py -- --benchmark --no-subsurf
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import bpy
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import script_args
+from homeforge import geometry as geo
+from homeforge.opening_mesh import EPS, edge_use, holed_box, opening_rect
+
+METHODS = ("auto", "direct", "boolean")
+CUT_COLLECTION = "hf_cut_{}"
+
+
+# ============================================================
+# OGGETTI
+# ============================================================
+def _aabb(obj):
+    """(lo, hi) mondo del bounding box dell'oggetto (dati originali, senza modifier)."""
+    m = np.array(obj.matrix_world)
+    corners = np.array([tuple(c) for c in obj.bound_box], dtype=np.float64)
+    world = corners @ m[:3, :3].T + m[:3, 3]
+    return world.min(axis=0), world.max(axis=0)
+
+
+def _axis_aligned(obj):
+    """Solo traslazione + scala positiva (nessuna rotazione)."""
+    m = np.array(obj.matrix_world)[:3, :3]
+    return np.allclose(m, np.diag(np.diag(m)), atol=EPS) and bool(np.all(np.diag(m) > 0))
+
+
+def box_wall(obj):
+    """None se il muro è un box allineato agli assi senza modifier, altrimenti il motivo."""
+    if obj.modifiers:
+        return "modifier " + ", ".join(m.type for m in obj.modifiers)
+    if not _axis_aligned(obj):
+        return "ruotato"
+    mesh = obj.data
+    if len(mesh.vertices) != 8 or len(mesh.polygons) != 6:
+        return "non è un box"
+    co = np.empty(24)
+    mesh.vertices.foreach_get("co", co)
+    co = co.reshape(8, 3)
+    lo, hi = co.min(axis=0), co.max(axis=0)
+    if not np.all((np.abs(co - lo) < EPS) | (np.abs(co - hi) < EPS)):
+        return "non è un box"
+    return None
+
+
+def _cutter_box(cutter):
+    """Cutter come dict L3 {name, dims, location} o Object → (nome, lo, hi)."""
+    if isinstance(cutter, dict):
+        half = np.asarray(cutter["dims"], dtype=np.float64) / 2
+        loc = np.asarray(cutter["location"], dtype=np.float64)
+        return cutter["name"], loc - half, loc + half
+    if not _axis_aligned(cutter):
+        return cutter.name, None, None
+    return (cutter.name, *_aabb(cutter))
+
+
+def mesh_manifold(mesh):
+    totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", totals)
+    loops = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loops)
+    return edge_use(loops, totals)
+
+
+def _replace_mesh(obj, mesh):
+    old = obj.data
+    obj.data = mesh
+    if old.users == 0:
+        bpy.data.meshes.remove(old)
+    mesh.name = f"{obj.name}_mesh"
+
+
+def release(obj):
+    """Datablock dei boolean COLLECTION di obj creati da cut(): collection, cutter
+    e loro mesh, da rimuovere (bpy.data.batch_remove) dopo aver applicato i modifier."""
+    ids = []
+    for mod in obj.modifiers:
+        if mod.type == 'BOOLEAN' and mod.operand_type == 'COLLECTION' and mod.collection \
+                and mod.collection.name.startswith(CUT_COLLECTION.format("")):
+            cutters = list(mod.collection.objects)
+            ids += [mod.collection] + cutters + [c.data for c in cutters if c.data.users == 1]
+    return ids
+
+
+def _direct(wall, boxes):
+    """Fori passanti nella mesh del muro → (rects, skipped) o None se un foro è cieco."""
+    lo, hi = _aabb(wall)
+    ext = hi - lo
+    axis = 0 if ext[0] < ext[1] else 1                          # spessore = lato orizzontale corto
+    rects, skipped = [], []
+    for name, c_lo, c_hi in boxes:
+        if c_lo is None:
+            return None
+        kind, rect = opening_rect(lo, hi, axis, c_lo, c_hi)
+        if kind == "partial":
+            return None
+        if kind == "miss":
+            skipped.append(name)
+        else:
+            rects.append(rect)
+    verts, faces = holed_box(lo, hi, axis, rects)
+    scale = np.diag(np.array(wall.matrix_world)[:3, :3])
+    local = (verts - np.array(wall.matrix_world)[:3, 3]) / scale
+    mesh = geo.mesh_from_arrays(f"{wall.name}_mesh", local, faces,
+                                materials=[m for m in wall.data.materials])
+    _replace_mesh(wall, mesh)
+    return dict(rects=len(rects), skipped=skipped,
+                **edge_use(faces, np.full(len(faces), 4)))
+
+
+def _union_boolean(wall, cutters, boxes, solver, collection, apply):
+    """Un solo Boolean DIFFERENCE con tutti i cutter in una collection."""
+    cut = bpy.data.collections.new(CUT_COLLECTION.format(wall.name))
+    (collection or bpy.context.scene.collection).children.link(cut)
+    for cutter, (name, c_lo, c_hi) in zip(cutters, boxes):
+        if isinstance(cutter, dict):
+            cutter = geo.make_box(name, *cutter["dims"], location=cutter["location"], collection=cut)
+        else:
+            cut.objects.link(cutter)
+        cutter.display_type = 'WIRE'
+        cutter.hide_render = True
+    mod = wall.modifiers.new(CUT_COLLECTION.format(wall.name), 'BOOLEAN')
+    mod.operation = 'DIFFERENCE'
+    mod.solver = solver
+    mod.operand_type = 'COLLECTION'
+    mod.collection = cut
+
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    evaluated = wall.evaluated_get(depsgraph)
+    if not apply:
+        return dict(rects=len(boxes), skipped=[], **mesh_manifold(evaluated.data))
+    mesh = bpy.data.meshes.new_from_object(evaluated, preserve_all_data_layers=True,
+                                           depsgraph=depsgraph)
+    removed = release(wall)
+    wall.modifiers.clear()
+    _replace_mesh(wall, mesh)
+    bpy.data.batch_remove(removed)
+    return dict(rects=len(boxes), skipped=[], **mesh_manifold(mesh))
+
+
+def cut(wall, cutters, method="auto", solver="EXACT", apply=True, collection=None):
+    """Tutte le aperture (DIFFERENCE) di un muro in un passaggio → report.
+
+    cutters: dict L3 {name, dims, location} o Object box.
+    method: auto (diretto se possibile) | direct | boolean.
+    apply=False: il boolean unico resta come modifier (i cutter con release(wall)).
+    Report: {wall, method, openings, skipped, s, manifold, boundary, nonmanifold, faces, reason}.
+    """
+    if method not in METHODS:
+        raise ValueError(f"metodo {method!r}: attesi {METHODS}")
+    t0 = time.perf_counter()
+    boxes = [_cutter_box(c) for c in cutters]
+    reason = box_wall(wall) if method != "boolean" else "richiesto"
+    result = None
+    if reason is None:
+        result = _direct(wall, boxes)
+        if result is None:
+            reason = "foro cieco o cutter ruotato"
+    if result is None:
+        if method == "direct":
+            raise ValueError(f"{wall.name}: aperture non tagliabili direttamente ({reason})")
+        result = _union_boolean(wall, cutters, boxes, solver, collection, apply)
+    used = "direct" if reason is None else "boolean"
+    return dict(wall=wall.name, method=used, openings=result.pop("rects"),
+                skipped=result.pop("skipped"), s=round(time.perf_counter() - t0, 4),
+                reason=reason, **result)
+
+
+def cut_walls(plan, **kw):
+    """{muro (Object): [cutter, ...]} → lista di report, un passaggio per muro."""
+    return [cut(wall, cutters, **kw) for wall, cutters in plan.items()]
+
+
+def print_report(reports):
+    total = sum(r["s"] for r in reports)
+    print("=" * 60)
+    print(f"Aperture: {sum(r['openings'] for r in reports)} su {len(reports)} muri in {total:.3f}s")
+    for r in reports:
+        check = "manifold" if r["manifold"] else f"NON manifold (bordo {r['boundary']}, >2 facce {r['nonmanifold']})"
+        note = f"  [{r['reason']}]" if r["reason"] else ""
+        print(f"  {r['wall']:<12} {r['method']:<8} {r['openings']:2d} aperture {r['s']:8.3f}s  "
+              f"{r['faces']:5d} facce  {check}{note}")
+        if r["skipped"]:
+            print(f"      cutter fuori dal muro: {', '.join(r['skipped'])}")
+    print("=" * 60)
+
+
+# ============================================================
+# BENCHMARK (muri e aperture di L3)
+# ============================================================
+def _l3_walls(ops_path, subsurf):
+    """Muri bersaglio dei boolean_cut di L3 → ({muro: [cutter]}, solver)."""
+    from homeforge.l3_ops import load
+    ops = load(ops_path)
+    boxes, plan, solver = {}, {}, "EXACT"
+    for op in ops:
+        if op.kind in ("box", "box_loop"):
+            for o in op.params["objects"]:
+                boxes[o["name"]] = (o, op.params["modifiers"])
+        elif op.kind == "boolean_cut" and op.params["operation"] == "DIFFERENCE":
+            plan.setdefault(op.params["target"], []).append(op.params["cutter"])
+            solver = op.params["solver"]
+    walls = {}
+    for name, cutters in plan.items():
+        o, mods = boxes[name]
+        wall = geo.make_box(name, *o["dims"], location=o["location"])
+        for spec in mods:
+            if spec["type"] == "SUBSURF" and subsurf:
+                mod = wall.modifiers.new("Subsurf", 'SUBSURF')
+                mod.levels = spec.get("viewport_levels", 1)
+                mod.render_levels = spec.get("render_levels", 2)
+        walls[wall] = cutters
+    return walls, solver
+
+
+def _sequential(plan, solver):
+    """Come L3 oggi: un modifier Boolean per apertura, poi applicati in blocco."""
+    reports = []
+    for wall, cutters in plan.items():
+        t0 = time.perf_counter()
+        made = []
+        for c in cutters:
+            cutter = geo.make_box(c["name"], *c["dims"], location=c["location"])
+            cutter.hide_render = True
+            mod = wall.modifiers.new(c["name"], 'BOOLEAN')
+            mod.operation, mod.solver, mod.object = 'DIFFERENCE', solver, cutter
+            made.append(cutter)
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        mesh = bpy.data.meshes.new_from_object(wall.evaluated_get(depsgraph), depsgraph=depsgraph)
+        wall.modifiers.clear()
+        _replace_mesh(wall, mesh)
+        bpy.data.batch_remove(made + [c.data for c in made])
+        reports.append(dict(wall=wall.name, method="sequenz.", openings=len(cutters), skipped=[],
+                            s=round(time.perf_counter() - t0, 4), reason=None, **mesh_manifold(mesh)))
+    return reports
+
+
+def _clear():
+    bpy.data.batch_remove(list(bpy.data.objects) + [c for c in bpy.data.collections
+                                                    if c.name.startswith(CUT_COLLECTION.format(""))])
+    bpy.data.batch_remove([m for m in bpy.data.meshes if m.users == 0])
+
+
+def benchmark(ops_path=None, method="auto", subsurf=True):
+    """Aperture di L3: boolean in sequenza (come OP-020..029) vs cut() per muro."""
+    from homeforge.l3_ops import L3_PATH
+    results = {}
+    for label, run in (("sequenziale", lambda plan, solver: _sequential(plan, solver)),
+                       ("openings", lambda plan, solver: cut_walls(plan, method=method, solver=solver))):
+        _clear()
+        plan, solver = _l3_walls(ops_path or L3_PATH, subsurf)
+        print(f"\n{label}:")
+        results[label] = run(plan, solver)
+        print_report(results[label])
+    _clear()
+    base = sum(r["s"] for r in results["sequenziale"])
+    fast = sum(r["s"] for r in results["openings"])
+    print(f"Speedup aperture: {base / max(fast, 1e-9):.1f}× ({base:.3f}s → {fast:.3f}s)")
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — aperture dei muri in blocco")
+    ap.add_argument("--benchmark", action="store_true", help="muri e aperture di L3: sequenziale vs blocco")
+    ap.add_argument("--ops", help="file operazioni L3 (default chain/L3_blender_ops.md)")
+    ap.add_argument("--method", choices=METHODS, default="auto")
+    ap.add_argument("--no-subsurf", action="store_true",
+                    help="muri senza Subdivision Surface (anti-pattern): abilita il taglio diretto")
+    args = ap.parse_args(script_args() if argv is None else argv)
+    if args.benchmark:
+        return benchmark(args.ops, args.method, subsurf=not args.no_subsurf)
+    ap.print_help()
+    return None
+
+
+if __name__ == "__main__":
+    main()
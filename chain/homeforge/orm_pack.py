@@ -0,0 +1,125 @@
+"""
+HomeForge AI — Texture ORM impacchettate (AO / Roughness / Displacement)
+AO, roughness e displacement Poly Haven sono dati a un canale salvati come
+RGB: tre immagini decodificate per materiale. Il packing le scrive nei canali
+R/G/B di UNA texture Non-Color; create_pbr_material(tex_files={'orm': ...})
+la legge con Separate Color. Per materiale: 3 immagini invece di 5, un solo
+campionamento per i tre dati, ~1/3 della memoria residente per quei canali.
+
+    R = AO          (1.0 se la map manca)
+    G = Roughness   (0.5 se manca)
+    B = Displacement (0.5 se manca; 8 bit bastano per il Bump, non per displacement reale)
+
+File: textures/cache/orm/<asset>_orm_<hash>.png, hash del contenuto delle
+sorgenti → rigenerato solo se una sorgente cambia. Varianti 512/1K per i
+draft/preview come le altre map (homeforge.texture_cache).
+
+    blender --background --python chain/homeforge/orm_pack.py -- [asset ...] [--force]
+"""
+import sys
+import hashlib
+import argparse
+from pathlib import Path
+
+import bpy
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import TEX_DIR, script_args
+from homeforge import compositing
+from homeforge.materials import TEX_MAPS, texture_set
+from homeforge.texture_cache import ORM_DIR, file_hash
+
+# map → (canale, valore neutro se la map manca)
+ORM_CHANNELS = {"ao": (0, 1.0), "rough": (1, 0.5), "disp": (2, 0.5)}
+# Con una sola map il packing non risparmia nulla (es. patterned_slate_tiles: solo rough)
+MIN_CHANNELS = 2
+
+
+def _orm_tag(files):
+    h = hashlib.sha1()
+    for key in sorted(files):
+        h.update(key.encode())
+        h.update(file_hash(files[key]).encode())
+    return h.hexdigest()[:10]
+
+
+def orm_path(asset, maps=tuple(ORM_CHANNELS), tex_dir=TEX_DIR):
+    """(path della texture ORM, map presenti) senza generarla."""
+    files = {m: p for m, p in texture_set(asset, maps, tex_dir).items()
+             if m in ORM_CHANNELS and Path(p).exists()}
+    if not files:
+        raise FileNotFoundError(f"{asset}: nessuna map ao/rough/disp in {tex_dir}")
+    return ORM_DIR / f"{asset}_orm_{_orm_tag(files)}.png", tuple(sorted(files))
+
+
+def pack_orm(asset, maps=tuple(ORM_CHANNELS), tex_dir=TEX_DIR, force=False):
+    """Genera (se serve) la texture ORM di un asset → (path, map presenti).
+
+    maps: quali map impacchettare (es. i preset senza AO: ("rough", "disp")).
+    """
+    path, present = orm_path(asset, maps, tex_dir)
+    if path.exists() and not force:
+        return str(path), present
+
+    sources = texture_set(asset, present, tex_dir)
+    images = {m: bpy.data.images.load(sources[m], check_existing=False) for m in present}
+    try:
+        w, h = max(img.size[0] for img in images.values()), max(img.size[1] for img in images.values())
+        packed = np.ones((h, w, 4), dtype=np.float32)
+        for m, (channel, neutral) in ORM_CHANNELS.items():
+            img = images.get(m)
+            if img is None:
+                packed[..., channel] = neutral
+                continue
+            img.colorspace_settings.name = 'Non-Color'
+            if tuple(img.size) != (w, h):
+                img.scale(w, h)
+            packed[..., channel] = compositing.read_pixels(img)[..., 0]
+    finally:
+        bpy.data.batch_remove(list(images.values()))
+
+    ORM_DIR.mkdir(parents=True, exist_ok=True)
+    for old in ORM_DIR.glob(f"{asset}_orm_*.png"):        # versioni precedenti
+        old.unlink()
+    compositing.save_png(packed, path, name=f"{asset}_ORM")
+    print(f"  [orm] {path.name}: {', '.join(present)}")
+    return str(path), present
+
+
+def packed_texture_set(asset, maps=("diff", "nor", "ao", "rough", "disp"), tex_dir=TEX_DIR):
+    """tex_files per create_pbr_material con ao/rough/disp impacchettate.
+
+    Ritorna (tex_files, orm_maps): {'diff', 'nor', 'orm'} e le map presenti nei canali.
+    Con meno di MIN_CHANNELS map presenti: le map separate come texture_set, orm_maps = ().
+    """
+    orm_maps = tuple(m for m in maps if m in ORM_CHANNELS)
+    present = [m for m, p in texture_set(asset, orm_maps, tex_dir).items() if Path(p).exists()]
+    if len(present) < MIN_CHANNELS:
+        return texture_set(asset, maps, tex_dir), ()
+    tex = texture_set(asset, [m for m in maps if m not in ORM_CHANNELS], tex_dir)
+    tex["orm"], orm_maps = pack_orm(asset, orm_maps, tex_dir)
+    return tex, orm_maps
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — packing ORM")
+    ap.add_argument("assets", nargs="*", help="asset Poly Haven (default: tutti in textures/)")
+    ap.add_argument("--force", action="store_true")
+    args = ap.parse_args(script_args() if argv is None else argv)
+
+    suffixes = {TEX_MAPS[m] for m in ORM_CHANNELS}
+    assets = args.assets or sorted({p.name[:-len(s) - 1] for p in TEX_DIR.iterdir()
+                                    for s in suffixes if p.name.endswith("_" + s)})
+    for asset in assets:
+        _, present = orm_path(asset)
+        if len(present) < MIN_CHANNELS:
+            print(f"  [orm] {asset}: solo {', '.join(present)}, nessun packing")
+            continue
+        pack_orm(asset, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
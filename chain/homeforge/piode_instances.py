@@ -0,0 +1,325 @@
+"""
+HomeForge AI — Piode come istanze Geometry Nodes
+Invece di una lastra unica con texture + normal map forte, ogni pioda è una
+istanza di poche mesh base (lastre irregolari). Le posizioni (file sovrapposte,
+sfalsate, con rotazione/spessore/scala casuali) sono calcolate in NumPy e
+salvate come attributi su una nuvola di punti; un modificatore Geometry Nodes
+(Instance on Points + Collection Info) crea le istanze.
+Memoria piatta: N istanze = N trasformazioni, non N mesh.
+
+Report istanze / memoria / tempo BVH sul tetto completo (~105 m², 2 falde):
+    blender --background --python chain/homeforge/piode_instances.py -- --two-slopes
+"""
+import sys
+import math
+import time
+import argparse
+from pathlib import Path
+
+import bpy
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import script_args
+from homeforge import geometry as geo
+from homeforge import roof
+from homeforge.materials import FINGERPRINT_PROP
+from homeforge.render_cache import node_tree_hash
+
+# Lastre e posa (m, rad, frazioni)
+PIODE_DEFAULTS = dict(
+    SLATE_W=0.40,        # larghezza lastra
+    SLATE_L=0.50,        # lunghezza lungo la falda
+    SLATE_SP=0.03,       # spessore medio
+    OVERLAP=0.50,        # frazione di lastra coperta dalla fila superiore
+    SIDE_GAP=-0.03,      # < 0 = sovrapposizione laterale
+    JITTER=0.03,         # spostamento casuale in pianta
+    YAW_MAX=math.radians(6),
+    SCALE_VAR=0.15,      # ± variazione scala in pianta
+    THICK_VAR=0.35,      # ± variazione spessore
+    VARIANTS=6,          # mesh base diverse
+    OUTLINE_PTS=12,      # vertici del contorno irregolare
+    SEED=7,
+)
+
+ATTR_ROT = "hf_rot"
+ATTR_SCALE = "hf_scale"
+ATTR_VARIANT = "hf_variant"
+SOURCE_KEY_PROP = roof.SOURCE_KEY_PROP
+
+
+# ============================================================
+# MESH BASE
+# ============================================================
+def _slate_data(rng, w, l, n_pts):
+    """Lastra irregolare spessore 1 (scalata per istanza): contorno rettangolare
+    con angoli smussati e bordi scheggiati, base a z=0."""
+    t = np.linspace(0, 2 * math.pi, n_pts, endpoint=False)
+    # Superellisse ≈ rettangolo arrotondato
+    c, s = np.cos(t), np.sin(t)
+    x = np.sign(c) * np.abs(c) ** 0.35 * w / 2
+    y = np.sign(s) * np.abs(s) ** 0.35 * l / 2
+    chip = 1.0 - rng.uniform(0.0, 0.08, n_pts)
+    x, y = x * chip, y * chip
+    n = n_pts
+    verts = np.concatenate([np.column_stack([x, y, np.zeros(n)]),
+                            np.column_stack([x, y, np.ones(n)])])
+    flat = list(range(n - 1, -1, -1)) + list(range(n, 2 * n))       # fondo, faccia
+    totals = [n, n]
+    for i in range(n):
+        j = (i + 1) % n
+        flat += [i, j, n + j, n + i]
+        totals.append(4)
+    return verts, flat, totals
+
+
+def base_collection(material, p, name="Piode_Base"):
+    """Collection (non linkata alla scena) con le VARIANTS mesh base."""
+    coll = bpy.data.collections.get(name) or bpy.data.collections.new(name)
+    for obj in list(coll.objects):
+        bpy.data.objects.remove(obj)
+    rng = np.random.default_rng(p["SEED"])
+    for k in range(p["VARIANTS"]):
+        verts, flat, totals = _slate_data(rng, p["SLATE_W"], p["SLATE_L"], p["OUTLINE_PTS"])
+        mesh = geo.mesh_from_arrays(f"Pioda_{k}_mesh", verts, flat, totals,
+                                    materials=[material])
+        obj = bpy.data.objects.new(f"Pioda_{k}", mesh)
+        coll.objects.link(obj)
+    return coll
+
+
+# ============================================================
+# POSA (NumPy)
+# ============================================================
+def _euler_xyz(m):
+    """Euler XYZ (Blender) da matrici di rotazione (N, 3, 3)."""
+    ry = np.arcsin(np.clip(-m[:, 2, 0], -1.0, 1.0))
+    rx = np.arctan2(m[:, 2, 1], m[:, 2, 2])
+    rz = np.arctan2(m[:, 1, 0], m[:, 0, 0])
+    return np.column_stack([rx, ry, rz])
+
+
+def _rot_x(a):
+    c, s = np.cos(a), np.sin(a)
+    o, z = np.ones_like(a), np.zeros_like(a)
+    return np.stack([np.stack([o, z, z], -1), np.stack([z, c, -s], -1),
+                     np.stack([z, s, c], -1)], -2)
+
+
+def _rot_z(a):
+    c, s = np.cos(a), np.sin(a)
+    o, z = np.ones_like(a), np.zeros_like(a)
+    return np.stack([np.stack([c, -s, z], -1), np.stack([s, c, z], -1),
+                     np.stack([z, z, o], -1)], -2)
+
+
+def slate_layout(slopes=None, piode=None, **params):
+    """Punti, rotazioni, scale e varianti delle piode su tutte le falde.
+
+    Ritorna dict(points (N,3), rot (N,3), scale (N,3), variant (N,)).
+    params: costanti di roof.DEFAULTS (TETTO_W, SPORTO, BASE_Z, ...).
+    """
+    p = dict(roof.DEFAULTS, **params)
+    q = dict(PIODE_DEFAULTS, **(piode or {}))
+    slopes = slopes or roof.single_slope(**p)
+    rng = np.random.default_rng(q["SEED"])
+    out = {k: [] for k in ("points", "rot", "scale", "variant")}
+
+    W, S, Z = p["TETTO_W"], p["SPORTO"], p["BASE_Z"]
+    top = p["TRAVE_H"] / 2 + p["TAVOLATO_SP"]          # piano del tavolato
+    row_step = q["SLATE_L"] * (1.0 - q["OVERLAP"])
+    col_step = q["SLATE_W"] + q["SIDE_GAP"]
+    tilt = math.atan2(q["SLATE_SP"], row_step)         # ogni fila appoggia sulla precedente
+    lift = q["SLATE_L"] / 2 * math.sin(tilt)           # bordo basso sopra il tavolato
+
+    for slope in slopes:
+        L, a = slope["FALDA_L"], slope["ANGOLO"]
+        rows = np.arange(-S + q["SLATE_L"] / 2, L, row_step)
+        cols = np.arange(0.0, W + col_step, col_step)
+        r_idx, c_idx = np.meshgrid(np.arange(len(rows)), np.arange(len(cols)), indexing="ij")
+        r_idx, c_idx = r_idx.ravel(), c_idx.ravel()
+        n = len(r_idx)
+        # Coordinate sulla falda: file sfalsate di mezza lastra
+        u = cols[c_idx] + (r_idx % 2) * col_step / 2 + rng.uniform(-1, 1, n) * q["JITTER"]
+        v = rows[r_idx] + rng.uniform(-1, 1, n) * q["JITTER"]
+        keep = (u >= -col_step / 2) & (u <= W + col_step / 2)
+        u, v, n = u[keep], v[keep], int(keep.sum())
+
+        thick = q["SLATE_SP"] * (1 + rng.uniform(-1, 1, n) * q["THICK_VAR"])
+        sxy = 1 + rng.uniform(-1, 1, n) * q["SCALE_VAR"]
+        yaw = rng.uniform(-1, 1, n) * q["YAW_MAX"]
+
+        y = v * math.cos(a)
+        z = Z + v * math.sin(a) + top + lift
+        mats = _rot_x(np.full(n, a + tilt)) @ _rot_z(yaw)
+        if slope["direction"] < 0:
+            y = slope["y0"] - y
+            mats = _rot_z(np.full(n, math.pi)) @ mats
+        else:
+            y = slope["y0"] + y
+
+        out["points"].append(np.column_stack([u + p["X0"], y, z]))
+        out["rot"].append(_euler_xyz(mats))
+        out["scale"].append(np.column_stack([sxy, sxy, thick]))
+        out["variant"].append(rng.integers(0, q["VARIANTS"], n))
+
+    return {k: np.concatenate(v) for k, v in out.items()}
+
+
+# ============================================================
+# GEOMETRY NODES
+# ============================================================
+def instancer_node_group(collection, name="HF_Piode_Instancer"):
+    """Instance on Points: variante, rotazione e scala dagli attributi hf_*."""
+    ng = bpy.data.node_groups.get(name)
+    if ng is not None:
+        bpy.data.node_groups.remove(ng)
+    ng = bpy.data.node_groups.new(name, 'GeometryNodeTree')
+    ng.interface.new_socket(name="Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+    ng.interface.new_socket(name="Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+    ns, lk = ng.nodes, ng.links
+
+    n_in = ns.new("NodeGroupInput"); n_in.location = (-600, 0)
+    n_out = ns.new("NodeGroupOutput"); n_out.location = (400, 0)
+
+    coll_info = ns.new("GeometryNodeCollectionInfo"); coll_info.location = (-400, -200)
+    coll_info.transform_space = 'ORIGINAL'
+    coll_info.inputs["Collection"].default_value = collection
+    coll_info.inputs["Separate Children"].default_value = True
+    coll_info.inputs["Reset Children"].default_value = True
+
+    def named(attr, data_type, y):
+        node = ns.new("GeometryNodeInputNamedAttribute"); node.location = (-400, y)
+        node.data_type = data_type
+        node.inputs["Name"].default_value = attr
+        return node.outputs["Attribute"]
+
+    inst = ns.new("GeometryNodeInstanceOnPoints"); inst.location = (100, 0)
+    inst.inputs["Pick Instance"].default_value = True
+    lk.new(n_in.outputs["Geometry"], inst.inputs["Points"])
+    lk.new(coll_info.outputs["Instances"], inst.inputs["Instance"])
+    lk.new(named(ATTR_VARIANT, 'INT', -400), inst.inputs["Instance Index"])
+    lk.new(named(ATTR_ROT, 'FLOAT_VECTOR', -550), inst.inputs["Rotation"])
+    lk.new(named(ATTR_SCALE, 'FLOAT_VECTOR', -700), inst.inputs["Scale"])
+    lk.new(inst.outputs["Instances"], n_out.inputs["Geometry"])
+    return ng
+
+
+def instance_material(mat):
+    """Copia del materiale con offset texture casuale per istanza (Object Info
+    Random → Mapping Location): le lastre della stessa variante non si ripetono.
+    Riusata finché il node tree sorgente non cambia (come roof.merged_material)."""
+    name = f"{mat.name}_inst"
+    key = node_tree_hash(mat.node_tree)
+    existing = bpy.data.materials.get(name)
+    if existing is not None and existing.get(SOURCE_KEY_PROP) == key:
+        return existing
+    copy = mat.copy()
+    copy.pop(FINGERPRINT_PROP, None)
+    copy[SOURCE_KEY_PROP] = key
+    if existing is not None:
+        existing.user_remap(copy)
+        bpy.data.materials.remove(existing)
+    copy.name = name
+    nt = copy.node_tree
+    for mapping in [n for n in nt.nodes if n.type == 'MAPPING']:
+        info = nt.nodes.new("ShaderNodeObjectInfo")
+        info.location = (mapping.location.x - 200, mapping.location.y - 250)
+        mul = nt.nodes.new("ShaderNodeMath")
+        mul.operation = 'MULTIPLY'
+        mul.inputs[1].default_value = 10.0
+        mul.location = (mapping.location.x - 100, mapping.location.y - 250)
+        nt.links.new(info.outputs["Random"], mul.inputs[0])
+        nt.links.new(mul.outputs["Value"], mapping.inputs["Location"])
+    return copy
+
+
+def build_piode(material, slopes=None, name="Piode_GN", collection=None, piode=None,
+                **params):
+    """Crea l'oggetto istanziatore (nuvola di punti + modificatore GN)."""
+    q = dict(PIODE_DEFAULTS, **(piode or {}))
+    layout = slate_layout(slopes, q, **params)
+    base = base_collection(instance_material(material), q)
+
+    n = len(layout["points"])
+    mesh = geo.mesh_from_arrays(f"{name}_points", layout["points"],
+                                np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32),
+                                point_vectors={ATTR_ROT: layout["rot"],
+                                               ATTR_SCALE: layout["scale"]})
+    attr = mesh.attributes.new(ATTR_VARIANT, 'INT', 'POINT')
+    attr.data.foreach_set("value", layout["variant"].astype(np.int32))
+
+    obj = geo.make_object(name, mesh, collection=collection)
+    mod = obj.modifiers.new("Piode", 'NODES')
+    mod.node_group = instancer_node_group(base)
+    print(f"  Piode GN: {n} istanze di {q['VARIANTS']} lastre base")
+    return obj
+
+
+# ============================================================
+# REPORT
+# ============================================================
+def _mesh_bytes(mesh):
+    """Stima memoria mesh: vertici (12 B) + loop (4 B) + poligoni (8 B)."""
+    return len(mesh.vertices) * 12 + len(mesh.loops) * 4 + len(mesh.polygons) * 8
+
+
+def report(obj, measure_bvh=True):
+    """Istanze, memoria (istanziata vs realizzata) e tempo sync+BVH Cycles."""
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    n_inst = sum(1 for i in depsgraph.object_instances
+                 if i.is_instance and i.parent and i.parent.original == obj)
+    base = obj.modifiers["Piode"].node_group.nodes["Collection Info"].inputs["Collection"].default_value
+    base_bytes = [_mesh_bytes(o.data) for o in base.objects]
+    inst_bytes = _mesh_bytes(obj.data) + n_inst * (7 * 4 + 64)   # attributi + matrice
+    realized = n_inst * (sum(base_bytes) / max(len(base_bytes), 1))
+    result = dict(instances=n_inst, base_meshes=len(base_bytes),
+                  instanced_mb=(inst_bytes + sum(base_bytes)) / 2**20,
+                  realized_mb=realized / 2**20)
+
+    if measure_bvh:
+        # Render minimo (1 sample, 10%): il tempo è dominato da sync + BVH
+        scene = bpy.context.scene
+        saved = (scene.cycles.samples, scene.render.resolution_percentage,
+                 scene.render.filepath, scene.cycles.use_denoising)
+        scene.cycles.samples = 1
+        scene.render.resolution_percentage = 10
+        scene.cycles.use_denoising = False
+        t0 = time.perf_counter()
+        bpy.ops.render.render(write_still=False)
+        result["bvh_sync_s"] = time.perf_counter() - t0
+        (scene.cycles.samples, scene.render.resolution_percentage,
+         scene.render.filepath, scene.cycles.use_denoising) = saved
+
+    print("=" * 60)
+    print(f"Piode GN: {result['instances']} istanze, {result['base_meshes']} mesh base")
+    print(f"  Memoria istanziata: {result['instanced_mb']:.2f} MB "
+          f"(realizzata: {result['realized_mb']:.2f} MB)")
+    if "bvh_sync_s" in result:
+        print(f"  Sync + BVH (render 1 sample): {result['bvh_sync_s']:.2f}s")
+    print("=" * 60)
+    return result
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — piode istanziate")
+    ap.add_argument("--two-slopes", action="store_true",
+                    help="tetto completo asimmetrico (colmo 1.5 m a nord)")
+    ap.add_argument("--no-bvh", action="store_true")
+    args = ap.parse_args(script_args() if argv is None else argv)
+
+    from homeforge import materials as hfm
+    bpy.context.scene.render.engine = 'CYCLES'
+    mat = hfm.preset_material("piode")
+    if args.two_slopes:
+        obj = build_piode(mat, roof.two_slopes(), TETTO_W=11.8, X0=-0.40,
+                          BASE_Z=3.0, SPORTO=0.40)
+    else:
+        obj = build_piode(mat)
+    report(obj, measure_bvh=not args.no_bvh)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""
+HomeForge AI — Pre-flight: render proxy + controlli automatici sull'immagine
+Prima di pagare un 1920×1080 a 512 samples: render proxy 240×135 (stesso rapporto), 16 samples,
+texture limitate, e controlli NumPy sull'immagine (valori display, dopo AgX).
+Sono gli errori diagnosticati a mano nelle tabelle di training L4:
+
+- black_frame   frame nero (camera dentro un muro, luci spente)
+- exposure      luminanza mediana fuori range + istogramma a 16 bin nel report
+- clipped       highlight bruciati (un canale ≥ 0.99)
+- crushed       ombre chiuse (luminanza ≤ 0.01)
+- in_frame      oggetto target visibile (copertura minima) e non tagliato dal bordo
+- hue:<mat>     statistiche di tinta per regione materiale (es. Rame_Brunito bruno,
+                niente verde sotto AgX: MATERIAL_RULES)
+
+Le regioni materiale e oggetto vengono da due render Workbench piatti con un
+colore ID per materiale/oggetto (occlusioni corrette, pochi ms). Un controllo
+'error' fallito blocca il render (PreflightError); 'warn' viene solo riportato.
+
+    preflight.gate(scene, tier=TIER["name"], target=["Tetto"], output=OUTPUT)
+
+    blender --background file.blend --python chain/homeforge/preflight.py -- --target Tetto
+    HF_PREFLIGHT=0 → nessun pre-flight.
+"""
+import os
+import re
+import sys
+import json
+import time
+import tempfile
+import argparse
+from pathlib import Path
+
+import bpy
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import script_args
+from homeforge import compositing, instrument
+
+ENABLE_ENV = "HF_PREFLIGHT"
+PREFLIGHT_TIERS = ("final",)
+PROXY = dict(width=240, samples=16, texture_limit='512', max_bounces=4)   # altezza dal rapporto della scena
+LIMITS = dict(
+    black_mean=0.02,             # luminanza media minima
+    exposure=(0.08, 0.85),       # luminanza mediana
+    clipped=0.02,                # frazione di pixel con un canale ≥ 0.99
+    crushed=0.30,                # frazione di pixel con luminanza ≤ 0.01
+    min_coverage=0.005,          # frazione del frame occupata dal target
+    min_region_px=20,            # sotto: regione materiale non valutata
+)
+# roof_piode.md §3: rame bruno/marrone scuro, NO verde
+MATERIAL_RULES = {
+    "Rame_Brunito": dict(hue=(5.0, 50.0), min_saturation=0.08, max_green=0.15),
+}
+GREEN_BAND = (75.0, 165.0)       # gradi
+ID_LEVELS = 6                    # 6³ colori ID, passo 51/255: robusti all'arrotondamento 8 bit
+
+
+class PreflightError(RuntimeError):
+    """Pre-flight fallito: il render finale non va lanciato."""
+
+    def __init__(self, report):
+        failed = [c["name"] for c in report["checks"] if not c["ok"] and c["level"] == "error"]
+        super().__init__(f"pre-flight fallito: {', '.join(failed)} (proxy: {report['proxy']})")
+        self.report = report
+
+
+def enabled():
+    return os.environ.get(ENABLE_ENV, "1") != "0"
+
+
+def preflight_path(output):
+    output = Path(output)
+    return output.with_name(f"{output.stem}_preflight.png")
+
+
+# ============================================================
+# STATISTICHE (NumPy puro)
+# ============================================================
+def luminance(rgb):
+    return rgb[..., 0] * 0.2126 + rgb[..., 1] * 0.7152 + rgb[..., 2] * 0.0722
+
+
+def rgb_to_hsv(rgb):
+    """(..., 3) in [0, 1] → hue in gradi, saturazione, valore."""
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    v = rgb.max(axis=-1)
+    c = v - rgb.min(axis=-1)
+    safe = np.where(c > 0, c, 1.0)
+    h = np.where(v == r, ((g - b) / safe) % 6.0,
+                 np.where(v == g, (b - r) / safe + 2.0, (r - g) / safe + 4.0))
+    h = np.where(c > 0, h * 60.0, 0.0)
+    s = np.where(v > 0, c / np.where(v > 0, v, 1.0), 0.0)
+    return h, s, v
+
+
+def circular_mean(hue_deg, weights=None):
+    rad = np.radians(hue_deg)
+    x = np.average(np.cos(rad), weights=weights)
+    y = np.average(np.sin(rad), weights=weights)
+    return float(np.degrees(np.arctan2(y, x)) % 360.0)
+
+
+def _check(name, ok, value, limit, level="error", **extra):
+    return dict(name=name, ok=bool(ok), level=level, value=value, limit=limit, **extra)
+
+
+def image_checks(rgb, limits=LIMITS):
+    """Controlli globali sui pixel display (..., 3)."""
+    lum = luminance(rgb)
+    mean, median = float(lum.mean()), float(np.median(lum))
+    clipped = float((rgb >= 0.99).any(axis=-1).mean())
+    crushed = float((lum <= 0.01).mean())
+    hist = np.histogram(lum, bins=16, range=(0.0, 1.0))[0]
+    lo, hi = limits["exposure"]
+    return [
+        _check("black_frame", mean >= limits["black_mean"], round(mean, 4), limits["black_mean"]),
+        _check("exposure", lo <= median <= hi, round(median, 4), [lo, hi],
+               histogram=(hist / max(hist.sum(), 1)).round(4).tolist()),
+        _check("clipped", clipped <= limits["clipped"], round(clipped, 4), limits["clipped"]),
+        _check("crushed", crushed <= limits["crushed"], round(crushed, 4), limits["crushed"], level="warn"),
+    ]
+
+
+def frame_check(mask, limits=LIMITS, name="in_frame"):
+    """Target visibile: copertura minima; toccare il bordo = tagliato (warn)."""
+    coverage = float(mask.mean())
+    if coverage < limits["min_coverage"]:
+        return [_check(name, False, round(coverage, 4), limits["min_coverage"])]
+    edges = [side for side, row in (("basso", mask[0]), ("alto", mask[-1]),
+                                    ("sinistra", mask[:, 0]), ("destra", mask[:, -1])) if row.any()]
+    return [_check(name, True, round(coverage, 4), limits["min_coverage"]),
+            _check(f"{name}_cut", not edges, edges, [], level="warn")]
+
+
+def region_checks(rgb, masks, rules=MATERIAL_RULES, limits=LIMITS):
+    """Tinta e saturazione delle regioni materiale con una regola."""
+    checks = []
+    for name, rule in rules.items():
+        mask = masks.get(name)
+        count = int(mask.sum()) if mask is not None else 0
+        if count < limits["min_region_px"]:
+            checks.append(_check(f"hue:{name}", True, None, rule.get("hue"), level="warn",
+                                 note=f"regione non visibile ({count} px)"))
+            continue
+        h, s, _ = rgb_to_hsv(rgb[mask])
+        sat = float(s.mean())
+        if "min_saturation" in rule:
+            checks.append(_check(f"saturation:{name}", sat >= rule["min_saturation"], round(sat, 4),
+                                 rule["min_saturation"]))
+        colored = s >= rule.get("min_saturation", 0.0)
+        if "hue" in rule and colored.any():
+            hue = circular_mean(h[colored], s[colored])
+            lo, hi = rule["hue"]
+            checks.append(_check(f"hue:{name}", lo <= hue <= hi, round(hue, 1), [lo, hi], pixels=count))
+        if "max_green" in rule:
+            green = float(((h >= GREEN_BAND[0]) & (h <= GREEN_BAND[1]) & colored).mean())
+            checks.append(_check(f"green:{name}", green <= rule["max_green"], round(green, 4),
+                                 rule["max_green"]))
+    return checks
+
+
+# ============================================================
+# RENDER PROXY + ID
+# ============================================================
+def _snapshot(struct, attrs):
+    values = {}
+    for attr in attrs:
+        value = getattr(struct, attr)
+        values[attr] = tuple(value) if hasattr(value, "__len__") and not isinstance(value, str) else value
+    return values
+
+
+def _restore(struct, values):
+    for attr, value in values.items():
+        setattr(struct, attr, value)
+
+
+def _settings(scene):
+    """(struct, attributi) toccati dal pre-flight, ripristinati alla fine."""
+    return ((scene.render, ("engine", "resolution_x", "resolution_y", "resolution_percentage",
+                            "filepath", "film_transparent", "dither_intensity")),
+            (scene.render.image_settings, ("file_format", "color_mode", "color_depth")),
+            (scene.cycles, ("samples", "max_bounces", "texture_limit_render", "use_denoising",
+                            "denoising_prefilter", "denoising_quality")),
+            (scene.view_settings, ("view_transform", "look", "exposure", "gamma")),
+            (scene.display, ("render_aa",)),
+            (scene.display.shading, ("light", "color_type", "show_shadows", "show_cavity",
+                                     "show_object_outline", "show_specular_highlight", "show_xray")))
+
+
+def _render_png(scene, path):
+    """Render → pixel display (h, w, 4) letti senza conversioni colore."""
+    scene.render.filepath = str(path)
+    scene.render.image_settings.file_format = 'PNG'
+    scene.render.image_settings.color_mode = 'RGBA'
+    scene.render.image_settings.color_depth = '8'
+    bpy.ops.render.render(write_still=True)      # fuori da render_phases: non è il render L4
+    img = bpy.data.images.load(str(path), check_existing=False)
+    try:
+        img.colorspace_settings.name = 'Non-Color'
+        return compositing.read_pixels(img)
+    finally:
+        bpy.data.images.remove(img)
+
+
+def _srgb_to_linear(c):
+    return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+
+def _id_color(index):
+    """Indice (≥ 1) → (colore lineare per Workbench, byte attesi nel PNG)."""
+    step = 255 // (ID_LEVELS - 1)
+    raw = (index // ID_LEVELS ** 2 % ID_LEVELS * step, index // ID_LEVELS % ID_LEVELS * step,
+           index % ID_LEVELS * step)
+    return tuple(_srgb_to_linear(v / 255) for v in raw) + (1.0,), raw
+
+
+def _decode_ids(pixels):
+    """Pixel ID → indice per pixel (-1 = sfondo / non decodificabile)."""
+    step = 255 // (ID_LEVELS - 1)
+    raw = pixels[..., :3] * 255.0
+    levels = np.rint(raw / step)
+    ok = (np.abs(raw - levels * step) <= 6).all(axis=-1) & (pixels[..., 3] > 0.5)
+    levels = levels.astype(np.int32)
+    ids = levels[..., 0] * ID_LEVELS ** 2 + levels[..., 1] * ID_LEVELS + levels[..., 2]
+    return np.where(ok, ids, -1)
+
+
+def material_label(mat):
+    """Nome della regione: sorgente di copie baked / merged / .001 (Rame_Brunito_merged → Rame_Brunito)."""
+    name = mat.get("hf_baked_from", mat.name)
+    return re.sub(r"(\.\d{3}|_merged|_baked)+$", "", name)
+
+
+def _id_render(scene, path, color_type, items):
+    """Render Workbench piatto con un colore ID per item → {item: maschera}."""
+    shading = scene.display.shading
+    scene.render.engine = 'BLENDER_WORKBENCH'
+    scene.render.film_transparent = True
+    scene.render.dither_intensity = 0.0
+    scene.display.render_aa = 'OFF'
+    shading.light = 'FLAT'
+    shading.color_type = color_type
+    shading.show_shadows = shading.show_cavity = shading.show_object_outline = False
+    shading.show_specular_highlight = shading.show_xray = False
+    scene.view_settings.view_transform = 'Standard'
+    scene.view_settings.look = 'None'
+    scene.view_settings.exposure = 0.0
+    scene.view_settings.gamma = 1.0
+
+    attr = "diffuse_color" if color_type == 'MATERIAL' else "color"
+    saved = [(item, tuple(getattr(item, attr))) for item in items]
+    try:
+        for i, item in enumerate(items, start=1):
+            setattr(item, attr, _id_color(i)[0])
+        ids = _decode_ids(_render_png(scene, path))
+    finally:
+        for item, value in saved:
+            setattr(item, attr, value)
+    return {item: ids == i for i, item in enumerate(items, start=1)}, ids >= 0
+
+
+def _scene_materials(scene):
+    mats = {}
+    for obj in scene.objects:
+        if obj.type == 'MESH' and not obj.hide_render:
+            for slot in obj.material_slots:
+                if slot.material is not None:
+                    mats[slot.material.name] = slot.material
+    return list(mats.values())
+
+
+def proxy_resolution(scene, proxy=PROXY):
+    r = scene.render
+    aspect = (r.resolution_y * r.pixel_aspect_y) / (r.resolution_x * r.pixel_aspect_x)
+    return proxy["width"], max(1, round(proxy["width"] * aspect))
+
+
+def proxy_render(scene, path, proxy=PROXY):
+    """Render Cycles proxy (risoluzione, samples, texture, bounces ridotti) → pixel display."""
+    scene.render.resolution_x, scene.render.resolution_y = proxy_resolution(scene, proxy)
+    scene.render.resolution_percentage = 100
+    scene.cycles.samples = proxy["samples"]
+    scene.cycles.max_bounces = proxy["max_bounces"]
+    scene.cycles.texture_limit_render = proxy["texture_limit"]
+    scene.cycles.use_denoising = True
+    scene.cycles.denoising_prefilter = 'FAST'
+    scene.cycles.denoising_quality = 'FAST'
+    return _render_png(scene, path)
+
+
+# ============================================================
+# PRE-FLIGHT
+# ============================================================
+def check(scene=None, target=None, rules=None, output=None, limits=LIMITS, proxy=PROXY):
+    """Render proxy + ID e controlli → report {ok, checks, proxy, s}.
+
+    target: nomi di oggetti da trovare in inquadratura (None: tutta la geometria).
+    output: render finale; il proxy va in <output>_preflight.png (+ .json).
+    """
+    scene = scene or bpy.context.scene
+    rules = MATERIAL_RULES if rules is None else rules
+    output = Path(output or bpy.path.abspath(scene.render.filepath) or "preflight.png")
+    path = preflight_path(output)
+    t0 = time.perf_counter()
+    if scene.camera is None:
+        report = dict(ok=False, proxy=None, s=0.0,
+                      checks=[_check("camera", False, None, "scene.camera")])
+        print_report(report)
+        return report
+
+    saved = [(struct, _snapshot(struct, attrs)) for struct, attrs in _settings(scene)]
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        pixels = proxy_render(scene, path, proxy)
+        with tempfile.TemporaryDirectory(prefix="hf_preflight_") as tmp:
+            mats = _scene_materials(scene)
+            by_mat, geometry = _id_render(scene, Path(tmp) / "materials.png", 'MATERIAL', mats)
+            objects = [bpy.data.objects[n] for n in (target or ()) if n in bpy.data.objects]
+            target_masks = _id_render(scene, Path(tmp) / "objects.png", 'OBJECT', objects)[0] if objects else {}
+    finally:
+        for struct, values in saved:
+            _restore(struct, values)
+
+    masks = {}
+    for mat, mask in by_mat.items():
+        label = material_label(mat)
+        masks[label] = mask if label not in masks else masks[label] | mask
+    rgb = pixels[..., :3]
+    opaque = pixels[..., 3] > 0.5            # film_transparent: lo sfondo non conta nelle statistiche
+    checks = image_checks(rgb[opaque] if opaque.any() else rgb.reshape(-1, 3), limits)
+    if target:
+        missing = [n for n in target if n not in bpy.data.objects]
+        if missing:
+            checks.append(_check("target", False, missing, "oggetti in scena"))
+        target_mask = np.zeros(rgb.shape[:2], dtype=bool)
+        for mask in target_masks.values():
+            target_mask |= mask
+        checks += frame_check(target_mask, limits)
+    else:
+        checks += frame_check(geometry, limits)
+    checks += region_checks(rgb, masks, rules, limits)
+
+    ok = all(c["ok"] for c in checks if c["level"] == "error")
+    report = dict(ok=ok, proxy=str(path), s=round(time.perf_counter() - t0, 2),
+                  resolution=list(pixels.shape[1::-1]), samples=proxy["samples"],
+                  regions={k: int(v.sum()) for k, v in masks.items()}, checks=checks)
+    path.with_suffix(".json").write_text(json.dumps(report, indent=2))
+    print_report(report)
+    return report
+
+
+def gate(scene=None, tier=None, **kwargs):
+    """Pre-flight prima del render finale: PreflightError se un controllo 'error' fallisce.
+
+    Solo per i livelli in PREFLIGHT_TIERS (i draft costano già come un proxy).
+    """
+    if (tier is not None and tier not in PREFLIGHT_TIERS) or not enabled():
+        return None
+    with instrument.span("preflight"):
+        report = check(scene, **kwargs)
+    if not report["ok"]:
+        raise PreflightError(report)
+    return report
+
+
+def print_report(report):
+    print(f"  Pre-flight {'OK' if report['ok'] else 'FALLITO'} ({report['s']:.1f}s)"
+          + (f" → {Path(report['proxy']).name}" if report["proxy"] else ""))
+    for c in report["checks"]:
+        state = "ok" if c["ok"] else ("ERRORE" if c["level"] == "error" else "attenzione")
+        note = f"  {c['note']}" if c.get("note") else ""
+        print(f"    {c['name']:<26} {state:<10} {c['value']!s:<18} limite {c['limit']}{note}")
+
+
+def _rule(text):
+    """'Rame_Brunito:5:50' → (nome, {hue: (5, 50)})."""
+    name, lo, hi = text.rsplit(":", 2)
+    return name, dict(hue=(float(lo), float(hi)))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — pre-flight proxy del .blend aperto")
+    ap.add_argument("--target", action="append", help="oggetto da trovare in inquadratura (ripetibile)")
+    ap.add_argument("--rule", action="append", type=_rule, default=[],
+                    help="regola tinta MATERIALE:HUE_MIN:HUE_MAX (si aggiunge a MATERIAL_RULES)")
+    ap.add_argument("--output", help="render finale di riferimento (default scene.render.filepath)")
+    args = ap.parse_args(script_args() if argv is None else argv)
+    rules = dict(MATERIAL_RULES)
+    for name, rule in args.rule:
+        rules[name] = dict(rules.get(name, {}), **rule)
+    report = check(bpy.context.scene, args.target, rules, args.output)
+    sys.exit(0 if report["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+HomeForge AI — Render progressivo con checkpoint e stop anticipato
+Un render L4 sbagliato (rame che vira al verde sotto AgX, texture in scala
+errata) si riconosce in pochi secondi, ma render.render() arriva sempre a
+512 samples. Qui il render procede a segmenti di samples contigui
+(cycles.sample_offset, BVH tenuto con use_persistent_data): dopo ogni
+checkpoint (16/64/128/...) l'accumulo dei segmenti è scritto come
+<output>_s0016.png e passato a un hook, che può fermare il render.
+
+La media pesata dei segmenti è esattamente il render con tutti i samples
+(adaptive sampling spento durante i segmenti). A fine schedule:
+- denoise spento → l'accumulo prosegue fino al totale: costo extra nullo;
+- denoise acceso → render finale normale (il denoiser vuole tutti i samples
+  in un solo render): costo extra = samples dell'ultimo checkpoint.
+
+Hook: hook(checkpoint) con checkpoint = {samples, total, fraction, elapsed,
+path, pixels}; pixels = accumulo lineare float32 (h, w, 4) come
+compositing.read_pixels. Ritornare False ferma il render.
+
+    blender --background --python chain/training_tetto_piode.py -- --progressive
+    blender ... -- --checkpoints 16,64 --hook my_checks.py:rame_ok
+    HF_CHECKPOINTS=16,64,128 python chain/homeforge/render_daemon.py chain/L4_script.py
+
+Negli script: render_cache.render(..., renderer=progressive.renderer_from_args(scene, OUTPUT)).
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+import importlib
+import importlib.util
+from pathlib import Path
+
+import bpy
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import script_args
+from homeforge import compositing, instrument
+
+CHECKPOINTS_ENV = "HF_CHECKPOINTS"
+DEFAULT_CHECKPOINTS = (16, 64, 128)
+
+
+def parse_checkpoints(text):
+    """'16,64,128' → (16, 64, 128)."""
+    return tuple(sorted({int(v) for v in str(text).replace(" ", "").split(",") if v}))
+
+
+def checkpoint_path(output, samples):
+    output = Path(output)
+    return output.with_name(f"{output.stem}_s{samples:04d}{output.suffix or '.png'}")
+
+
+# ============================================================
+# SEGMENTI
+# ============================================================
+def _render_exr(scene, path):
+    """Render del segmento corrente in EXR 32 bit lineare → pixel (h, w, 4)."""
+    settings = scene.render.image_settings
+    saved = (scene.render.filepath, settings.file_format, settings.color_depth, settings.color_mode)
+    scene.render.filepath = str(path)
+    settings.file_format = 'OPEN_EXR'
+    settings.color_depth = '32'
+    settings.color_mode = 'RGBA'
+    try:
+        with instrument.render_phases():
+            bpy.ops.render.render(write_still=True)
+    finally:
+        scene.render.filepath, settings.file_format, settings.color_depth, settings.color_mode = saved
+    img = bpy.data.images.load(str(path), check_existing=False)
+    try:
+        return compositing.read_pixels(img)
+    finally:
+        bpy.data.images.remove(img)
+
+
+def save_buffer(scene, pixels, path):
+    """Accumulo lineare → immagine con formato e view transform della scena (AgX)."""
+    h, w = pixels.shape[:2]
+    img = bpy.data.images.new("hf_progressive", w, h, alpha=True, float_buffer=True)
+    try:
+        compositing.write_pixels(img, pixels)
+        img.save_render(str(path), scene=scene)
+    finally:
+        bpy.data.images.remove(img)
+    return str(path)
+
+
+def render(scene=None, output=None, checkpoints=DEFAULT_CHECKPOINTS, hook=None):
+    """Render a segmenti con checkpoint → {output, total, checkpoints, stopped_at, complete}."""
+    scene = scene or bpy.context.scene
+    output = Path(output or bpy.path.abspath(scene.render.filepath))
+    cycles = scene.cycles
+    total = cycles.samples
+    marks = [c for c in sorted(set(checkpoints)) if 0 < c < total]
+    denoise = cycles.use_denoising
+    segments = marks + ([] if denoise else [total])
+    result = dict(output=str(output), total=total, checkpoints=[], stopped_at=None, complete=False)
+
+    saved = (cycles.samples, cycles.sample_offset, cycles.use_adaptive_sampling, cycles.use_denoising)
+    persistent = scene.render.use_persistent_data
+    scene.render.use_persistent_data = True  # BVH e sync una volta sola, anche per il finale
+    done, acc = 0, None
+    t0 = time.perf_counter()
+    try:
+        cycles.use_adaptive_sampling = False     # segmenti sommabili: stessi samples per pixel
+        cycles.use_denoising = False
+        try:
+            with tempfile.TemporaryDirectory(prefix="hf_progressive_") as tmp:
+                for target in segments:
+                    cycles.sample_offset = done
+                    cycles.samples = target - done
+                    chunk = _render_exr(scene, Path(tmp) / f"segment_{target}.exr")
+                    acc = chunk if acc is None else (acc * done + chunk * (target - done)) / target
+                    done = target
+                    if target == total:
+                        break
+                    path = save_buffer(scene, acc, checkpoint_path(output, done))
+                    elapsed = time.perf_counter() - t0
+                    result["checkpoints"].append(path)
+                    print(f"  Checkpoint {done}/{total} samples ({100 * done / total:.0f}%) "
+                          f"{elapsed:.1f}s → {Path(path).name}")
+                    if hook is not None and hook(dict(samples=done, total=total, fraction=done / total,
+                                                      elapsed=elapsed, path=path, pixels=acc)) is False:
+                        result["stopped_at"] = done
+                        print(f"  Render fermato dall'hook a {done}/{total} samples")
+                        return result
+        finally:
+            cycles.samples, cycles.sample_offset, cycles.use_adaptive_sampling, cycles.use_denoising = saved
+
+        if denoise:
+            with instrument.render_phases():
+                bpy.ops.render.render(write_still=True)
+        else:
+            save_buffer(scene, acc, output)
+    finally:
+        scene.render.use_persistent_data = persistent
+    result["complete"] = True
+    return result
+
+
+# ============================================================
+# HOOK
+# ============================================================
+def load_hook(spec):
+    """'modulo:funzione' o 'percorso/file.py:funzione' → callable."""
+    target, _, name = spec.rpartition(":")
+    if not target or not name:
+        raise ValueError(f"Hook non valido: {spec!r} (atteso modulo:funzione)")
+    if target.endswith(".py"):
+        module_spec = importlib.util.spec_from_file_location(Path(target).stem, target)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(target)
+    return getattr(module, name)
+
+
+def green_guard(region=(0.0, 0.0, 1.0, 1.0), max_ratio=1.0):
+    """Hook: ferma se nella regione (frazioni x0, y0, x1, y1 dal basso a sinistra)
+    il verde medio supera il rosso × max_ratio — il rame ossidato al posto del bruno."""
+    def hook(checkpoint):
+        px = checkpoint["pixels"]
+        h, w = px.shape[:2]
+        x0, y0, x1, y1 = region
+        crop = px[int(y0 * h):max(int(y1 * h), int(y0 * h) + 1),
+                  int(x0 * w):max(int(x1 * w), int(x0 * w) + 1), :3]
+        r, g = float(np.mean(crop[..., 0])), float(np.mean(crop[..., 1]))
+        if g > r * max_ratio:
+            print(f"  green_guard: G {g:.3f} > R {r:.3f} × {max_ratio}")
+            return False
+        return True
+    return hook
+
+
+def renderer_from_args(scene, output, argv=None):
+    """Renderer per render_cache.render se lo script è lanciato con --progressive,
+    --checkpoints o --hook (o HF_CHECKPOINTS); None = render normale."""
+    ap = argparse.ArgumentParser(add_help=False)
+    ap.add_argument("--progressive", action="store_true")
+    ap.add_argument("--checkpoints", type=parse_checkpoints)
+    ap.add_argument("--hook")
+    args, _ = ap.parse_known_args(script_args(argv))
+    checkpoints = args.checkpoints or (parse_checkpoints(os.environ[CHECKPOINTS_ENV])
+                                       if os.environ.get(CHECKPOINTS_ENV) else None)
+    if not (args.progressive or checkpoints or args.hook):
+        return None
+    hook = load_hook(args.hook) if args.hook else None
+    return lambda: render(scene, output, checkpoints or DEFAULT_CHECKPOINTS, hook)["complete"]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — render progressivo del .blend aperto")
+    ap.add_argument("--output", help="default: scene.render.filepath")
+    ap.add_argument("--checkpoints", type=parse_checkpoints, default=DEFAULT_CHECKPOINTS)
+    ap.add_argument("--hook", help="modulo:funzione o file.py:funzione")
+    ap.add_argument("--stop-at", type=int, help="ferma al primo checkpoint ≥ N samples (prova)")
+    args = ap.parse_args(script_args() if argv is None else argv)
+    hook = load_hook(args.hook) if args.hook else None
+    if args.stop_at:
+        inner = hook
+        hook = lambda cp: cp["samples"] < args.stop_at and (inner is None or inner(cp) is not False)
+    result = render(bpy.context.scene, args.output, args.checkpoints, hook)
+    print(f"{'Completato' if result['complete'] else 'Fermato'}: {result['output']} "
+          f"({len(result['checkpoints'])} checkpoint)")
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+HomeForge AI — Livelli di qualità del render (draft / preview / final)
+Ogni script della chain legge il livello da riga di comando (dopo `--`) o
+dalla variabile d'ambiente HF_TIER; default `final` (512 samples, come prima).
+
+    blender --background --python chain/training_tetto_piode.py -- --tier draft
+    HF_TIER=preview blender --background --python chain/training_muro_pietra.py
+
+Il livello imposta samples, noise threshold adattivo, percentuale risoluzione,
+max bounces, limite texture e denoiser. Ogni immagine registra il livello che
+l'ha prodotta: nota nei metadati PNG (stamp note) + sidecar JSON accanto al
+file; le immagini non-final hanno il suffisso _<tier> e non sovrascrivono i final.
+
+Modulo puro: nessun import di bpy (la scena viene passata dagli script).
+"""
+import os
+import json
+import argparse
+from pathlib import Path
+
+from homeforge import script_args
+
+ENV_VAR = "HF_TIER"
+SEED_ENV = "HF_SEED"
+DEFAULT_TIER = "final"
+
+TIERS = {
+    # lookdev: iterazioni su colore/mapping (rame, piode)
+    "draft": dict(samples=32, noise_threshold=0.1, resolution_percentage=50,
+                  max_bounces=4, texture_limit='512',
+                  denoising_prefilter='FAST', denoising_quality='FAST'),
+    # controllo composizione e luci
+    "preview": dict(samples=128, noise_threshold=0.03, resolution_percentage=75,
+                    max_bounces=8, texture_limit='1024',
+                    denoising_prefilter='ACCURATE', denoising_quality='BALANCED'),
+    # consegna (valori storici degli script)
+    "final": dict(samples=512, noise_threshold=0.01, resolution_percentage=100,
+                  max_bounces=12, texture_limit='OFF',
+                  denoising_prefilter='ACCURATE', denoising_quality='HIGH'),
+}
+
+
+def get_tier(argv=None):
+    """Nome del livello: --tier da argv, poi HF_TIER, poi DEFAULT_TIER."""
+    ap = argparse.ArgumentParser(add_help=False)
+    ap.add_argument("--tier")
+    args, _ = ap.parse_known_args(script_args(argv))
+    tier = (args.tier or os.environ.get(ENV_VAR) or DEFAULT_TIER).lower()
+    if tier not in TIERS:
+        raise ValueError(f"Livello qualità sconosciuto: {tier!r} (validi: {', '.join(TIERS)})")
+    return tier
+
+
+def apply_tier(scene, tier=None):
+    """Applica il livello alla scena Cycles e ritorna {name, ...impostazioni}."""
+    tier = tier or get_tier()
+    if tier not in TIERS:
+        raise ValueError(f"Livello qualità sconosciuto: {tier!r} (validi: {', '.join(TIERS)})")
+    t = TIERS[tier]
+    cycles = scene.cycles
+    cycles.samples = t["samples"]
+    cycles.seed = int(os.environ.get(SEED_ENV, 0))      # rumore riproducibile (benchmark)
+    cycles.use_animated_seed = False
+    cycles.use_adaptive_sampling = True
+    cycles.adaptive_threshold = t["noise_threshold"]
+    cycles.max_bounces = t["max_bounces"]
+    cycles.texture_limit_render = t["texture_limit"]
+    cycles.use_denoising = True
+    cycles.denoiser = 'OPENIMAGEDENOISE'
+    cycles.denoising_prefilter = t["denoising_prefilter"]
+    cycles.denoising_quality = t["denoising_quality"]
+    scene.render.resolution_percentage = t["resolution_percentage"]
+
+    # Metadati nel file immagine (non impressi sull'immagine: use_stamp resta False)
+    scene.render.use_stamp_note = True
+    scene.render.stamp_note_text = f"hf_tier={tier} samples={t['samples']}"
+    scene["hf_tier"] = tier
+    print(f"  Qualità: {tier} — {t['samples']} samples, "
+          f"{t['resolution_percentage']}%, bounces {t['max_bounces']}, "
+          f"texture {t['texture_limit']}")
+    return dict(t, name=tier)
+
+
+def tier_output(path, tier):
+    """Percorso output per il livello: final invariato, altrimenti <stem>_<tier>."""
+    path = Path(path)
+    if tier == "final":
+        return str(path)
+    return str(path.with_name(f"{path.stem}_{tier}{path.suffix}"))
+
+
+def record_render(output_path, tier_settings, elapsed=None, **extra):
+    """Sidecar JSON <immagine>.json con livello, impostazioni e tempo di render."""
+    sidecar = Path(output_path).with_suffix(".json")
+    record = dict(image=Path(output_path).name, tier=tier_settings["name"],
+                  settings={k: v for k, v in tier_settings.items() if k != "name"})
+    if elapsed is not None:
+        record["render_s"] = round(elapsed, 2)
+    record.update(extra)
+    sidecar.write_text(json.dumps(record, indent=2))
+    return sidecar
@@ -0,0 +1,422 @@
+"""
+HomeForge AI — Cache dei render per impronta della scena (content-addressed)
+Uno script rilanciato senza modifiche rifaceva minuti di Cycles per la stessa
+immagine. L'impronta copre tutto ciò che entra nel render:
+
+- geometria valutata (modifier e Geometry Nodes applicati): hash NumPy di
+  vertici, poligoni e material slot per mesh + matrici di ogni istanza;
+- node tree di materiali, world e node group: nodi, proprietà, valori degli
+  input, link; immagini per hash del contenuto del file (+ colorspace);
+- visibilità ai raggi, holdout e shadow catcher per oggetto, flag delle
+  collection (holdout, indirect only), view layer (samples, pass, material
+  override), world (node tree + impostazioni Cycles);
+- camera, luci, impostazioni di render / Cycles / color management / formato
+  (il percorso di output no), versione di Blender.
+
+Se l'impronta è già in cache l'immagine viene copiata in millisecondi.
+Cache: output/render_cache/<fp[:2]>/<fp>.<ext> + <fp>.json; eviction per età
+(MAX_AGE_DAYS) e poi LRU fino a stare sotto MAX_SIZE_MB ($HF_RENDER_CACHE_MB).
+HF_RENDER_CACHE=0 disattiva la cache.
+
+    result = render_cache.render(scene, OUTPUT, prepare=instrument.load_images)
+    if result["hit"]: ...            # nessun render, OUTPUT copiato dalla cache
+
+    blender --background --python chain/homeforge/render_cache.py -- --stats [--evict]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+from pathlib import Path
+
+import bpy
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import OUTPUT_DIR, script_args
+from homeforge import instrument
+from homeforge.texture_cache import file_hash
+
+CACHE_DIR = OUTPUT_DIR / "render_cache"
+ENABLE_ENV = "HF_RENDER_CACHE"
+SIZE_ENV = "HF_RENDER_CACHE_MB"
+MAX_SIZE_MB = int(os.environ.get(SIZE_ENV, 2000))
+MAX_AGE_DAYS = 30
+# Proprietà che non cambiano i pixel
+SKIP_PROPS = {"rna_type", "filepath", "name", "name_full", "session_uid", "is_evaluated",
+              "original", "users", "use_fake_user", "is_dirty", "tag", "select", "location"}
+
+# Proprietà dell'oggetto che cambiano i pixel senza toccare geometria o materiali
+OBJECT_RENDER_PROPS = {"visible_camera", "visible_diffuse", "visible_glossy", "visible_transmission",
+                       "visible_volume_scatter", "visible_shadow", "is_holdout",
+                       "is_shadow_catcher", "pass_index"}
+
+# (path, size, mtime_ns) → hash: i file immagine vengono riletti solo se cambiano
+_FILE_HASHES = {}
+
+
+# ============================================================
+# IMPRONTA
+# ============================================================
+def _rna_values(struct, skip=()):
+    """Valori delle proprietà semplici (numeri, enum, stringhe, array) di una struct RNA."""
+    values = []
+    for prop in struct.bl_rna.properties:
+        key = prop.identifier
+        if key in SKIP_PROPS or key in skip or prop.type in ('POINTER', 'COLLECTION'):
+            continue
+        try:
+            value = getattr(struct, key)
+        except (AttributeError, RuntimeError):
+            continue
+        if hasattr(value, "__len__") and not isinstance(value, str):
+            value = tuple(round(v, 6) if isinstance(v, float) else v for v in value)
+        elif isinstance(value, float):
+            value = round(value, 6)
+        elif isinstance(value, set):
+            value = tuple(sorted(value))
+        values.append((key, value))
+    return values
+
+
+def _object_render_values(obj):
+    """Visibilità ai raggi, holdout, shadow catcher e light linking di un oggetto."""
+    values = [kv for kv in _rna_values(obj) if kv[0] in OBJECT_RENDER_PROPS]
+    linking = getattr(obj, "light_linking", None)
+    if linking is not None:
+        values.append(tuple(c.name if c else None for c in (linking.receiver_collection,
+                                                            linking.blocker_collection)))
+    return values
+
+
+def _layer_collections(layer, out):
+    """Flag di collection per view layer: exclude, holdout, indirect only, hide_render."""
+    out.append((layer.name, layer.exclude, layer.holdout, layer.indirect_only,
+                layer.collection.hide_render))
+    for child in layer.children:
+        _layer_collections(child, out)
+    return out
+
+
+def _view_layer_values(layer):
+    """Samples, pass (use_pass_*), material override e flag delle collection di un view layer."""
+    override = layer.material_override
+    cycles = getattr(layer, "cycles", None)
+    return (layer.name, _rna_values(layer), _rna_values(cycles) if cycles is not None else (),
+            override.name if override else None, _layer_collections(layer.layer_collection, []))
+
+
+def _image_hash(img):
+    path = Path(bpy.path.abspath(img.filepath)) if img.filepath else None
+    if path is None or not path.exists():
+        # immagine generata o impacchettata: nome, dimensioni, tipo
+        return f"gen:{img.name}:{tuple(img.size)}:{img.generated_type if img.source == 'GENERATED' else ''}"
+    stat = path.stat()
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _FILE_HASHES:
+        _FILE_HASHES[key] = file_hash(path)
+    return _FILE_HASHES[key]
+
+
+def _node_tree_hash(tree, seen):
+    """Hash di un node tree: nodi ordinati per nome, proprietà, input, link; gruppi ricorsivi."""
+    if tree is None:
+        return "none"
+    if tree.name in seen:
+        return seen[tree.name]
+    h = hashlib.sha1(tree.bl_idname.encode())
+    for node in sorted(tree.nodes, key=lambda n: n.name):
+        h.update(repr((node.name, node.bl_idname, _rna_values(node, skip={"width", "height",
+                       "dimensions", "location_absolute", "hide", "show_preview"}))).encode())
+        for sock in node.inputs:
+            if hasattr(sock, "default_value"):
+                value = sock.default_value
+                if hasattr(value, "__len__") and not isinstance(value, str):
+                    value = tuple(round(v, 6) for v in value)
+                elif isinstance(value, float):
+                    value = round(value, 6)
+                elif hasattr(value, "name"):                 # socket oggetto/materiale/immagine
+                    value = value.name
+                h.update(repr((sock.identifier, value)).encode())
+        image = getattr(node, "image", None)
+        if image is not None:
+            h.update(repr((_image_hash(image), image.colorspace_settings.name,
+                           image.alpha_mode)).encode())
+        group = getattr(node, "node_tree", None)
+        if group is not None:
+            h.update(_node_tree_hash(group, seen).encode())
+    for link in tree.links:
+        h.update(repr((link.from_node.name, link.from_socket.identifier,
+                       link.to_node.name, link.to_socket.identifier, link.is_muted)).encode())
+    seen[tree.name] = h.hexdigest()
+    return seen[tree.name]
+
+
+def node_tree_hash(tree):
+    """Hash dei parametri di un node tree (bake_cache, copie _merged / _inst dei materiali)."""
+    return _node_tree_hash(tree, {})
+
+
+# data_type attributo mesh → (campo foreach_get, componenti, dtype)
+ATTR_FIELDS = {
+    'FLOAT': ("value", 1, np.float32), 'INT': ("value", 1, np.int32),
+    'INT8': ("value", 1, np.int32), 'BOOLEAN': ("value", 1, bool),
+    'FLOAT2': ("vector", 2, np.float32), 'INT32_2D': ("value", 2, np.int32),
+    'FLOAT_VECTOR': ("vector", 3, np.float32), 'QUATERNION': ("value", 4, np.float32),
+    'FLOAT_COLOR': ("color", 4, np.float32), 'BYTE_COLOR': ("color", 4, np.float32),
+}
+
+
+def _mesh_hash(mesh):
+    h = hashlib.sha1()
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    h.update(co.tobytes())
+    loops = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loops)
+    h.update(loops.tobytes())
+    verts = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", verts)
+    h.update(verts.tobytes())
+    mat_idx = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("material_index", mat_idx)
+    h.update(mat_idx.tobytes())
+    smooth = np.empty(len(mesh.polygons), dtype=bool)
+    mesh.polygons.foreach_get("use_smooth", smooth)
+    h.update(smooth.tobytes())
+    for attr in sorted(mesh.attributes, key=lambda a: a.name):    # UV, hf_generated, colori, ...
+        if attr.name.startswith(".") or attr.name == "position" or attr.data_type not in ATTR_FIELDS:
+            continue
+        field, width, dtype = ATTR_FIELDS[attr.data_type]
+        data = np.empty(len(attr.data) * width, dtype=dtype)
+        attr.data.foreach_get(field, data)
+        h.update(repr((attr.name, attr.domain, attr.data_type)).encode())
+        h.update(data.tobytes())
+    return h.hexdigest()
+
+
+def _matrix(m):
+    return np.array(m, dtype=np.float32).round(5).tobytes()
+
+
+def scene_fingerprint(scene=None):
+    """Impronta esadecimale della scena valutata, come la vede il render."""
+    scene = scene or bpy.context.scene
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    h = hashlib.sha1(bpy.app.version_string.encode())
+    trees = {}
+    meshes = {}
+    materials = set()
+
+    instances = []
+    for inst in depsgraph.object_instances:
+        obj = inst.object
+        if obj.hide_render:
+            continue
+        entry = [obj.type, _matrix(inst.matrix_world), _object_render_values(obj)]
+        if obj.type == 'MESH':
+            # mesh valutata (dopo i modifier): oggetti con la stessa mesh originale ma
+            # modifier diversi hanno mesh valutate distinte
+            key = obj.data.session_uid
+            if key not in meshes:
+                meshes[key] = _mesh_hash(obj.data)
+            entry.append(meshes[key])
+            slots = [s.material.name if s.material else None for s in obj.material_slots]
+            materials.update(m for m in slots if m)
+            entry.append(slots)
+        elif obj.type == 'LIGHT':
+            entry.append(_rna_values(obj.data))
+            entry.append(_node_tree_hash(obj.data.node_tree, trees) if obj.data.use_nodes else "")
+        elif obj.type == 'CAMERA':
+            entry.append(_rna_values(obj.data))
+        instances.append(repr(entry).encode())
+    for entry in sorted(instances):                      # ordine delle istanze irrilevante
+        h.update(entry)
+
+    for name in sorted(materials):
+        mat = bpy.data.materials[name]
+        h.update(repr((name, _rna_values(mat, skip={"pass_index", "paint_active_slot"}))).encode())
+        h.update(_node_tree_hash(mat.node_tree, trees).encode())
+
+    cam = scene.camera
+    h.update(repr((cam.name if cam else None,
+                   _matrix(cam.matrix_world) if cam else None)).encode())
+    world = scene.world
+    if world is not None:
+        h.update(_node_tree_hash(world.node_tree, trees).encode())
+        for struct in (world, getattr(world, "cycles", None), getattr(world, "light_settings", None)):
+            if struct is not None:
+                h.update(repr(_rna_values(struct)).encode())
+    for struct in (scene.render, scene.render.image_settings, scene.cycles,
+                   scene.view_settings, scene.display_settings):
+        h.update(repr(_rna_values(struct)).encode())
+    # samples, pass, material override, holdout / indirect only delle collection
+    for layer in scene.view_layers:
+        h.update(repr(_view_layer_values(layer)).encode())
+    h.update(repr(scene.frame_current).encode())
+    return h.hexdigest()
+
+
+# ============================================================
+# CACHE
+# ============================================================
+def enabled():
+    return os.environ.get(ENABLE_ENV, "1") != "0"
+
+
+def _entry_paths(fingerprint, ext=".png"):
+    folder = CACHE_DIR / fingerprint[:2]
+    return folder / f"{fingerprint}{ext}", folder / f"{fingerprint}.json"
+
+
+def fetch(fingerprint, output):
+    """Copia l'immagine in cache su output → True se presente."""
+    image, meta_path = _entry_paths(fingerprint, Path(output).suffix or ".png")
+    if not image.exists() or not meta_path.exists():
+        return False
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    if Path(output).resolve() != image.resolve():
+        shutil.copy2(image, output)
+    meta = json.loads(meta_path.read_text())
+    meta["last_used"] = time.time()
+    meta["hits"] = meta.get("hits", 0) + 1
+    meta_path.write_text(json.dumps(meta, indent=2))
+    return True
+
+
+def store(fingerprint, output, **meta):
+    """Copia l'immagine renderizzata in cache e applica l'eviction."""
+    image, meta_path = _entry_paths(fingerprint, Path(output).suffix or ".png")
+    image.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(output, image)
+    now = time.time()
+    meta_path.write_text(json.dumps(dict(meta, fingerprint=fingerprint, source=str(output),
+                                         size=image.stat().st_size, created=now,
+                                         last_used=now, hits=0), indent=2))
+    evict()
+    return image
+
+
+def entries():
+    """[(meta, image_path, meta_path)] di tutta la cache."""
+    result = []
+    if not CACHE_DIR.exists():
+        return result
+    for meta_path in CACHE_DIR.glob("*/*.json"):
+        try:
+            meta = json.loads(meta_path.read_text())
+        except ValueError:
+            meta_path.unlink()
+            continue
+        images = [p for p in meta_path.parent.glob(meta_path.stem + ".*") if p != meta_path]
+        if images:
+            result.append((meta, images[0], meta_path))
+        else:
+            meta_path.unlink()
+    return result
+
+
+def evict(max_size_mb=None, max_age_days=MAX_AGE_DAYS):
+    """Rimuove le voci più vecchie di max_age_days, poi le meno usate oltre max_size_mb."""
+    max_size = (max_size_mb or MAX_SIZE_MB) * 2**20
+    now = time.time()
+    removed = 0
+    kept = []
+    for meta, image, meta_path in entries():
+        if now - meta.get("last_used", 0) > max_age_days * 86400:
+            image.unlink(missing_ok=True)
+            meta_path.unlink(missing_ok=True)
+            removed += 1
+        else:
+            kept.append((meta, image, meta_path))
+    total = sum(image.stat().st_size for _, image, _ in kept)
+    for meta, image, meta_path in sorted(kept, key=lambda e: e[0].get("last_used", 0)):
+        if total <= max_size:
+            break
+        total -= image.stat().st_size
+        image.unlink(missing_ok=True)
+        meta_path.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+# ============================================================
+# RENDER
+# ============================================================
+def _render(renderer):
+    if renderer is not None:
+        return renderer()
+    with instrument.render_phases():
+        bpy.ops.render.render(write_still=True)
+    return True
+
+
+def render(scene=None, output=None, prepare=None, renderer=None, **meta):
+    """Render con cache: impronta → copia dalla cache, altrimenti prepare() + render + store.
+
+    output: default scene.render.filepath. renderer: callable al posto di
+    render.render(write_still=True) che ritorna False se il render non è
+    completo (homeforge/progressive.py: fermato dall'hook) → nessuno store.
+    Ritorna {hit, complete, fingerprint, fingerprint_s}.
+    """
+    scene = scene or bpy.context.scene
+    output = str(output or bpy.path.abspath(scene.render.filepath))
+    if not enabled():
+        if prepare:
+            with instrument.span("images"):
+                prepare()
+        complete = _render(renderer)
+        return dict(hit=False, complete=complete, fingerprint=None, fingerprint_s=0.0)
+
+    t0 = time.perf_counter()
+    with instrument.span("fingerprint"):
+        fingerprint = scene_fingerprint(scene)
+    fingerprint_s = time.perf_counter() - t0
+    if fetch(fingerprint, output):
+        print(f"  Render cache: hit {fingerprint[:12]} ({fingerprint_s * 1000:.0f} ms) → {output}")
+        return dict(hit=True, complete=True, fingerprint=fingerprint, fingerprint_s=fingerprint_s)
+
+    if prepare:
+        with instrument.span("images"):
+            prepare()
+    t0 = time.perf_counter()
+    complete = _render(renderer)
+    if complete:
+        store(fingerprint, output, render_s=round(time.perf_counter() - t0, 2), **meta)
+        print(f"  Render cache: salvato {fingerprint[:12]} (impronta {fingerprint_s * 1000:.0f} ms)")
+    return dict(hit=False, complete=complete, fingerprint=fingerprint, fingerprint_s=fingerprint_s)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — cache dei render")
+    ap.add_argument("--stats", action="store_true")
+    ap.add_argument("--evict", action="store_true", help="applica subito l'eviction")
+    ap.add_argument("--clear", action="store_true", help="svuota la cache")
+    ap.add_argument("--fingerprint", action="store_true",
+                    help="impronta della scena aperta (e tempo di calcolo)")
+    args = ap.parse_args(script_args() if argv is None else argv)
+
+    if args.clear and CACHE_DIR.exists():
+        shutil.rmtree(CACHE_DIR)
+    if args.evict:
+        print(f"Rimosse {evict()} voci")
+    if args.fingerprint:
+        t0 = time.perf_counter()
+        fp = scene_fingerprint()
+        print(f"{fp}  ({(time.perf_counter() - t0) * 1000:.1f} ms)")
+    if args.stats:
+        items = entries()
+        size = sum(image.stat().st_size for _, image, _ in items)
+        hits = sum(meta.get("hits", 0) for meta, _, _ in items)
+        saved = sum(meta.get("hits", 0) * meta.get("render_s", 0) for meta, _, _ in items)
+        print(f"Render cache: {len(items)} voci, {size / 2**20:.1f} / {MAX_SIZE_MB} MB, "
+              f"{hits} hit, ~{saved / 60:.1f} min di render risparmiati")
+
+
+if __name__ == "__main__":
+    main()
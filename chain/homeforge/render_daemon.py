@@ -0,0 +1,388 @@
+"""
+HomeForge AI — Render daemon (Blender headless "caldo" su socket Unix locale)
+Ogni render paga di nuovo avvio di Blender, caricamento kernel Cycles, add-on
+e decodifica texture: nei draft è la parte più lunga. Il daemon è un
+`blender --background` a lunga vita che esegue job in sequenza nella stessa
+sessione. Tra un job e l'altro restano in memoria i moduli homeforge, i
+materiali, le immagini decodificate e i node group (scene_setup.keep_warm()).
+
+Protocollo: una riga JSON per richiesta sul socket, risposte JSON lines in
+streaming (accepted → progress ... → done | error) fino alla chiusura.
+
+    {"op": "render", "script": "chain/L4_script.py", "tier": "draft",
+     "args": [], "output": "output/render.png"}
+    {"op": "status"}            {"op": "stop"}
+
+Il daemon si ricicla (exit RECYCLE_EXIT) dopo --max-jobs job o oltre
+--max-rss-mb: il supervisore lo rilancia e il job successivo riparte pulito.
+Un thread di ascolto risponde a status/stop anche durante un render (i job
+girano sul thread principale, come vuole bpy); stop a daemon occupato chiude
+dopo il job in corso.
+
+    python chain/homeforge/render_daemon.py --start &             # supervisore
+    python chain/homeforge/render_daemon.py chain/L4_script.py --tier draft
+    python chain/homeforge/render_daemon.py --status
+    python chain/homeforge/render_daemon.py --stop
+
+Il client e il supervisore non importano bpy. Senza daemon attivo il client
+lancia `blender --background --python <script>` come prima (salvo --no-fallback).
+"""
+import os
+import sys
+import json
+import time
+import queue
+import runpy
+import socket
+import argparse
+import tempfile
+import traceback
+import threading
+import subprocess
+from pathlib import Path
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import PROJECT_DIR, script_args
+
+BLENDER = os.environ.get("BLENDER", "blender")
+SCRIPT = Path(__file__).resolve()
+SOCKET_ENV = "HF_DAEMON_SOCKET"
+SOCKET_PATH = Path(os.environ.get(SOCKET_ENV)
+                   or Path(tempfile.gettempdir()) / f"homeforge-render-{os.getuid()}.sock")
+MAX_JOBS = 50
+MAX_RSS_MB = 12000
+RECYCLE_EXIT = 75
+PROGRESS_EVERY_S = 0.5
+
+
+# ============================================================
+# PROTOCOLLO
+# ============================================================
+def _send(conn, event, **data):
+    """Una riga JSON al client; False se il client ha chiuso la connessione."""
+    try:
+        conn.sendall((json.dumps(dict(event=event, **data)) + "\n").encode())
+        return True
+    except OSError:
+        return False
+
+
+def _read_request(conn):
+    buf = b""
+    while not buf.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        buf += chunk
+    return json.loads(buf.decode() or "{}")
+
+
+def _resolve(path):
+    path = Path(path)
+    return path if path.is_absolute() else PROJECT_DIR / path
+
+
+# ============================================================
+# DAEMON (dentro Blender)
+# ============================================================
+class _Progress:
+    """Handler render_stats → righe "progress" al client (al più ogni PROGRESS_EVERY_S)."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.last = 0.0
+
+    def __call__(self, stats, *_):
+        now = time.monotonic()
+        if now - self.last >= PROGRESS_EVERY_S:
+            self.last = now
+            _send(self.conn, "progress", stats=str(stats))
+
+
+def _read_record(path):
+    """Record di instrument.finish() scritto in $HF_PHASES_JSON ({} se assente)."""
+    try:
+        text = Path(path).read_text()
+    except OSError:
+        return {}
+    return json.loads(text) if text.strip() else {}
+
+
+def run_job(job, conn):
+    """Esegue lo script del job nella sessione corrente → record di instrument.finish()."""
+    import bpy
+    from homeforge import instrument
+
+    script = _resolve(job["script"])
+    args = list(job.get("args", []))
+    if job.get("tier"):
+        args += ["--tier", job["tier"]]
+    fd, phases_path = tempfile.mkstemp(prefix="hf_job_", suffix=".json")
+    os.close(fd)
+    saved = sys.argv, dict(os.environ)
+    sys.argv = [BLENDER, "--background", "--python", str(script), "--", *args]
+    os.environ.update({instrument.PHASES_ENV: phases_path, **job.get("env", {})})
+    if job.get("tier"):
+        os.environ["HF_TIER"] = job["tier"]
+    progress = _Progress(conn)
+    bpy.app.handlers.render_stats.append(progress)
+    instrument.reset()
+    t0 = time.perf_counter()
+    try:
+        try:
+            runpy.run_path(str(script), run_name="__main__")
+        except SystemExit as e:
+            # raise SystemExit(0) dopo instrument.finish(status="STOPPED") (stop dell'hook
+            # progressive): uscita regolare, il record dello script è già scritto
+            if e.code not in (None, 0) or not _read_record(phases_path):
+                raise
+        record = _read_record(phases_path)
+    except (Exception, SystemExit) as e:
+        # Nessun sys.excepthook nel daemon: il record FAILED va scritto qui,
+        # salvo che lo script l'abbia già chiuso prima di sys.exit(1)
+        if not _read_record(phases_path):
+            instrument.error(f"{type(e).__name__}: {e}")
+            instrument.finish(script.name, status="FAILED", tier=job.get("tier"))
+        raise
+    finally:
+        if progress in bpy.app.handlers.render_stats:
+            bpy.app.handlers.render_stats.remove(progress)
+        sys.argv = saved[0]
+        os.environ.clear()
+        os.environ.update(saved[1])
+        Path(phases_path).unlink(missing_ok=True)
+    record["elapsed_s"] = round(time.perf_counter() - t0, 3)
+    record.setdefault("output", job.get("output"))
+    return record
+
+
+def _must_recycle(jobs_done, max_jobs, max_rss_mb):
+    from homeforge import instrument
+    return jobs_done >= max_jobs or instrument.rss_mb() > max_rss_mb
+
+
+def _listen(server, jobs, state):
+    """Thread di ascolto: status/stop subito, i render in coda per il thread principale."""
+    from homeforge import instrument
+    while True:
+        try:
+            conn, _ = server.accept()
+        except OSError:                        # server chiuso: il daemon sta uscendo
+            return
+        try:
+            request = _read_request(conn)
+        except (OSError, ValueError) as e:
+            _send(conn, "error", message=f"richiesta non valida: {e}")
+            conn.close()
+            continue
+        op = request.get("op", "render")
+        if op == "render":
+            jobs.put((conn, request))
+            continue
+        with conn:
+            if op == "status":
+                _send(conn, "status", pid=os.getpid(), jobs=state["jobs_done"],
+                      busy=state["job"] is not None, job=state["job"], queued=jobs.qsize(),
+                      uptime_s=round(time.time() - state["started"], 1),
+                      rss_mb=round(instrument.rss_mb(), 1),
+                      max_jobs=state["max_jobs"], max_rss_mb=state["max_rss_mb"])
+            elif op == "stop":
+                _send(conn, "stopped", jobs=state["jobs_done"], busy=state["job"] is not None)
+                state["stop"] = True             # prima dei job in coda
+                jobs.put(None)
+            else:
+                _send(conn, "error", message=f"op sconosciuta: {op!r}")
+
+
+def serve(socket_path=SOCKET_PATH, max_jobs=MAX_JOBS, max_rss_mb=MAX_RSS_MB):
+    """Loop del daemon: un job alla volta, exit RECYCLE_EXIT quando va riciclato."""
+    from homeforge import instrument, scene_setup
+    scene_setup.keep_warm()
+    socket_path = Path(socket_path)
+    socket_path.unlink(missing_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(socket_path))
+    server.listen(8)
+    print(f"Render daemon in ascolto su {socket_path} (pid {os.getpid()})", flush=True)
+
+    jobs = queue.Queue()                       # (conn, request) | None = stop
+    state = dict(jobs_done=0, job=None, stop=False, started=time.time(),
+                 max_jobs=max_jobs, max_rss_mb=max_rss_mb)
+    threading.Thread(target=_listen, args=(server, jobs, state), daemon=True).start()
+    exit_code = 0
+    try:
+        while True:
+            item = jobs.get()
+            if item is None or state["stop"]:
+                if item is not None:
+                    item[0].close()
+                break
+            conn, request = item
+            with conn:
+                state["job"] = request.get("id") or request.get("script")
+                _send(conn, "accepted", job=request.get("id"), pid=os.getpid())
+                try:
+                    final = dict(event="done", record=run_job(request, conn))
+                except (Exception, SystemExit) as e:  # anche SystemExit dagli script; Ctrl-C esce
+                    final = dict(event="error", message=f"{type(e).__name__}: {e}",
+                                 traceback=traceback.format_exc()[-4000:])
+                finally:
+                    state["job"] = None
+                state["jobs_done"] += 1
+                # il riciclo è deciso prima della risposta: il client aspetta l'uscita
+                # del processo invece di connettersi a un daemon che sta chiudendo
+                recycle = _must_recycle(state["jobs_done"], max_jobs, max_rss_mb)
+                _send(conn, final.pop("event"), job=request.get("id"), recycle=recycle, **final)
+            if recycle:
+                print(f"Render daemon: riciclo dopo {state['jobs_done']} job, "
+                      f"RSS {instrument.rss_mb():.0f} MB", flush=True)
+                exit_code = RECYCLE_EXIT
+                break
+    finally:
+        server.close()
+        socket_path.unlink(missing_ok=True)
+        # job in coda non accettati: chiusura senza "accepted", il client li reinvia
+        while not jobs.empty():
+            item = jobs.get_nowait()
+            if item is not None:
+                item[0].close()
+    sys.exit(exit_code)
+
+
+# ============================================================
+# SUPERVISORE + CLIENT (fuori da Blender)
+# ============================================================
+def daemon_cmd(socket_path=SOCKET_PATH, max_jobs=MAX_JOBS, max_rss_mb=MAX_RSS_MB, threads=None):
+    """Comando del daemon; threads: thread di render fissi (--threads di Blender)."""
+    cmd = [BLENDER, "--background"]
+    if threads:
+        cmd += ["--threads", str(threads)]
+    return cmd + ["--python", str(SCRIPT), "--", "--serve",
+                  "--socket", str(socket_path), "--max-jobs", str(max_jobs),
+                  "--max-rss-mb", str(max_rss_mb)]
+
+
+def supervise(socket_path=SOCKET_PATH, max_jobs=MAX_JOBS, max_rss_mb=MAX_RSS_MB):
+    """Rilancia il daemon a ogni riciclo; termina con --stop o errore del daemon."""
+    while True:
+        code = subprocess.call(daemon_cmd(socket_path, max_jobs, max_rss_mb))
+        if code != RECYCLE_EXIT:
+            return code
+
+
+def is_running(socket_path=SOCKET_PATH):
+    return status(socket_path) is not None
+
+
+def request(payload, socket_path=SOCKET_PATH, on_event=None, timeout=None):
+    """Invia una richiesta e ritorna l'ultimo evento; on_event(evento) per ognuno."""
+    last = None
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        conn.connect(str(socket_path))
+        conn.sendall((json.dumps(payload) + "\n").encode())
+        with conn.makefile("r") as stream:
+            for line in stream:
+                last = json.loads(line)
+                if on_event:
+                    on_event(last)
+    return last
+
+
+def status(socket_path=SOCKET_PATH):
+    """Stato del daemon; None se non c'è, {"busy": True} se connesso ma senza risposta."""
+    try:
+        return request({"op": "status"}, socket_path, timeout=5)
+    except socket.timeout:
+        return dict(event="status", busy=True)
+    except (OSError, ValueError):
+        return None
+
+
+def _print_event(event):
+    kind = event["event"]
+    if kind == "progress":
+        print(f"  {event['stats']}", flush=True)
+    elif kind == "done":
+        record = event["record"]
+        print(f"Job completato in {record['elapsed_s']:.1f}s: {record.get('output') or '—'}")
+    elif kind == "error":
+        print(f"Job fallito: {event['message']}\n{event.get('traceback', '')}")
+    else:
+        print(f"  [{kind}] {json.dumps({k: v for k, v in event.items() if k != 'event'})}")
+
+
+def submit(script, tier=None, args=(), output=None, socket_path=SOCKET_PATH,
+           on_event=_print_event, fallback=True, job_id=None, env=None):
+    """Esegue lo script nel daemon (o in un Blender nuovo se il daemon non c'è).
+
+    env: variabili d'ambiente solo per questo job (es. HF_SEED).
+    Ritorna l'evento finale: {"event": "done", "record": {...}} o {"event": "error", ...}.
+    """
+    payload = dict(op="render", id=job_id, script=str(_resolve(script)), tier=tier,
+                   args=list(args), output=output, env=dict(env or {}))
+    try:
+        return request(payload, socket_path, on_event)
+    except (FileNotFoundError, ConnectionRefusedError):
+        if not fallback:
+            raise
+    print(f"Render daemon non attivo su {socket_path}: avvio di Blender per il job")
+    # senza --python-exit-code Blender esce 0 anche se lo script solleva un'eccezione
+    cmd = [BLENDER, "--background", "--python-exit-code", "1",
+           "--python", str(_resolve(script)), "--", *args]
+    if tier:
+        cmd += ["--tier", tier]
+    fd, phases_path = tempfile.mkstemp(prefix="hf_job_", suffix=".json")
+    os.close(fd)
+    t0 = time.perf_counter()
+    try:
+        code = subprocess.call(cmd, env=dict(os.environ, **(env or {}), HF_PHASES_JSON=phases_path))
+        record = _read_record(phases_path)
+    finally:
+        Path(phases_path).unlink(missing_ok=True)
+    record["elapsed_s"] = round(time.perf_counter() - t0, 3)
+    record.setdefault("output", output)
+    ok = code == 0 and record.get("status", "SUCCESS") != "FAILED"
+    event = dict(event="done" if ok else "error", job=job_id, record=record,
+                 message=f"exit {code}, status {record.get('status', '—')}")
+    if on_event:
+        on_event(event)
+    return event
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — render daemon")
+    ap.add_argument("script", nargs="?", help="script da eseguire nel daemon")
+    ap.add_argument("--tier")
+    ap.add_argument("--output", help="output atteso (solo per il report)")
+    ap.add_argument("--socket", default=str(SOCKET_PATH))
+    ap.add_argument("--start", action="store_true", help="avvia daemon + supervisore")
+    ap.add_argument("--stop", action="store_true")
+    ap.add_argument("--status", action="store_true")
+    ap.add_argument("--max-jobs", type=int, default=MAX_JOBS)
+    ap.add_argument("--max-rss-mb", type=int, default=MAX_RSS_MB)
+    ap.add_argument("--no-fallback", action="store_true")
+    ap.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)   # dentro Blender
+    args, script_extra = ap.parse_known_args(script_args() if argv is None else argv)
+
+    if args.serve:
+        serve(args.socket, args.max_jobs, args.max_rss_mb)
+    elif args.start:
+        sys.exit(supervise(args.socket, args.max_jobs, args.max_rss_mb))
+    elif args.stop:
+        print(json.dumps(request({"op": "stop"}, args.socket)))
+    elif args.status:
+        state = status(args.socket)
+        print(json.dumps(state, indent=2) if state else f"Nessun daemon su {args.socket}")
+    elif args.script:
+        event = submit(args.script, args.tier, script_extra, args.output, args.socket,
+                       fallback=not args.no_fallback)
+        sys.exit(0 if event and event["event"] == "done" else 1)
+    else:
+        ap.print_help()
+
+
+if __name__ == "__main__":
+    main()
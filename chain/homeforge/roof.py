@@ -0,0 +1,295 @@
+"""
+HomeForge AI — Generatore parametrico del tetto (piode + legno + rame)
+Dalle costanti di training_tetto_piode.py (FALDA_L, TETTO_W, ANGOLO, SPORTO,
+TRAVE_SPA, ...) calcola tutti i membri (dormiente, puntoni, tavolato, piode,
+grondaia, staffe, pluviale, gomito, scossalina, bordo rame) come array NumPy e
+li fonde in UNA mesh con 3 material slot (legno / piode / rame), oppure una
+mesh per slot. Cycles costruisce pochi BVH grandi invece di ~25 piccoli e il
+sync della scena è più rapido.
+
+Falde: una falda singola (training) o il tetto asimmetrico a due falde di
+knowledge/02-dati-energetici.md con colmo spostato di 1.5 m verso nord:
+
+    slopes = roof.two_slopes(depth=8.0, ridge_offset=1.5, ridge_rise=1.8)
+    roof.build_roof(mats, slopes, TETTO_W=11.8, X0=-0.40, BASE_Z=3.0, SPORTO=0.40)
+"""
+import math
+
+import bpy
+import numpy as np
+
+from homeforge import geometry as geo
+from homeforge.materials import FINGERPRINT_PROP
+from homeforge.render_cache import node_tree_hash
+
+# Valori di training_tetto_piode.py / materials/roof_piode.md
+DEFAULTS = dict(
+    FALDA_L=5.0,
+    TETTO_W=4.5,
+    ANGOLO=math.radians(35),
+    SPORTO=0.45,
+    PIODE_SP=0.045,
+    TRAVE_W=0.22,
+    TRAVE_H=0.26,
+    TRAVE_SPA=0.50,
+    TAVOLATO_SP=0.025,
+    BASE_Z=2.5,
+    GRONDA_R=0.10,
+    N_STAFFE=6,
+    PLUVIALE_R=0.055,
+    X0=0.0,
+)
+
+SLOTS = ("legno", "piode", "rame")
+
+# Coordinate Generated di ogni membro (bbox locale del membro, non della mesh
+# fusa): i materiali usano TexCoord Generated, che su una mesh unica verrebbe
+# normalizzato sul bbox dell'intero tetto e cambierebbe la scala delle texture.
+GENERATED_ATTR = "hf_generated"
+SOURCE_KEY_PROP = "hf_source_key"     # hash del node tree sorgente delle copie _merged
+
+
+# ============================================================
+# FALDE
+# ============================================================
+def single_slope(**params):
+    """Falda singola di training: gronda a y=0, sale verso +y (nord)."""
+    p = dict(DEFAULTS, **params)
+    return [dict(name="", y0=0.0, direction=1, FALDA_L=p["FALDA_L"], ANGOLO=p["ANGOLO"],
+                 ridge=True, downpipe=True)]
+
+
+def two_slopes(depth=8.0, ridge_offset=1.5, ridge_rise=1.8):
+    """Tetto a due falde su pianta profonda `depth` (y da 0 a depth).
+
+    Colmo a depth/2 + ridge_offset (verso nord), ridge_rise sopra BASE_Z.
+    Falda sud lunga e poco inclinata, falda nord corta e ripida.
+    """
+    ridge_y = depth / 2 + ridge_offset
+    if not 0 < ridge_y < depth:
+        raise ValueError(f"Colmo fuori pianta: y={ridge_y} (depth {depth})")
+    run_s, run_n = ridge_y, depth - ridge_y
+    return [
+        dict(name="Sud_", y0=0.0, direction=1,
+             FALDA_L=math.hypot(run_s, ridge_rise), ANGOLO=math.atan2(ridge_rise, run_s),
+             ridge=True, downpipe=True),
+        dict(name="Nord_", y0=depth, direction=-1,
+             FALDA_L=math.hypot(run_n, ridge_rise), ANGOLO=math.atan2(ridge_rise, run_n),
+             ridge=False, downpipe=True),
+    ]
+
+
+# ============================================================
+# MEMBRI
+# ============================================================
+def _euler_matrix(rx, ry, rz):
+    """Matrice di rotazione Euler XYZ (convenzione Blender: Rz · Ry · Rx)."""
+    cx, sx = math.cos(rx), math.sin(rx)
+    cy, sy = math.cos(ry), math.sin(ry)
+    cz, sz = math.cos(rz), math.sin(rz)
+    rot_x = np.array([[1, 0, 0], [0, cx, -sx], [0, sx, cx]])
+    rot_y = np.array([[cy, 0, sy], [0, 1, 0], [-sy, 0, cy]])
+    rot_z = np.array([[cz, -sz, 0], [sz, cz, 0], [0, 0, 1]])
+    return rot_z @ rot_y @ rot_x
+
+
+def _member(name, slot, data, location=(0, 0, 0), rotation=(0, 0, 0)):
+    verts, faces = data
+    local = np.asarray(verts, dtype=np.float64)
+    lo, hi = local.min(axis=0), local.max(axis=0)
+    generated = (local - lo) / np.maximum(hi - lo, 1e-6)
+    v = local @ _euler_matrix(*rotation).T + location
+    return dict(name=name, slot=slot, verts=v, generated=generated,
+                faces=[tuple(f) for f in faces])
+
+
+def _slope_members(p, slope):
+    """Membri di una falda nel sistema locale (gronda a y=0, sale verso +y)."""
+    W, S, Z = p["TETTO_W"], p["SPORTO"], p["BASE_Z"]
+    L, a = slope["FALDA_L"], slope["ANGOLO"]
+    TW, TH = p["TRAVE_W"], p["TRAVE_H"]
+    TS, PS, R = p["TAVOLATO_SP"], p["PIODE_SP"], p["GRONDA_R"]
+    rot = (a, 0, 0)
+    members = []
+
+    def add(name, slot, data, loc, rotation=(0, 0, 0)):
+        members.append(_member(slope["name"] + name, slot, data, loc, rotation))
+
+    def on_slope(local, dz=0.0):
+        """(y, z) del punto a distanza `local` dalla linea di gronda lungo la falda."""
+        return local * math.cos(a), Z + local * math.sin(a) + dz
+
+    # Dormiente sul muro
+    add("Dormiente", "legno", geo.box_data(W + 0.10, 0.18, 0.14), (W / 2, 0.09, Z - 0.07))
+
+    # Puntoni (da -SPORTO a FALDA_L lungo la falda)
+    mid_y, mid_z = on_slope((L - S) / 2)
+    beam = geo.box_data(TW, L + S, TH)
+    n_travi = int(W / p["TRAVE_SPA"]) + 1
+    for i in range(n_travi + 1):
+        x = min(i * p["TRAVE_SPA"], W)
+        add(f"Trave_{i:02d}", "legno", beam, (x, mid_y, mid_z), rot)
+
+    # Tavolato + piode
+    tav_z = mid_z + TH / 2 + TS / 2
+    add("Tavolato", "legno", geo.box_data(W + 0.06, L + S, TS), (W / 2, mid_y, tav_z), rot)
+    add("Piode", "piode", geo.box_data(W + 0.14, L + S + 0.06, PS),
+        (W / 2, mid_y, tav_z + TS / 2 + PS / 2), rot)
+
+    # Grondaia semicircolare + staffe
+    gr_y = -S * math.cos(a) - 0.05
+    gr_z = Z - S * math.sin(a) - R * 0.3
+    add("Grondaia", "rame", geo.profile_data(geo.semicircle_profile(R, 16), W + 0.20),
+        (-0.10, gr_y, gr_z))
+    n_st = p["N_STAFFE"]
+    staffa = geo.box_data(0.025, 0.04, 0.15)
+    for s in range(n_st):
+        sx = 0.2 + s * (W - 0.1) / (n_st - 1)
+        add(f"Staffa_{s:02d}", "rame", staffa, (sx, gr_y, gr_z + R * 0.8))
+
+    # Pluviale + gomito
+    if slope.get("downpipe", True):
+        r = p["PLUVIALE_R"]
+        add("Pluviale", "rame", geo.cylinder_data(r, Z * 0.85), (W + 0.06, gr_y + 0.02, Z * 0.42))
+        add("Gomito", "rame", geo.cylinder_data(r, 0.22), (W + 0.06, gr_y + 0.02, Z * 0.87),
+            (math.radians(50), 0, 0))
+
+    # Scossalina colmo + bordo rame gronda (sopra le piode)
+    top = TH / 2 + TS + PS
+    if slope.get("ridge", True):
+        y, z = on_slope(L + 0.02, top)
+        add("Scossalina", "rame", geo.box_data(W + 0.14, 0.25, 0.003), (W / 2, y, z), rot)
+    y, z = on_slope(-S - 0.01, top)
+    add("BordoRame", "rame", geo.box_data(W + 0.14, 0.10, 0.002), (W / 2, y, z), rot)
+    return members
+
+
+def roof_members(slopes=None, exclude=(), **params):
+    """Tutti i membri del tetto in coordinate mondo: [{name, slot, verts, faces}].
+
+    exclude: nomi di membro senza prefisso falda da saltare (es. ("Piode",) quando
+    le piode sono istanze di homeforge.piode_instances).
+    """
+    p = dict(DEFAULTS, **params)
+    slopes = slopes or single_slope(**p)
+    members = []
+    for slope in slopes:
+        for m in _slope_members(p, slope):
+            if m["name"][len(slope["name"]):] in exclude:
+                continue
+            v = m["verts"]
+            v[:, 0] += p["X0"]
+            if slope["direction"] < 0:
+                # Falda specchiata: sale verso -y partendo dalla gronda a y0
+                v[:, 1] = slope["y0"] - v[:, 1]
+                m["faces"] = [tuple(reversed(f)) for f in m["faces"]]
+            else:
+                v[:, 1] += slope["y0"]
+            members.append(m)
+    return members
+
+
+def merge_members(members):
+    """(verts, indici piatti, loop_totals, slot per faccia, generated) dei membri concatenati."""
+    verts, flat, totals, slots, generated = [], [], [], [], []
+    offset = 0
+    for m in members:
+        verts.append(m["verts"])
+        generated.append(m["generated"])
+        for f in m["faces"]:
+            flat.extend(i + offset for i in f)
+            totals.append(len(f))
+            slots.append(SLOTS.index(m["slot"]))
+        offset += len(m["verts"])
+    return (np.concatenate(verts), np.asarray(flat, dtype=np.int32),
+            np.asarray(totals, dtype=np.int32), np.asarray(slots, dtype=np.int32),
+            np.concatenate(generated))
+
+
+def merged_material(mat):
+    """Copia del materiale con TexCoord Generated → Attribute GENERATED_ATTR.
+
+    Stesse immagini (nessuna decodifica in più), solo le coordinate cambiano.
+    Riusata finché il node tree sorgente non cambia; altrimenti rifatta, e chi
+    usava la copia vecchia passa alla nuova.
+    """
+    name = f"{mat.name}_merged"
+    key = node_tree_hash(mat.node_tree)
+    existing = bpy.data.materials.get(name)
+    if existing is not None and existing.get(SOURCE_KEY_PROP) == key:
+        return existing
+    copy = mat.copy()
+    copy.pop(FINGERPRINT_PROP, None)      # la cache materiali deve trovare la sorgente
+    copy[SOURCE_KEY_PROP] = key
+    if existing is not None:
+        existing.user_remap(copy)
+        bpy.data.materials.remove(existing)
+    copy.name = name
+    nt = copy.node_tree
+    for node in [n for n in nt.nodes if n.type == 'TEX_COORD']:
+        links = [l for l in nt.links
+                 if l.from_node == node and l.from_socket.name == "Generated"]
+        if not links:
+            continue
+        attr = nt.nodes.new("ShaderNodeAttribute")
+        attr.attribute_name = GENERATED_ATTR
+        attr.location = node.location
+        for link in links:
+            to_socket = link.to_socket
+            nt.links.remove(link)
+            nt.links.new(attr.outputs["Vector"], to_socket)
+    return copy
+
+
+# ============================================================
+# BUILD
+# ============================================================
+def build_roof(materials, slopes=None, split_by_material=False, keep_members=False,
+               name="Tetto", collection=None, exclude=(), **params):
+    """Crea il tetto in scena e ritorna gli oggetti renderizzabili.
+
+    materials: {'legno', 'piode', 'rame'} → Material (le mesh fuse usano le copie
+    '<nome>_merged' di merged_material()).
+    split_by_material=False: una mesh, 3 material slot.
+    split_by_material=True: una mesh per slot (Tetto_legno, Tetto_piode, Tetto_rame).
+    keep_members=True: anche un oggetto per membro (Trave_00, Staffa_03, ...) nella
+    collection '<name>_membri', esclusa dal render, per ispezione/modifica.
+    exclude: membri da non generare (vedi roof_members).
+    """
+    members = roof_members(slopes, exclude, **params)
+    collection = collection or bpy.context.collection
+    merged_mats = {slot: merged_material(materials[slot]) for slot in SLOTS}
+    objects = []
+
+    if split_by_material:
+        for slot in SLOTS:
+            group = [m for m in members if m["slot"] == slot]
+            if not group:
+                continue
+            verts, flat, totals, _, generated = merge_members(group)
+            mesh = geo.mesh_from_arrays(f"{name}_{slot}_mesh", verts, flat, totals,
+                                        materials=[merged_mats[slot]],
+                                        point_vectors={GENERATED_ATTR: generated})
+            objects.append(geo.make_object(f"{name}_{slot}", mesh, collection=collection))
+    else:
+        verts, flat, totals, slot_idx, generated = merge_members(members)
+        mesh = geo.mesh_from_arrays(f"{name}_mesh", verts, flat, totals,
+                                    material_indices=slot_idx,
+                                    materials=[merged_mats[s] for s in SLOTS],
+                                    point_vectors={GENERATED_ATTR: generated})
+        objects.append(geo.make_object(name, mesh, collection=collection))
+
+    if keep_members:
+        coll = bpy.data.collections.new(f"{name}_membri")
+        collection.children.link(coll)
+        coll.hide_render = True
+        coll.hide_viewport = True
+        for m in members:
+            verts, flat, totals, _, _ = merge_members([m])
+            mesh = geo.mesh_from_arrays(f"{m['name']}_mesh", verts, flat, totals,
+                                        materials=[materials[m["slot"]]])
+            geo.make_object(m["name"], mesh, collection=coll)
+
+    n_tris = sum(len(f) - 2 for m in members for f in m["faces"])
+    print(f"  Tetto: {len(members)} membri → {len(objects)} mesh, {n_tris} triangoli")
+    return objects
@@ -0,0 +1,395 @@
+"""
+HomeForge AI — Patch incrementale della scena (modalità MCP LIVE)
+In modalità live (`execute_blender_code` nella sessione aperta) gli script
+ripartivano da una scena vuota: cambiare uno stop di ColorRamp del rame o
+spostare la camera ricostruiva geometria e materiali e rileggeva le texture 2K.
+
+Qui lo stato desiderato (homeforge/l3_ops.scene_description) viene confrontato
+con la sessione per NOME STABILE (proprietà `hf_l3` su oggetti e materiali) e
+si applicano solo le differenze:
+
+- oggetti nuovi / spariti → creati / rimossi;
+- location, rotazione, target camera/luci → transform modificato sul posto;
+- dati (dimensioni box, vertici, lente, energia) → mesh ricostruita o dati
+  camera/luce modificati; modifier riscritti solo se cambiano;
+- materiali: node tree costruito a parte e, se la topologia è la stessa,
+  copiati solo i valori dei nodi (input, ColorRamp, mapping) nel materiale
+  vivo; le immagini vengono dalla cache di materials.py, nessuna rilettura.
+
+I boolean restano modifier vivi: spostare un'apertura = spostare il cutter.
+
+    # via execute_blender_code, nella sessione aperta
+    from homeforge import scene_diff
+    scene_diff.sync_l3()                    # rilegge chain/L3_blender_ops.md
+    scene_diff.sync(desc, dry_run=True)     # solo il piano
+"""
+import sys
+import json
+import time
+import hashlib
+import argparse
+from pathlib import Path
+
+import bpy
+from mathutils import Vector
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import id_alive, scene_setup, script_args
+from homeforge import geometry as geo
+from homeforge import materials as hfm
+from homeforge.l3_ops import L3_PATH, load, scene_description
+
+COLLECTION = "L3"               # stessa collection di homeforge/l3_exec.py
+MANAGED_PROP = "hf_l3"          # nome stabile L3 dell'oggetto / materiale
+DATA_PROP = "hf_data"           # hash della spec dati (+ materiale)
+MODS_PROP = "hf_mods"           # hash della lista modifier
+SPEC_PROP = "hf_spec"           # hash della spec materiale / world / render
+EPS = 1e-5
+
+# Proprietà RNA dei nodi che non sono parametri di shading
+NODE_SKIP = {"name", "label", "location", "location_absolute", "width", "height", "select",
+             "hide", "mute", "show_options", "show_preview", "show_texture", "use_custom_color",
+             "color", "parent", "warning_propagation", "bl_idname", "bl_label", "bl_description",
+             "bl_icon", "bl_static_type", "bl_width_default", "bl_width_min", "bl_width_max",
+             "bl_height_default", "bl_height_min", "bl_height_max"}
+NODE_PROP_TYPES = {"BOOLEAN", "INT", "FLOAT", "ENUM", "POINTER", "STRING"}
+MODIFIER_ATTRS = {"viewport_levels": "levels"}
+DATA_ATTRS = {
+    "camera": ("lens", "sensor_width", "clip_end"),
+    "light": ("energy", "angle", "size"),
+}
+
+
+def _hash(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=list).encode()).hexdigest()[:16]
+
+
+def _differs(a, b):
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return abs(a - b) > EPS
+    if hasattr(a, "__len__") and hasattr(b, "__len__") and not isinstance(a, str):
+        a, b = tuple(a), tuple(b)
+        return len(a) != len(b) or any(_differs(x, y) for x, y in zip(a, b))
+    return a != b
+
+
+def _value(v):
+    return tuple(v) if hasattr(v, "__len__") and not isinstance(v, str) else v
+
+
+def new_report():
+    return dict(created=[], deleted=[], moved=[], rebuilt=[], modifiers=[],
+                materials_created=[], materials_edited={}, materials_replaced=[],
+                world=False, render=False, s=0.0)
+
+
+# ============================================================
+# MATERIALI: patch dei valori dei nodi
+# ============================================================
+def _signature(tree):
+    """Topologia del node tree: nodi (nome, tipo, n. stop ColorRamp) + link."""
+    nodes = sorted((n.name, n.bl_idname, len(n.color_ramp.elements) if hasattr(n, "color_ramp") else 0)
+                   for n in tree.nodes)
+    links = sorted((l.from_node.name, l.from_socket.identifier, l.to_node.name, l.to_socket.identifier)
+                   for l in tree.links)
+    return nodes, links
+
+
+def _node_props(node):
+    for prop in node.bl_rna.properties:
+        if prop.is_readonly or prop.identifier in NODE_SKIP or prop.type not in NODE_PROP_TYPES:
+            continue
+        yield prop.identifier, prop.type
+
+
+def patch_tree(live, new):
+    """Copia in `live` i valori dei nodi di `new` (stessa topologia) → n. modifiche."""
+    edits = 0
+    for src in new.nodes:
+        dst = live.nodes[src.name]
+        for ident, kind in _node_props(src):
+            value = getattr(src, ident)
+            if kind == "POINTER" and not (value is None or isinstance(value, bpy.types.ID)):
+                continue
+            if _differs(getattr(dst, ident), value):
+                setattr(dst, ident, _value(value))
+                edits += 1
+        for s_in, d_in in zip(src.inputs, dst.inputs):
+            if hasattr(s_in, "default_value") and _differs(d_in.default_value, s_in.default_value):
+                d_in.default_value = _value(s_in.default_value)
+                edits += 1
+        if hasattr(src, "color_ramp"):
+            if dst.color_ramp.interpolation != src.color_ramp.interpolation:
+                dst.color_ramp.interpolation = src.color_ramp.interpolation
+                edits += 1
+            for s_el, d_el in zip(src.color_ramp.elements, dst.color_ramp.elements):
+                if _differs(d_el.position, s_el.position):
+                    d_el.position = s_el.position
+                    edits += 1
+                if _differs(d_el.color, s_el.color):
+                    d_el.color = tuple(s_el.color)
+                    edits += 1
+    return edits
+
+
+def _sync_material(name, spec, live, report, dry_run):
+    spec_hash = _hash(spec)
+    if live is not None and live.get(SPEC_PROP) == spec_hash:
+        return live
+    if dry_run:
+        (report["materials_created"] if live is None else report["materials_replaced"]).append(name)
+        return live
+    new = hfm.from_spec(spec, name)
+    if live is None or new == live:
+        report["materials_created" if live is None else "materials_replaced"].append(name)
+        live = new
+    elif (new.users == 0 and MANAGED_PROP not in new and new.node_tree and live.node_tree
+          and _signature(live.node_tree) == _signature(new.node_tree)):
+        report["materials_edited"][name] = patch_tree(live.node_tree, new.node_tree)
+        live[hfm.FINGERPRINT_PROP] = new[hfm.FINGERPRINT_PROP]
+        bpy.data.materials.remove(new)
+    else:
+        live.user_remap(new)
+        bpy.data.materials.remove(live)
+        report["materials_replaced"].append(name)
+        live = new
+    live[MANAGED_PROP] = name
+    live[SPEC_PROP] = spec_hash
+    return live
+
+
+# ============================================================
+# OGGETTI
+# ============================================================
+def _build_data(name, data, mat):
+    kind = data["type"]
+    if kind == "box":
+        w, d, h = data["dims"]
+        if data["shared"]:
+            key = ("box", round(w, 6), round(d, 6), round(h, 6), mat.name if mat else None)
+            return geo.shared_mesh(key, lambda: geo.box_mesh(f"{name}_mesh", w, d, h, mat))
+        return geo.box_mesh(f"{name}_mesh", w, d, h, mat)
+    if kind == "custom":
+        return geo.custom_mesh(f"{name}_mesh", data["verts"], data["faces"], mat, data["smooth"])
+    if kind == "camera":
+        block = bpy.data.cameras.new(name)
+    elif kind == "light":
+        block = bpy.data.lights.new(name, data["light"])
+    else:
+        raise ValueError(f"{name}: tipo dati sconosciuto {kind!r}")
+    _edit_data(block, data)
+    return block
+
+
+def _edit_data(block, data):
+    """Camera / luce modificata sul posto; False se serve un datablock nuovo."""
+    if data["type"] == "light" and block.type != data["light"]:
+        return False
+    for attr in DATA_ATTRS.get(data["type"], ()):
+        if attr in data and hasattr(block, attr):
+            setattr(block, attr, data[attr])
+    return True
+
+
+def _rotation(spec):
+    if "target" in spec:
+        direction = Vector(spec["target"]) - Vector(spec["location"])
+        return tuple(direction.to_track_quat('-Z', 'Y').to_euler())
+    return tuple(spec.get("rotation", (0.0, 0.0, 0.0)))
+
+
+def _collection(scene):
+    coll = bpy.data.collections.get(COLLECTION)
+    if coll is None:
+        coll = bpy.data.collections.new(COLLECTION)
+    if coll.name not in scene.collection.children:
+        scene.collection.children.link(coll)
+    return coll
+
+
+def _sync_object(name, spec, live, materials, scene, report, dry_run):
+    mat = materials.get(spec.get("material")) if spec.get("material") else None
+    data_hash = _hash([spec["data"], spec.get("material")])
+    if live is None:
+        report["created"].append(name)
+        if dry_run:
+            return None
+        obj = geo.make_object(name, _build_data(name, spec["data"], mat), spec["location"],
+                              _rotation(spec), collection=_collection(scene))
+        obj[MANAGED_PROP] = name
+        obj[DATA_PROP] = data_hash
+        if spec.get("role") == "cutter":
+            obj.display_type = 'WIRE'
+            obj.hide_render = True
+        return obj
+
+    if not dry_run:
+        live[MANAGED_PROP] = name
+    if live.get(DATA_PROP) != data_hash:
+        report["rebuilt"].append(name)
+        if not dry_run:
+            if spec["data"]["type"] in DATA_ATTRS and _edit_data(live.data, spec["data"]):
+                pass
+            else:
+                old = live.data
+                live.data = _build_data(name, spec["data"], mat)
+                if old.users == 0:
+                    bpy.data.batch_remove([old])
+            live[DATA_PROP] = data_hash
+    rotation = _rotation(spec)
+    if _differs(live.location, spec["location"]) or _differs(live.rotation_euler, rotation):
+        report["moved"].append(name)
+        if not dry_run:
+            live.location = spec["location"]
+            live.rotation_euler = rotation
+    return live
+
+
+def _sync_modifiers(obj, spec, objects, report, dry_run):
+    mods_hash = _hash(spec["modifiers"])
+    if obj.get(MODS_PROP) == mods_hash:
+        return
+    report["modifiers"].append(obj[MANAGED_PROP])
+    if dry_run:
+        return
+    obj.modifiers.clear()
+    for m in spec["modifiers"]:
+        m = dict(m)
+        kind = m.pop("type")
+        mod = obj.modifiers.new(kind.title(), kind)
+        if kind == "BOOLEAN":
+            mod.object = objects[m.pop("object")]
+        for key, value in m.items():
+            setattr(mod, MODIFIER_ATTRS.get(key, key), value)
+    obj[MODS_PROP] = mods_hash
+
+
+# ============================================================
+# WORLD + RENDER
+# ============================================================
+def build_world(scene, spec, warn=print):
+    """World a nodi Sky → Background → Output (nodi con nome fisso, modificabili sul posto)."""
+    world = scene.world or bpy.data.worlds.new("World")
+    world.use_nodes = True
+    nt = world.node_tree
+    bg, sky = nt.nodes.get("Background"), nt.nodes.get("Sky")
+    if bg is None or (sky is None) == bool(spec.get("sky")) or "Output" not in nt.nodes:
+        nt.nodes.clear()
+        bg = nt.nodes.new("ShaderNodeBackground"); bg.name = "Background"
+        out = nt.nodes.new("ShaderNodeOutputWorld"); out.name = "Output"; out.location = (300, 0)
+        nt.links.new(bg.outputs["Background"], out.inputs["Surface"])
+        sky = None
+        if spec.get("sky"):
+            sky = nt.nodes.new("ShaderNodeTexSky"); sky.name = "Sky"; sky.location = (-300, 0)
+            nt.links.new(sky.outputs["Color"], bg.inputs["Color"])
+        else:
+            bg.inputs["Color"].default_value = scene_setup.WORLD_COLOR
+    bg.inputs["Strength"].default_value = spec.get("strength", 1.0)
+    for key, value in (spec.get("sky") or {}).items():
+        try:
+            setattr(sky, key, value)
+        except (AttributeError, TypeError, ValueError) as e:
+            warn(f"sky {key}={value!r} ignorato ({e})")
+    scene.world = world
+    return world
+
+
+def _sync_render(scene, spec):
+    scene.render.engine = spec["engine"]
+    scene.render.resolution_x, scene.render.resolution_y = spec["resolution"]
+    scene.render.film_transparent = spec["film_transparent"]
+    scene.render.image_settings.file_format = spec["file_format"]
+    scene.render.image_settings.color_mode = spec["color_mode"]
+
+
+# ============================================================
+# SYNC
+# ============================================================
+def managed(collection):
+    """{nome L3: datablock} per gli ID gestiti di una collezione di bpy.data."""
+    return {idb[MANAGED_PROP]: idb for idb in collection if MANAGED_PROP in idb}
+
+
+def sync(desc, scene=None, dry_run=False):
+    """Porta la sessione allo stato `desc` applicando solo le differenze → report."""
+    t0 = time.perf_counter()
+    scene = scene or bpy.context.scene
+    report = new_report()
+
+    live_mats = managed(bpy.data.materials)
+    materials = {name: _sync_material(name, spec, live_mats.get(name), report, dry_run)
+                 for name, spec in desc["materials"].items()}
+
+    live_objs = managed(bpy.data.objects)
+    coll = bpy.data.collections.get(COLLECTION)
+    for obj in (coll.all_objects if coll else ()):
+        # scena costruita da l3_exec.py: stessi nomi, si adottano (dati e modifier rifatti)
+        if MANAGED_PROP not in obj and obj.name in desc["objects"]:
+            live_objs.setdefault(obj.name, obj)
+    objects = {name: _sync_object(name, spec, live_objs.get(name), materials, scene, report, dry_run)
+               for name, spec in desc["objects"].items()}
+    for name, spec in desc["objects"].items():
+        if objects[name] is not None:
+            _sync_modifiers(objects[name], spec, objects, report, dry_run)
+    if objects.get("Camera") is not None and scene.camera is None:
+        scene.camera = objects["Camera"]
+
+    gone = [obj for name, obj in live_objs.items() if name not in desc["objects"]]
+    report["deleted"] = [obj[MANAGED_PROP] for obj in gone]
+    if gone and not dry_run:
+        data = [obj.data for obj in gone if obj.data is not None]
+        bpy.data.batch_remove(gone)
+        bpy.data.batch_remove([d for d in data if id_alive(d) and d.users == 0])
+
+    for key, apply in (("world", lambda s: build_world(scene, s)), ("render", lambda s: _sync_render(scene, s))):
+        spec = desc.get(key)
+        if spec is None:
+            continue
+        spec_hash = _hash(spec)
+        if scene.get(f"{SPEC_PROP}_{key}") != spec_hash:
+            report[key] = True
+            if not dry_run:
+                apply(spec)
+                scene[f"{SPEC_PROP}_{key}"] = spec_hash
+
+    report["s"] = round(time.perf_counter() - t0, 4)
+    return report
+
+
+def sync_l3(path=L3_PATH, scene=None, dry_run=False):
+    """Rilegge L3 (parse + validazione) e sincronizza la sessione."""
+    return sync(scene_description(load(path)), scene, dry_run)
+
+
+def print_report(report):
+    changes = [(k, report[k]) for k in ("created", "deleted", "moved", "rebuilt", "modifiers",
+                                        "materials_created", "materials_replaced") if report[k]]
+    print(f"Scena sincronizzata in {report['s'] * 1000:.0f} ms")
+    for key, names in changes:
+        print(f"  {key:<19} {len(names):4d}  {', '.join(names[:6])}{' …' if len(names) > 6 else ''}")
+    for name, edits in report["materials_edited"].items():
+        print(f"  materiale {name}: {edits} valori nodo modificati")
+    for key in ("world", "render"):
+        if report[key]:
+            print(f"  {key} aggiornato")
+    if not changes and not report["materials_edited"] and not report["world"] and not report["render"]:
+        print("  nessuna differenza")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — sincronizza la scena con L3")
+    ap.add_argument("--ops", default=str(L3_PATH))
+    ap.add_argument("--dry-run", action="store_true", help="solo il piano, nessuna modifica")
+    ap.add_argument("--save", help="salva il .blend sincronizzato")
+    args = ap.parse_args(script_args() if argv is None else argv)
+    report = sync_l3(args.ops, dry_run=args.dry_run)
+    print_report(report)
+    if args.save and not args.dry_run:
+        bpy.ops.wm.save_as_mainfile(filepath=str(Path(args.save).resolve()), copy=True)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+HomeForge AI — Reset rapido della scena e template di avvio
+Gli script partivano cancellando gli oggetti con gli operatori e rimuovendo
+mesh / materiali / immagini uno alla volta (ogni remove() ricalcola gli
+utenti), oppure con read_factory_settings(use_empty=True), che ricarica anche
+preferenze e add-on. Qui:
+
+- reset_scene(): bpy.data.batch_remove di tutti i datablock di contenuto in
+  una chiamata + orphans_purge ricorsivo (node group, texture, azioni rimaste);
+- template chain/hf_startup_v<N>.blend: scena vuota con Cycles, 1920×1080 PNG,
+  AgX e world 'World' a nodi già configurati. Aprirlo con open_mainfile non
+  tocca gli add-on; costruito al primo uso, ricostruito se cambia questo file.
+
+    from homeforge import scene_setup
+    scene = scene_setup.new_scene()                # template (default)
+    scene = scene_setup.new_scene(template=False)  # solo reset in sessione
+
+Nel render daemon (homeforge/render_daemon.py) keep_warm() fa sì che
+new_scene() non riapra il template: reset in sessione che conserva materiali,
+immagini decodificate e node group tra un job e l'altro.
+
+Confronto tempo-al-primo-oggetto dei tre metodi (scena sporca di N travi):
+    blender --background --python chain/homeforge/scene_setup.py -- --benchmark
+"""
+import sys
+import json
+import time
+import hashlib
+import argparse
+from pathlib import Path
+
+import bpy
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import CHAIN_DIR, script_args
+from homeforge import geometry as geo
+from homeforge import materials as hfm
+
+# Incrementare quando cambiano le impostazioni del template
+TEMPLATE_VERSION = 1
+TEMPLATE_PATH = CHAIN_DIR / f"hf_startup_v{TEMPLATE_VERSION}.blend"
+MANIFEST_PATH = TEMPLATE_PATH.with_suffix(".json")
+
+# Collezioni di bpy.data svuotate dal reset (scene, world, workspace restano)
+RESET_COLLECTIONS = ("objects", "meshes", "materials", "images", "lights", "cameras",
+                     "curves", "node_groups", "textures", "collections", "actions")
+
+# Datablock conservati tra un job e l'altro con keep_warm()
+WARM_KEEP = ("materials", "images", "node_groups")
+
+WORLD_COLOR = (0.05, 0.05, 0.05, 1.0)
+
+_WARM = False
+
+
+# ============================================================
+# RESET
+# ============================================================
+def _clear_module_caches(materials=True):
+    """Le cache di materials/geometry puntano a datablock appena rimossi."""
+    if materials:
+        hfm.clear_caches()
+    geo.clear_shared()
+
+
+def keep_warm(enabled=True):
+    """Processo a lunga vita: new_scene() conserva WARM_KEEP invece di riaprire il template."""
+    global _WARM
+    _WARM = enabled
+
+
+def reset_scene(keep=(), worlds=False):
+    """Svuota la sessione in una passata: batch_remove + purge degli orfani.
+
+    keep: collezioni di bpy.data da conservare (fake user temporaneo: il purge
+    non le tocca; dopo il purge ognuna torna al proprio use_fake_user).
+    Scene e impostazioni di render restano, il world anche salvo worlds=True;
+    ritorna il numero di datablock rimossi.
+    """
+    attrs = [a for a in RESET_COLLECTIONS + (("worlds",) if worlds else ()) if a not in keep]
+    pinned = [idb for attr in keep for idb in getattr(bpy.data, attr)
+              if idb.library is None and not idb.use_fake_user]
+    for idb in pinned:
+        idb.use_fake_user = True
+    try:
+        ids = [idb for attr in attrs for idb in getattr(bpy.data, attr) if idb.library is None]
+        bpy.data.batch_remove(ids)
+        purged = bpy.data.orphans_purge(do_local_ids=True, do_linked_ids=True, do_recursive=True)
+    finally:
+        for idb in pinned:
+            idb.use_fake_user = False
+    _clear_module_caches(materials="materials" not in keep)
+    return len(ids) + (purged or 0)
+
+
+def legacy_reset():
+    """Reset storico degli script (operatori + remove uno alla volta), per il benchmark."""
+    bpy.ops.object.select_all(action='SELECT')
+    bpy.ops.object.delete(use_global=False)
+    for m in bpy.data.meshes: bpy.data.meshes.remove(m)
+    for m in bpy.data.materials: bpy.data.materials.remove(m)
+    for img in bpy.data.images: bpy.data.images.remove(img)
+    _clear_module_caches()
+
+
+# ============================================================
+# TEMPLATE
+# ============================================================
+def template_hash():
+    h = hashlib.sha1(f"v{TEMPLATE_VERSION}".encode())
+    h.update(Path(__file__).resolve().read_bytes())
+    h.update(bpy.app.version_string.encode())
+    return h.hexdigest()
+
+
+def is_stale():
+    if not TEMPLATE_PATH.exists() or not MANIFEST_PATH.exists():
+        return True
+    return json.loads(MANIFEST_PATH.read_text()).get("hash") != template_hash()
+
+
+def configure_scene(scene):
+    """Impostazioni comuni a tutti gli script (ognuno può sovrascriverle)."""
+    scene.render.engine = 'CYCLES'
+    scene.cycles.device = 'CPU'
+    scene.render.resolution_x = 1920
+    scene.render.resolution_y = 1080
+    scene.render.resolution_percentage = 100
+    scene.render.film_transparent = False
+    scene.render.image_settings.file_format = 'PNG'
+    scene.render.image_settings.color_mode = 'RGB'
+    scene.render.image_settings.color_depth = '8'
+    scene.view_settings.view_transform = 'AgX'
+    scene.view_settings.look = 'AgX - Base Contrast'
+    scene.unit_settings.system = 'METRIC'
+
+    world = bpy.data.worlds.get("World") or bpy.data.worlds.new("World")
+    world.use_nodes = True
+    wnt = world.node_tree
+    wnt.nodes.clear()
+    bg = wnt.nodes.new("ShaderNodeBackground")
+    bg.inputs["Color"].default_value = WORLD_COLOR
+    out = wnt.nodes.new("ShaderNodeOutputWorld")
+    out.location = (300, 0)
+    wnt.links.new(bg.outputs["Background"], out.inputs["Surface"])
+    scene.world = world
+
+
+def build_template(force=False):
+    """Scrive il template da una sessione factory vuota (la sessione resta quella)."""
+    if not force and not is_stale():
+        return TEMPLATE_PATH
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    configure_scene(bpy.context.scene)
+    TEMPLATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    bpy.ops.wm.save_as_mainfile(filepath=str(TEMPLATE_PATH), copy=True, compress=False)
+    MANIFEST_PATH.write_text(json.dumps({
+        "version": TEMPLATE_VERSION, "hash": template_hash(),
+        "blender": bpy.app.version_string,
+    }, indent=2))
+    _clear_module_caches()
+    print(f"Template di avvio scritto: {TEMPLATE_PATH}")
+    return TEMPLATE_PATH
+
+
+def new_scene(template=True):
+    """Scena di partenza pronta per la geometria → bpy.context.scene.
+
+    template=True: apre il template (costruendolo se manca o è vecchio; in quel
+    caso la sessione è già nello stato del template). template=False: reset_scene()
+    sulla scena corrente, impostazioni invariate. Con keep_warm(): reset che
+    conserva WARM_KEEP + impostazioni del template riapplicate.
+    """
+    if _WARM:
+        reset_scene(keep=WARM_KEEP, worlds=True)
+        configure_scene(bpy.context.scene)         # impostazioni lasciate dal job precedente
+        return bpy.context.scene
+    if not template:
+        reset_scene()
+        return bpy.context.scene
+    if is_stale():
+        build_template(force=True)
+    else:
+        bpy.ops.wm.open_mainfile(filepath=str(TEMPLATE_PATH), load_ui=False)
+        _clear_module_caches()
+    return bpy.context.scene
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+def _dirty_scene(n):
+    """Scena come a fine script: n travi uniche, materiali PBR, immagini decodificate."""
+    for i in range(n):
+        geo.make_box(f"Trave_{i:04d}", 0.22, 5.45, 0.26, location=(i * 0.5, 0, 0))
+    for key in ("piode", "legno_travi", "pietra_muro"):
+        hfm.preset_material(key)
+    for img in bpy.data.images:
+        img.size[0]
+
+
+def benchmark(n=500):
+    """Tempo dal reset al primo oggetto in scena per i tre metodi."""
+    build_template()
+    methods = {
+        "operatori + remove()": legacy_reset,
+        "read_factory_settings": lambda: (bpy.ops.wm.read_factory_settings(use_empty=True),
+                                          _clear_module_caches()),
+        "reset_scene (batch)": lambda: new_scene(template=False),
+        "template .blend": lambda: new_scene(template=True),
+    }
+    results = {}
+    for label, reset in methods.items():
+        _dirty_scene(n)
+        t0 = time.perf_counter()
+        reset()
+        geo.make_box("Primo", 1.0, 1.0, 1.0)
+        bpy.context.view_layer.update()
+        results[label] = time.perf_counter() - t0
+
+    base = results["operatori + remove()"]
+    print("=" * 60)
+    print(f"Tempo al primo oggetto (scena con {n} travi + materiali PBR)")
+    for label, t in results.items():
+        print(f"  {label:<24} {t:8.3f}s  {base / t:6.1f}×")
+    print("=" * 60)
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — reset scena / template di avvio")
+    ap.add_argument("--force", action="store_true", help="ricostruisci il template")
+    ap.add_argument("--benchmark", action="store_true")
+    ap.add_argument("--beams", type=int, default=500)
+    args = ap.parse_args(script_args() if argv is None else argv)
+    if args.benchmark:
+        benchmark(args.beams)
+    else:
+        build_template(force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""
+HomeForge AI — Scheduler locale dei job di render (priorità + pool di worker)
+Varianti lookdev, final per punto di vista e fotoinserimenti venivano lanciati
+in serie, senza priorità. Lo scheduler tiene un pool di render daemon
+(homeforge/render_daemon.py) dimensionato su core e RAM, con i thread CPU
+divisi tra i worker (--threads di Blender + affinità CPU su Linux).
+
+- Priorità: draft < preview < final (a parità, ordine di arrivo). Un render
+  Cycles in corso non si può sospendere: con più di un worker, il worker 0 è
+  una corsia veloce riservata a draft/preview, così un draft non aspetta mai
+  la fine di un final da 512 samples.
+- Deduplica: job identici (hash di contenuto dello script + tier, argomenti,
+  env) condividono lo stesso Job, anche se già completato.
+- Metriche: coda per tier, job in corso, throughput, attesa e durata medie;
+  stato in $TMPDIR/homeforge-scheduler-<uid>.json a ogni cambiamento.
+
+    from homeforge.scheduler import Scheduler
+    with Scheduler() as sched:
+        jobs = [sched.submit("chain/L4_script.py", tier="final", args=["--view", v])
+                for v in views]
+        sched.submit("chain/materials/render_piode_roof_pbr.py", tier="draft")
+        sched.wait_all()
+        print(sched.stats())
+
+    python chain/homeforge/scheduler.py jobs.json [--workers 3] [--threads 8]
+    python chain/homeforge/scheduler.py --status
+
+jobs.json: [{"script", "tier", "args"?, "env"?, "output"?, "priority"?}].
+Modulo puro: nessun import di bpy, tutto in locale.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import OUTPUT_DIR, cpu_cores, cpu_sets, script_args
+from homeforge import render_daemon
+
+PRIORITY = {"draft": 0, "preview": 1, "final": 2}
+RAM_PER_WORKER_MB = 6000
+MIN_THREADS = 2
+STARTUP_TIMEOUT_S = 120
+RECYCLE_TIMEOUT_S = 60            # uscita di Blender dopo il riciclo del daemon
+STATE_PATH = Path(tempfile.gettempdir()) / f"homeforge-scheduler-{os.getuid()}.json"
+
+
+# ============================================================
+# JOB
+# ============================================================
+def job_key(script, tier, args=(), env=None):
+    """Hash di contenuto del job: stesso script (byte), tier, argomenti e env."""
+    h = hashlib.sha1()
+    h.update(Path(script).read_bytes())
+    h.update(json.dumps([tier, list(args), sorted((env or {}).items())]).encode())
+    return h.hexdigest()
+
+
+class Job:
+    """Job in coda; wait() blocca fino a done/failed e ritorna l'evento finale."""
+
+    def __init__(self, seq, key, script, tier, args, env, output, priority):
+        self.id = f"job-{seq:04d}"
+        self.seq = seq
+        self.key = key
+        self.script = str(script)
+        self.tier = tier
+        self.args = list(args)
+        self.env = dict(env or {})
+        self.output = output
+        self.priority = priority
+        self.state = "pending"
+        self.worker = None
+        self.result = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.duplicates = 0
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        self._done.wait(timeout)
+        return self.result
+
+    def as_dict(self):
+        return dict(id=self.id, script=Path(self.script).name, tier=self.tier,
+                    state=self.state, worker=self.worker, duplicates=self.duplicates,
+                    wait_s=round((self.started or time.time()) - self.submitted, 2),
+                    run_s=round(self.finished - self.started, 2) if self.finished else None)
+
+
+# ============================================================
+# POOL
+# ============================================================
+def _ram_mb():
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (ValueError, OSError, AttributeError):
+        return RAM_PER_WORKER_MB
+
+
+def pool_size(workers=None, threads=None, ram_per_worker_mb=RAM_PER_WORKER_MB):
+    """(worker, thread per worker) entro core e RAM disponibili."""
+    n_cores = len(cpu_cores())
+    if workers is None:
+        by_ram = int(_ram_mb() // ram_per_worker_mb)
+        workers = max(1, min(by_ram, n_cores // (threads or MIN_THREADS)))
+    threads = threads or max(1, n_cores // workers)
+    return workers, threads
+
+
+class _Worker:
+    """Un render daemon con socket, thread e core propri; rilanciato se termina."""
+
+    def __init__(self, index, threads, cpus, fast_lane, log_dir, max_jobs, max_rss_mb):
+        self.index = index
+        self.threads = threads
+        self.cpus = cpus
+        self.fast_lane = fast_lane
+        self.socket = Path(tempfile.gettempdir()) / f"homeforge-w{os.getpid()}-{index}.sock"
+        self.log_path = Path(log_dir) / f"worker_{index}.log"
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.proc = None
+        self.restarts = 0
+
+    def ensure_started(self):
+        if self.proc is not None and self.proc.poll() is None:
+            return
+        if self.proc is not None:
+            self.restarts += 1                     # riciclo (RECYCLE_EXIT) o crash
+        cmd = render_daemon.daemon_cmd(self.socket, self.max_jobs, self.max_rss_mb, self.threads)
+        preexec = (lambda: os.sched_setaffinity(0, self.cpus)) if self.cpus else None
+        with open(self.log_path, "a") as log:
+            self.proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT,
+                                         preexec_fn=preexec)
+        deadline = time.monotonic() + STARTUP_TIMEOUT_S
+        while not render_daemon.is_running(self.socket):
+            if self.proc.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"Worker {self.index} non avviato (log {self.log_path})")
+            time.sleep(0.2)
+
+    def run(self, job):
+        """Job nel daemon del worker. Se il daemon non ha accettato il job (socket
+        assente o chiuso durante un riciclo) → un secondo tentativo dopo il riavvio."""
+        for attempt in (1, 2):
+            self.ensure_started()
+            try:
+                result = render_daemon.submit(job.script, job.tier, job.args, job.output,
+                                              socket_path=self.socket, on_event=None,
+                                              fallback=False, job_id=job.id, env=job.env)
+            except (FileNotFoundError, ConnectionRefusedError):
+                if attempt == 2:
+                    raise
+                self._wait_exit()
+                continue
+            if result is None and attempt == 1:      # EOF prima di "accepted"
+                self._wait_exit()
+                continue
+            if result and result.get("recycle"):
+                self._wait_exit()                    # riciclo annunciato: processo in uscita
+            return result
+        return None
+
+    def _wait_exit(self, timeout=RECYCLE_TIMEOUT_S):
+        if self.proc is None:
+            return
+        try:
+            self.proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+    def stop(self):
+        if self.proc is None or self.proc.poll() is not None:
+            return
+        try:
+            render_daemon.request({"op": "stop"}, self.socket, timeout=10)
+            self.proc.wait(timeout=30)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            self.proc.kill()
+
+
+# ============================================================
+# SCHEDULER
+# ============================================================
+class Scheduler:
+    """Coda a priorità + un thread di dispatch per worker."""
+
+    def __init__(self, workers=None, threads=None, fast_lane=True, log_dir=None,
+                 max_jobs=render_daemon.MAX_JOBS, max_rss_mb=render_daemon.MAX_RSS_MB,
+                 state_path=STATE_PATH):
+        n_workers, threads = pool_size(workers, threads)
+        log_dir = Path(log_dir or OUTPUT_DIR / "scheduler")
+        log_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = [_Worker(i, threads, cpus, fast_lane and n_workers > 1 and i == 0,
+                                log_dir, max_jobs, max_rss_mb)
+                        for i, cpus in enumerate(cpu_sets(n_workers, threads, cpu_cores()))]
+        self.state_path = state_path
+        self._jobs = []
+        self._by_key = {}
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._threads = []
+        self._started = None
+
+    # --- ciclo di vita ---
+    def start(self):
+        self._started = time.time()
+        for worker in self.workers:
+            t = threading.Thread(target=self._loop, args=(worker,), daemon=True,
+                                 name=f"hf-worker-{worker.index}")
+            t.start()
+            self._threads.append(t)
+        print(f"Scheduler: {len(self.workers)} worker × {self.workers[0].threads} thread"
+              + (" (worker 0 riservato a draft/preview)" if self.workers[0].fast_lane else ""))
+        return self
+
+    def shutdown(self, wait=True):
+        if wait:
+            self.wait_all()
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join()
+        for worker in self.workers:
+            worker.stop()
+        self._write_state()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.shutdown(wait=exc[0] is None)
+        return False
+
+    # --- coda ---
+    def submit(self, script, tier="final", args=(), env=None, output=None, priority=None):
+        """Accoda un job → Job (quello esistente se identico a uno già sottomesso)."""
+        script = render_daemon._resolve(script)
+        key = job_key(script, tier, args, env)
+        with self._cond:
+            job = self._by_key.get(key)
+            if job is not None and job.state != "failed":
+                job.duplicates += 1
+                return job
+            priority = PRIORITY.get(tier, PRIORITY["final"]) if priority is None else priority
+            job = Job(len(self._jobs), key, script, tier, args, env, output, priority)
+            self._jobs.append(job)
+            self._by_key[key] = job
+            self._cond.notify_all()
+        self._write_state()
+        return job
+
+    def _pick(self, worker):
+        """Job pending a priorità più alta eseguibile da questo worker (o None)."""
+        pending = [j for j in self._jobs if j.state == "pending"
+                   and not (worker.fast_lane and j.priority >= PRIORITY["final"])]
+        return min(pending, key=lambda j: (j.priority, j.seq), default=None)
+
+    def _loop(self, worker):
+        while True:
+            with self._cond:
+                job = self._pick(worker)
+                while job is None and not self._stopping:
+                    self._cond.wait()
+                    job = self._pick(worker)
+                if job is None:
+                    return
+                job.state, job.worker, job.started = "running", worker.index, time.time()
+            self._write_state()
+            try:
+                result = worker.run(job)
+            except Exception as e:                  # worker non avviabile, socket chiuso
+                result = dict(event="error", job=job.id, message=f"{type(e).__name__}: {e}")
+            with self._cond:
+                job.result = result
+                job.finished = time.time()
+                job.state = "done" if result and result.get("event") == "done" else "failed"
+                job._done.set()
+                self._cond.notify_all()
+            print(f"  [{job.id}] {job.tier:<7} {Path(job.script).name}: {job.state} "
+                  f"in {job.finished - job.started:.1f}s (worker {worker.index})", flush=True)
+            self._write_state()
+
+    def wait_all(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while any(j.state in ("pending", "running") for j in self._jobs):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    # --- metriche ---
+    def stats(self):
+        with self._cond:
+            jobs = list(self._jobs)
+        elapsed_min = max((time.time() - (self._started or time.time())) / 60, 1e-9)
+        finished = [j for j in jobs if j.finished]
+        per_tier = {}
+        for tier in sorted({j.tier for j in jobs}, key=lambda t: PRIORITY.get(t, 9)):
+            tj = [j for j in jobs if j.tier == tier]
+            done = [j for j in tj if j.finished]
+            per_tier[tier] = dict(
+                pending=sum(j.state == "pending" for j in tj),
+                running=sum(j.state == "running" for j in tj),
+                done=sum(j.state == "done" for j in tj),
+                failed=sum(j.state == "failed" for j in tj),
+                mean_wait_s=round(sum(j.started - j.submitted for j in done) / len(done), 2) if done else None,
+                mean_run_s=round(sum(j.finished - j.started for j in done) / len(done), 2) if done else None)
+        return dict(workers=[dict(index=w.index, threads=w.threads, fast_lane=w.fast_lane,
+                                  restarts=w.restarts) for w in self.workers],
+                    submitted=len(jobs), deduplicated=sum(j.duplicates for j in jobs),
+                    throughput_per_min=round(len(finished) / elapsed_min, 2),
+                    tiers=per_tier, running=[j.as_dict() for j in jobs if j.state == "running"])
+
+    def _write_state(self):
+        if self.state_path:
+            data = dict(self.stats(), pid=os.getpid(), updated=time.time())
+            Path(self.state_path).write_text(json.dumps(data, indent=2))
+
+
+def print_stats(stats):
+    print("=" * 60)
+    print(f"Job: {stats['submitted']} (+{stats['deduplicated']} duplicati), "
+          f"throughput {stats['throughput_per_min']:.2f} job/min")
+    for tier, t in stats["tiers"].items():
+        wait = f"{t['mean_wait_s']:.1f}s" if t["mean_wait_s"] is not None else "—"
+        run = f"{t['mean_run_s']:.1f}s" if t["mean_run_s"] is not None else "—"
+        print(f"  {tier:<8} coda {t['pending']:3d}  in corso {t['running']:2d}  "
+              f"ok {t['done']:3d}  falliti {t['failed']:2d}  attesa {wait:>7}  durata {run:>7}")
+    print("=" * 60)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — scheduler dei render")
+    ap.add_argument("jobs", nargs="?", help="JSON [{script, tier, args, env, output, priority}]")
+    ap.add_argument("--workers", type=int, help="default: da core e RAM")
+    ap.add_argument("--threads", type=int, help="thread per worker (default: core / worker)")
+    ap.add_argument("--no-fast-lane", action="store_true",
+                    help="nessun worker riservato a draft/preview")
+    ap.add_argument("--status", action="store_true", help="stato dello scheduler in esecuzione")
+    args = ap.parse_args(script_args() if argv is None else argv)
+
+    if args.status:
+        if not STATE_PATH.exists():
+            print("Nessuno scheduler attivo")
+            return
+        state = json.loads(STATE_PATH.read_text())
+        print_stats(state)
+        for job in state["running"]:
+            print(f"  in corso: {job['id']} {job['tier']} {job['script']} (worker {job['worker']})")
+        return
+    if not args.jobs:
+        ap.error("indicare il file dei job o --status")
+
+    specs = json.loads(Path(args.jobs).read_text())
+    with Scheduler(args.workers, args.threads, fast_lane=not args.no_fast_lane) as sched:
+        for spec in specs:
+            sched.submit(spec["script"], spec.get("tier", "final"), spec.get("args", ()),
+                         spec.get("env"), spec.get("output"), spec.get("priority"))
+        sched.wait_all()
+        stats = sched.stats()
+    print_stats(stats)
+    sys.exit(0 if all(t["failed"] == 0 for t in stats["tiers"].values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
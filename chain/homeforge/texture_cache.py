@@ -0,0 +1,287 @@
+"""
+HomeForge AI — Cache texture multi-risoluzione
+Le map Poly Haven in chain/materials/textures/ sono tutte 2K e vengono
+decodificate intere a ogni run, anche per i draft. La cache contiene per ogni
+map le varianti 512 / 1K (2K = sorgente, nessuna copia), con nome legato
+all'hash del contenuto. Stesse varianti per le texture ORM impacchettate
+(cache/orm, homeforge.orm_pack).
+
+Manifest: textures/cache/manifest.json. Una map viene riconvertita solo se
+l'hash della sorgente cambia (mtime/size invariati → hash non ricalcolato).
+
+    blender --background --python chain/homeforge/texture_cache.py -- [--force] [--stats]
+
+materials.load_image carica già la variante del livello qualità della run
+(--tier / HF_TIER, resolve()): nei draft il 2K non viene mai decodificato.
+Dopo aver applicato il livello, per le immagini già in sessione (daemon caldo):
+    texture_cache.apply_variants(tier=TIER["name"])   # draft → 512, preview → 1K
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from contextlib import contextmanager
+
+import bpy
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import TEX_DIR, file_hash, script_args
+from homeforge import quality
+
+CACHE_DIR = TEX_DIR / "cache"
+ORM_DIR = CACHE_DIR / "orm"
+MANIFEST_PATH = CACHE_DIR / "manifest.json"
+RESOLUTIONS = (512, 1024)
+SOURCE_EXT = (".jpg", ".jpeg", ".png")
+
+_MANIFEST = None
+_TIER = None          # livello forzato da use_tier() (None: quello della run)
+
+
+# ============================================================
+# MANIFEST
+# ============================================================
+def read_manifest():
+    global _MANIFEST
+    if _MANIFEST is None:
+        _MANIFEST = json.loads(MANIFEST_PATH.read_text()) if MANIFEST_PATH.exists() else {}
+    return _MANIFEST
+
+
+def _write_manifest(manifest):
+    global _MANIFEST
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    _MANIFEST = manifest
+
+
+def sources(tex_dir=TEX_DIR):
+    if not Path(tex_dir).is_dir():
+        return []
+    return sorted(p for p in Path(tex_dir).iterdir()
+                  if p.is_file() and p.suffix.lower() in SOURCE_EXT)
+
+
+def _source_path(name, tex_dir=TEX_DIR):
+    """Sorgente di un'entry del manifest: map in textures/ o ORM in cache/orm."""
+    orm = ORM_DIR / name
+    return orm if orm.exists() else Path(tex_dir) / name
+
+
+def is_fresh(src, entry):
+    """True se l'entry del manifest corrisponde alla sorgente e i file esistono."""
+    if not entry:
+        return False
+    stat = src.stat()
+    if (entry.get("size") != stat.st_size or entry.get("mtime_ns") != stat.st_mtime_ns) \
+            and entry.get("hash") != file_hash(src):
+        return False
+    return all((CACHE_DIR / name).exists() for name in entry["variants"].values())
+
+
+# ============================================================
+# BUILD
+# ============================================================
+def _save_scaled(img, size, output):
+    img.scale(size[0], size[1])
+    img.filepath_raw = str(output)
+    img.file_format = 'PNG' if output.suffix.lower() == ".png" else 'JPEG'
+    img.save()
+
+
+def _build_entry(src, digest):
+    tag = digest[:10]
+    img = bpy.data.images.load(str(src), check_existing=False)
+    img.colorspace_settings.name = 'Non-Color'      # nessuna conversione nel resize
+    w, h = img.size
+    variants = {}
+    try:
+        # Dalla risoluzione più alta alla più bassa: ogni passo scala il precedente
+        for res in sorted(RESOLUTIONS, reverse=True):
+            if res >= max(w, h):
+                continue
+            scale = res / max(w, h)
+            out = CACHE_DIR / f"{src.stem}_{res}_{tag}{src.suffix}"
+            _save_scaled(img, (max(1, round(w * scale)), max(1, round(h * scale))), out)
+            variants[str(res)] = out.name
+    finally:
+        bpy.data.images.remove(img)
+    stat = src.stat()
+    return dict(hash=digest, size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                resolution=[w, h], variants=variants)
+
+
+def _remove_entry_files(entry):
+    # "tx": versioni maketx dei manifest precedenti (nessun renderer le leggeva)
+    for name in list(entry.get("variants", {}).values()) + [entry.get("tx")]:
+        if name:
+            (CACHE_DIR / name).unlink(missing_ok=True)
+
+
+def _update(manifest, src, force=False):
+    """Riconverte src nel manifest se nuova o cambiata; True se convertita.
+
+    Se solo mtime/size sono cambiati (hash uguale, es. file ricopiato) l'entry
+    viene ri-timbrata: il controllo successivo non rifà l'hash.
+    """
+    entry = manifest.get(src.name)
+    if not force and is_fresh(src, entry):
+        stat = src.stat()
+        if (entry.get("size"), entry.get("mtime_ns")) != (stat.st_size, stat.st_mtime_ns):
+            manifest[src.name] = dict(entry, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        return False
+    if entry:
+        _remove_entry_files(entry)
+    manifest[src.name] = _build_entry(src, file_hash(src))
+    print(f"  [cache] {src.name}: {', '.join(manifest[src.name]['variants']) or '—'}")
+    return True
+
+
+def build_cache(tex_dir=TEX_DIR, force=False):
+    """Converte le map (e le ORM) nuove o cambiate; ritorna il numero di sorgenti convertite."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    manifest = dict(read_manifest())
+    built = 0
+    current = set()
+    for src in sources(tex_dir) + sources(ORM_DIR):
+        current.add(src.name)
+        built += _update(manifest, src, force)
+    for name in set(manifest) - current:                 # sorgenti rimosse
+        _remove_entry_files(manifest.pop(name))
+    _write_manifest(manifest)
+    print(f"Cache texture: {built} convertite, {len(current) - built} già aggiornate")
+    return built
+
+
+# ============================================================
+# VARIANTI
+# ============================================================
+def resolution_for_tier(tier):
+    """Lato massimo della variante per il livello qualità (None = sorgente 2K)."""
+    limit = quality.TIERS[tier]["texture_limit"]
+    return None if limit == 'OFF' else int(limit)
+
+
+def variant(path, resolution=None):
+    """Path della variante ≤ resolution per una sorgente (la sorgente se manca)."""
+    path = Path(path)
+    entry = read_manifest().get(path.name)
+    if resolution is None or not entry:
+        return str(path)
+    candidates = [int(r) for r in entry["variants"] if int(r) <= resolution]
+    if not candidates:
+        return str(path)
+    cached = CACHE_DIR / entry["variants"][str(max(candidates))]
+    return str(cached) if cached.exists() else str(path)
+
+
+def _cacheable(path):
+    """True per le map in textures/ e le ORM in cache/orm (non HDRI o altro)."""
+    return (path.suffix.lower() in SOURCE_EXT
+            and path.resolve().parent in (TEX_DIR.resolve(), ORM_DIR.resolve()))
+
+
+def resolve(path, resolution=None, tier=None):
+    """Path da caricare per una map: variante del livello qualità (default quello
+    della run, --tier / HF_TIER), convertita al volo se manca nel manifest."""
+    path = Path(path)
+    if resolution is None:
+        resolution = resolution_for_tier(tier or _TIER or quality.get_tier())
+    if resolution is None or not _cacheable(path):
+        return str(path)
+    manifest = dict(read_manifest())
+    if _update(manifest, path) or manifest.get(path.name) != read_manifest().get(path.name):
+        _write_manifest(manifest)                     # convertita o ri-timbrata
+    return variant(path, resolution)
+
+
+@contextmanager
+def use_tier(tier):
+    """Forza il livello di resolve() nel blocco (es. "final": map sorgente)."""
+    global _TIER
+    previous, _TIER = _TIER, tier
+    try:
+        yield
+    finally:
+        _TIER = previous
+
+
+def apply_variants(resolution=None, tier=None, tex_dir=TEX_DIR):
+    """Punta le immagini della sessione (sorgenti o varianti) alla risoluzione scelta.
+
+    Da chiamare prima del render: le immagini non ancora decodificate non
+    caricano mai il 2K. Ritorna il numero di immagini ricollegate.
+    """
+    if tier is not None:
+        resolution = resolution_for_tier(tier)
+    if resolution is not None:
+        build_cache(tex_dir)          # solo le map nuove o cambiate
+    manifest = read_manifest()
+    tex_dir = Path(tex_dir).resolve()
+    # path (sorgente o variante) → sorgente
+    owners = {}
+    for name, entry in manifest.items():
+        src = _source_path(name, tex_dir).resolve()
+        owners[str(src)] = src
+        for cached in entry["variants"].values():
+            owners[str((CACHE_DIR / cached).resolve())] = src
+
+    switched = 0
+    for img in bpy.data.images:
+        if not img.filepath or img.library is not None:
+            continue
+        current = str(Path(bpy.path.abspath(img.filepath)).resolve())
+        src = owners.get(current)
+        if src is None:
+            continue
+        target = variant(src, resolution)
+        if target != current:
+            img.filepath = target
+            if img.has_data:
+                img.reload()
+            switched += 1
+    if switched:
+        print(f"  Texture: {switched} immagini → {resolution or 'sorgente'}")
+    return switched
+
+
+# ============================================================
+# STATISTICHE
+# ============================================================
+def load_stats(tex_dir=TEX_DIR):
+    """Tempo di decodifica e memoria di tutte le map per ogni risoluzione."""
+    results = {}
+    for res in (None,) + tuple(sorted(RESOLUTIONS, reverse=True)):
+        t0 = time.perf_counter()
+        total = 0
+        for src in sources(tex_dir):
+            img = bpy.data.images.load(variant(src, res), check_existing=False)
+            img.pixels[0]                                  # forza la decodifica
+            w, h = img.size
+            total += w * h * img.channels
+            bpy.data.images.remove(img)
+        results[res or "2K"] = dict(load_s=time.perf_counter() - t0, mb=total / 2**20)
+
+    print("=" * 60)
+    print("Cache texture: decodifica + memoria (tutte le map)")
+    for res, r in results.items():
+        print(f"  {str(res):>5}  {r['load_s']:7.2f}s  {r['mb']:8.1f} MB")
+    print("=" * 60)
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — cache texture")
+    ap.add_argument("--force", action="store_true", help="riconverti tutte le map")
+    ap.add_argument("--stats", action="store_true", help="tempi di caricamento per risoluzione")
+    args = ap.parse_args(script_args() if argv is None else argv)
+    build_cache(force=args.force)
+    if args.stats:
+        load_stats()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+HomeForge AI — Render CPU multi-processo a regioni (border + stitching)
+Un solo processo Blender non scala linearmente sui server CPU a 64 core.
+Il driver divide il frame in regioni (render.use_border / border_min_x ...),
+lancia N worker Blender headless sullo stesso .blend con thread fissati
+(e affinità CPU su Linux), poi ricompone le regioni con NumPy.
+
+Il driver gira dentro Blender (legge risoluzione/formato dal .blend e usa
+bpy per leggere/scrivere le immagini):
+    blender --background chain/materials/test_roof_piode.blend \
+        --python chain/homeforge/tiled_render.py -- --workers 8 --out output/tetto_tiled.png
+    # + speedup contro un render a processo singolo dello stesso .blend
+    blender --background chain/materials/test_roof_piode.blend \
+        --python chain/homeforge/tiled_render.py -- --workers 8 --compare
+
+Il .blend di riferimento è quello salvato da training_tetto_piode.py.
+Le regioni usano confini a pixel interi: nessun bordo duplicato o mancante.
+Con il denoiser attivo ogni worker renderizza la regione allargata di
+DENOISE_MARGIN px (il denoiser vede i vicini come nel frame intero) e lo
+stitching tiene solo la regione: niente giunture fra le regioni denoisate.
+"""
+import os
+import sys
+import math
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+import bpy
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeforge import OUTPUT_DIR, cpu_cores, cpu_sets, script_args
+from homeforge import compositing
+from homeforge import quality
+
+BLENDER = os.environ.get("BLENDER", bpy.app.binary_path or "blender")
+SCRIPT = Path(__file__).resolve()
+DENOISE_MARGIN = 32      # px renderizzati oltre la regione e scartati allo stitching
+
+
+# ============================================================
+# REGIONI
+# ============================================================
+def split_regions(width, height, n_tiles):
+    """Almeno n_tiles regioni in pixel (x0, x1, y0, y1), y dal basso come in Blender.
+
+    Griglia colonne × righe il più quadrata possibile: regioni alte e strette
+    mescolano cielo e modello e bilanciano meglio il carico delle strisce.
+    """
+    if n_tiles < 1:
+        raise ValueError(f"n_tiles deve essere >= 1 ({n_tiles})")
+    cols = max(1, round(math.sqrt(n_tiles * width / height)))
+    cols = min(cols, n_tiles)
+    rows = math.ceil(n_tiles / cols)
+    xs = np.linspace(0, width, cols + 1).round().astype(int)
+    ys = np.linspace(0, height, rows + 1).round().astype(int)
+    return [(int(xs[c]), int(xs[c + 1]), int(ys[r]), int(ys[r + 1]))
+            for r in range(rows) for c in range(cols)]
+
+
+def pad_region(region, size, margin):
+    """Regione allargata di `margin` px per lato, limitata al frame."""
+    width, height = size
+    x0, x1, y0, y1 = region
+    return (max(0, x0 - margin), min(width, x1 + margin),
+            max(0, y0 - margin), min(height, y1 + margin))
+
+
+def frame_size(scene):
+    pct = scene.render.resolution_percentage / 100
+    return (int(scene.render.resolution_x * pct), int(scene.render.resolution_y * pct))
+
+
+# ============================================================
+# WORKER (processo Blender figlio)
+# ============================================================
+def render_region(scene, region, size, threads, output, tier=None):
+    """Renderizza una regione del frame (senza crop: il frame resta full-size)."""
+    if tier:
+        quality.apply_tier(scene, tier)
+    width, height = size
+    x0, x1, y0, y1 = region
+    r = scene.render
+    r.use_border = True
+    r.use_crop_to_border = False
+    r.border_min_x, r.border_max_x = x0 / width, x1 / width
+    r.border_min_y, r.border_max_y = y0 / height, y1 / height
+    r.threads_mode = 'FIXED'
+    r.threads = threads
+    scene.cycles.device = 'CPU'
+    _set_output_format(scene, output)
+    r.filepath = str(output)
+    bpy.ops.render.render(write_still=True)
+
+
+def _set_output_format(scene, output):
+    settings = scene.render.image_settings
+    if Path(output).suffix.lower() == ".exr":
+        settings.file_format = 'OPEN_EXR'
+        settings.color_depth = '32'
+        settings.exr_codec = 'ZIP'
+    else:
+        # PNG 8 bit: i pixel letti da bpy sono i valori salvati → stitching esatto
+        settings.file_format = 'PNG'
+        settings.color_depth = '8'
+    settings.color_mode = 'RGBA' if scene.render.film_transparent else 'RGB'
+
+
+# ============================================================
+# DRIVER
+# ============================================================
+def _worker_cmd(blend, region, size, threads, output, tier):
+    cmd = [BLENDER, "--background", str(blend), "--threads", str(threads),
+           "--python", str(SCRIPT), "--", "--worker",
+           "--region", ",".join(map(str, region)), "--size", f"{size[0]},{size[1]}",
+           "--threads", str(threads), "--out", str(output)]
+    if tier:
+        cmd += ["--tier", tier]
+    return cmd
+
+
+def _launch(cmd, cpus, log_path):
+    preexec = None
+    if cpus:
+        preexec = lambda: os.sched_setaffinity(0, cpus)
+    log = open(log_path, "w")
+    return subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, preexec_fn=preexec), log
+
+
+def run_workers(jobs, n_workers, cpu_sets):
+    """Esegue i job [(cmd, log_path)] con al massimo n_workers processi attivi."""
+    pending = list(enumerate(jobs))
+    running = {}          # slot → (Popen, log, job index)
+    failed = []
+    while pending or running:
+        for slot in range(n_workers):
+            if slot not in running and pending:
+                idx, (cmd, log_path) = pending.pop(0)
+                proc, log = _launch(cmd, cpu_sets[slot], log_path)
+                running[slot] = (proc, log, idx)
+        for slot, (proc, log, idx) in list(running.items()):
+            if proc.poll() is not None:
+                log.close()
+                if proc.returncode != 0:
+                    failed.append((idx, proc.returncode, jobs[idx][1]))
+                del running[slot]
+        time.sleep(0.2)
+    if failed:
+        details = ", ".join(f"regione {i} (exit {rc}, log {p})" for i, rc, p in failed)
+        raise RuntimeError(f"Worker falliti: {details}")
+
+
+def stitch(tiles, size, output):
+    """Ricompone le regioni [(region, path)] in un'unica immagine (il margine dei worker si scarta)."""
+    width, height = size
+    frame = np.zeros((height, width, 4), dtype=np.float32)
+    for (x0, x1, y0, y1), path in tiles:
+        img = compositing.load_image(path)
+        px = compositing.read_pixels(img)
+        frame[y0:y1, x0:x1] = px[y0:y1, x0:x1]
+        bpy.data.images.remove(img)
+    if Path(output).suffix.lower() == ".exr":
+        img = bpy.data.images.new("Tiled", width=width, height=height, alpha=True,
+                                  float_buffer=True)
+        compositing.write_pixels(img, frame)
+        img.filepath_raw = str(output)
+        img.file_format = 'OPEN_EXR'
+        img.save()
+        bpy.data.images.remove(img)
+    else:
+        compositing.save_png(frame, output, name="Tiled")
+    return str(output)
+
+
+def render_tiled(blend, output, workers, tiles=None, threads=None, tier=None, keep_tiles=False):
+    """Render del .blend con `workers` processi su `tiles` regioni → secondi."""
+    scene = bpy.context.scene
+    if tier:
+        quality.apply_tier(scene, tier)
+    size = frame_size(scene)
+    n_cpu = len(cpu_cores())
+    threads = threads or max(1, n_cpu // workers)
+    regions = split_regions(*size, tiles or workers)
+    margin = DENOISE_MARGIN if scene.cycles.use_denoising else 0
+    tmp = Path(tempfile.mkdtemp(prefix="hf_tiles_", dir=OUTPUT_DIR if OUTPUT_DIR.exists() else None))
+    ext = Path(output).suffix.lower() or ".png"
+
+    jobs, tile_paths = [], []
+    for i, region in enumerate(regions):
+        path = tmp / f"tile_{i:03d}{ext}"
+        tile_paths.append((region, path))
+        jobs.append((_worker_cmd(blend, pad_region(region, size, margin), size, threads, path, tier),
+                     tmp / f"tile_{i:03d}.log"))
+
+    print(f"  Tiled: {len(regions)} regioni, {workers} worker × {threads} thread, {size[0]}×{size[1]}")
+    t0 = time.perf_counter()
+    run_workers(jobs, workers, cpu_sets(workers, threads))
+    stitch(tile_paths, size, output)
+    elapsed = time.perf_counter() - t0
+    if not keep_tiles:
+        shutil.rmtree(tmp, ignore_errors=True)
+    print(f"  Tiled: {elapsed:.1f}s → {output}")
+    return elapsed
+
+
+def render_single(blend, output, threads=None, tier=None):
+    """Riferimento: un solo processo Blender, frame intero, tutti i thread."""
+    scene = bpy.context.scene
+    size = frame_size(scene)
+    n_cpu = len(cpu_cores())
+    threads = threads or n_cpu
+    log_path = Path(output).with_suffix(".log")
+    t0 = time.perf_counter()
+    run_workers([(_worker_cmd(blend, (0, size[0], 0, size[1]), size, threads, output, tier),
+                  log_path)], 1, [None])
+    elapsed = time.perf_counter() - t0
+    print(f"  Singolo processo: {elapsed:.1f}s → {output}")
+    return elapsed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HomeForge AI — render CPU a regioni")
+    ap.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--region", help=argparse.SUPPRESS)
+    ap.add_argument("--size", help=argparse.SUPPRESS)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--tiles", type=int, help="regioni (default = workers)")
+    ap.add_argument("--threads", type=int, help="thread per worker (default core/workers)")
+    ap.add_argument("--tier", choices=sorted(quality.TIERS))
+    ap.add_argument("--out", default=str(OUTPUT_DIR / "render_tiled.png"))
+    ap.add_argument("--compare", action="store_true",
+                    help="misura anche il render a processo singolo e lo speedup")
+    ap.add_argument("--keep-tiles", action="store_true")
+    args = ap.parse_args(script_args() if argv is None else argv)
+
+    scene = bpy.context.scene
+    if args.worker:
+        region = tuple(int(v) for v in args.region.split(","))
+        size = tuple(int(v) for v in args.size.split(","))
+        render_region(scene, region, size, args.threads, args.out, args.tier)
+        return
+
+    blend = bpy.data.filepath
+    if not blend:
+        raise SystemExit("Aprire un .blend: blender --background file.blend --python tiled_render.py -- ...")
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    t_tiled = render_tiled(blend, args.out, args.workers, args.tiles, args.threads,
+                           args.tier, args.keep_tiles)
+    if args.compare:
+        out = Path(args.out)
+        single_out = out.with_name(f"{out.stem}_single{out.suffix}")
+        t_single = render_single(blend, single_out, tier=args.tier)
+        print("=" * 60)
+        print(f"Render a regioni: {args.workers} worker, {args.tiles or args.workers} regioni")
+        print(f"  Singolo processo: {t_single:8.1f}s")
+        print(f"  Regioni + stitch: {t_tiled:8.1f}s  ({t_single / t_tiled:.2f}×)")
+        print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
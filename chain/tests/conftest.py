@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# homeforge vive in chain/, come per gli script Blender
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
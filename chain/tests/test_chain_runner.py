@@ -0,0 +1,31 @@
+from homeforge import chain_runner
+from homeforge.l3_ops import L3_PATH
+
+
+def _dirty(edit):
+    text = L3_PATH.read_text(encoding="utf-8")
+    return chain_runner.dirty_ops(edit(text), chain_runner.op_hashes(text))
+
+
+def test_unchanged_text_is_clean():
+    assert _dirty(lambda text: text) == []
+
+
+def test_moving_a_window_keeps_eave_beams():
+    dirty = _dirty(lambda text: text.replace("(7.00, 0.225, 1.60)", "(7.20, 0.225, 1.60)"))
+    assert {"OP-022", "OP-010", "OP-029", "OP-090"} <= set(dirty)
+    # le altre aperture dello stesso muro (stesso target) si rifanno, le travi no
+    assert "OP-020" in dirty
+    assert not {"OP-060", "OP-061", "OP-070", "OP-002"} & set(dirty)
+
+
+def test_material_change_dirties_its_users():
+    dirty = _dirty(lambda text: text.replace("### OP-005: Crea materiale Legno Scuro",
+                                             "### OP-005: Crea materiale Legno Scuro (v2)"))
+    assert {"OP-005", "OP-060", "OP-061"} <= set(dirty)
+    assert "OP-010" not in dirty
+
+
+def test_state_key_per_tier():
+    assert chain_runner.state_key("L3") == "L3"
+    assert chain_runner.state_key("L4", "draft") == "L4:draft"
@@ -0,0 +1,58 @@
+import pytest
+
+from homeforge import l3_ops
+from homeforge.l3_ops import OpError
+
+
+@pytest.fixture(scope="module")
+def ops():
+    return l3_ops.load()
+
+
+def test_load_kinds(ops):
+    kinds = {op.id: op.kind for op in ops}
+    assert kinds["OP-001"] == "utility"
+    assert kinds["OP-022"] == "boolean_cut"
+    assert kinds["OP-029"] == "apply_modifiers"
+    assert kinds["OP-060"] == "box_loop"
+    assert ops[-1].kind == "composite"
+
+
+def test_box_loop_expands_names(ops):
+    op = next(op for op in ops if op.id == "OP-060")
+    names = op.objects
+    assert len(names) == 18 and names[0] == "TraveSud_0" and names[-1] == "TraveSud_17"
+    assert op.params["material"] == "LegnoScuro"
+    assert op.params["objects"][1]["location"] == (0.9, -0.2, 2.9)
+
+
+def test_scene_description(ops):
+    desc = l3_ops.scene_description(ops)
+    assert set(desc["materials"]) == {"Pietra", "Vetro", "Piode", "LegnoScuro", "Porta"}
+    muro = desc["objects"]["MuroSud"]
+    cuts = [m["object"] for m in muro["modifiers"] if m["type"] == "BOOLEAN"]
+    assert "cut_A3" in cuts
+    assert desc["objects"]["cut_A3"]["role"] == "cutter"
+    assert desc["objects"]["TraveNord_17"]["data"]["shared"] is True
+
+
+def test_op_names_box_loop():
+    blocks = l3_ops.split_ops(l3_ops.L3_PATH.read_text(encoding="utf-8"))
+    made, used, targets = l3_ops.op_names(blocks["OP-061"])
+    assert made == {f"TraveNord_{i}" for i in range(18)}
+    assert used == {"LegnoScuro"} and not targets
+    made, used, targets = l3_ops.op_names(blocks["OP-022"])
+    assert made == {"cut_A3"} and targets == {"MuroSud"}
+
+
+def test_missing_material_is_rejected():
+    text = """
+### OP-010: Crea Muro
+- Tipo: box
+- Funzione: `make_box("Muro", 1.0, 0.3, 2.0)`
+- Location: (0, 0, 1)
+- Materiale: "Pietra"
+"""
+    with pytest.raises(OpError) as exc:
+        l3_ops.parse(text)
+    assert exc.value.op_id == "OP-010"
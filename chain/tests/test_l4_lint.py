@@ -0,0 +1,70 @@
+from homeforge import l4_lint
+from homeforge import CHAIN_DIR
+
+SCRIPT = CHAIN_DIR / "L4_script.py"
+
+
+def _rules(source):
+    return [f["rule"] for f in l4_lint.lint_source(source, SCRIPT)]
+
+
+def test_blender5_api():
+    rules = _rules("""
+scene = bpy.context.scene
+tree = scene.node_tree
+sky.sky_type = 'NISHITA'
+mod.solver = 'FAST'
+mat.cycles.displacement_method = 'BUMP'
+""")
+    assert rules == ["scene-node-tree", "sky-nishita", "boolean-fast", "cycles-displacement"]
+
+
+def test_agx_look():
+    assert _rules("scene.view_settings.look = 'AgX - Medium Contrast'") == ["agx-look"]
+    fallback = _rules("""
+try:
+    scene.view_settings.look = 'AgX - Medium Contrast'
+except:
+    scene.view_settings.look = 'AgX - Base Contrast'
+""")
+    assert fallback == ["agx-look-fallback"]
+    assert not l4_lint.errors(l4_lint.lint_source(
+        "try:\n    look = 'AgX - Medium Contrast'\nexcept:\n    look = 'AgX - Base Contrast'\n", SCRIPT))
+
+
+def test_output_dir_matches_mkdir_target():
+    source = """
+from pathlib import Path
+OUT = Path(__file__).parent / "hf_lint_missing_out"
+OTHER = Path(__file__).parent / "hf_lint_missing_other"
+OTHER.mkdir(parents=True, exist_ok=True)
+scene.render.filepath = str(OUT / "a.png")
+scene.render.filepath = str(OTHER / "b.png")
+"""
+    findings = l4_lint.lint_source(source, SCRIPT)
+    assert [(f["rule"], f["line"]) for f in findings] == [("output-dir", 6)]
+
+
+def test_relative_path_and_syntax():
+    assert _rules("img = bpy.data.images.load('textures/a.png')") == ["relative-path"]
+    assert _rules("def broken(:\n") == ["syntax"]
+
+
+def test_missing_texture_in_fstring_reported_once():
+    source = """
+from pathlib import Path
+TEX = Path(__file__).parent / "materials" / "textures"
+img = bpy.data.images.load(f"{TEX}/hf_lint_missing_diff_2k.jpg")
+"""
+    assert _rules(source).count("texture-missing") == 1
+
+
+def test_compositing_needs_film_transparent():
+    assert "film-transparent" in _rules("composite_on_photo(a, b, c)")
+    assert "film-transparent" not in _rules(
+        "scene.render.film_transparent = True\ncomposite_on_photo(a, b, c)")
+
+
+def test_material_preview_scripts_lint_clean():
+    for name in ("render_stone_wall_pbr.py", "render_piode_roof_pbr.py"):
+        assert not l4_lint.errors(l4_lint.lint(CHAIN_DIR / "materials" / name))
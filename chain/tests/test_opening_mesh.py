@@ -0,0 +1,41 @@
+import numpy as np
+
+from homeforge.opening_mesh import edge_use, holed_box, opening_rect
+
+LO, HI = np.array([0.0, 0.0, 0.0]), np.array([8.0, 0.45, 3.0])
+
+
+def _volume(verts, faces):
+    tris = np.concatenate([faces[:, [0, 1, 2]], faces[:, [0, 2, 3]]])
+    p = verts[tris]
+    return np.einsum("ij,ij->i", p[:, 0], np.cross(p[:, 1], p[:, 2])).sum() / 6
+
+
+def test_opening_rect():
+    assert opening_rect(LO, HI, 1, (1.0, -0.1, 0.9), (2.2, 0.6, 2.1)) == \
+        ("through", (1.0, 2.2, 0.9, 2.1))
+    assert opening_rect(LO, HI, 1, (1.0, 0.1, 0.9), (2.2, 0.6, 2.1))[0] == "partial"
+    assert opening_rect(LO, HI, 1, (9.0, -0.1, 0.9), (10.0, 0.6, 2.1))[0] == "miss"
+
+
+def test_plain_box():
+    verts, faces = holed_box(LO, HI, 1, [])
+    assert len(verts) == 8 and len(faces) == 6
+    assert edge_use(faces, np.full(len(faces), 4))["manifold"]
+    assert np.isclose(_volume(verts, faces), 8.0 * 0.45 * 3.0)
+
+
+def test_holes_are_manifold_with_exact_volume():
+    rects = [(1.0, 2.2, 0.9, 2.1), (3.0, 4.0, 0.0, 2.2), (5.0, 6.5, 1.0, 2.0)]
+    verts, faces = holed_box(LO, HI, 1, rects)
+    use = edge_use(faces, np.full(len(faces), 4))
+    assert use["manifold"] and use["boundary"] == 0 and use["nonmanifold"] == 0
+    holes = sum((u1 - u0) * (v1 - v0) for u0, u1, v0, v1 in rects)
+    assert np.isclose(_volume(verts, faces), (8.0 * 3.0 - holes) * 0.45)
+
+
+def test_edge_use_open_mesh():
+    verts, faces = holed_box(LO, HI, 0, [])
+    use = edge_use(faces[:-1], np.full(len(faces) - 1, 4))
+    assert not use["manifold"] and use["boundary"] == 4
+    assert edge_use([], [])["faces"] == 0
@@ -0,0 +1,19 @@
+import pytest
+
+from homeforge import quality
+
+
+def test_get_tier(monkeypatch):
+    monkeypatch.delenv(quality.ENV_VAR, raising=False)
+    assert quality.get_tier(["blender"]) == quality.DEFAULT_TIER
+    assert quality.get_tier(["blender", "--background", "--", "--tier", "Draft"]) == "draft"
+    monkeypatch.setenv(quality.ENV_VAR, "preview")
+    assert quality.get_tier(["script.py"]) == "preview"
+    assert quality.get_tier(["script.py", "--tier", "final"]) == "final"   # argv prima dell'env
+    with pytest.raises(ValueError):
+        quality.get_tier(["script.py", "--tier", "ultra"])
+
+
+def test_tier_output():
+    assert quality.tier_output("output/render.png", "final") == "output/render.png"
+    assert quality.tier_output("output/render.png", "draft").endswith("render_draft.png")
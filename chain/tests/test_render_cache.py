@@ -0,0 +1,42 @@
+import pytest
+
+bpy = pytest.importorskip("bpy")            # Blender come modulo Python (pip install bpy)
+
+from homeforge import render_cache
+
+
+@pytest.fixture
+def scene():
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    scene = bpy.context.scene
+    mesh = bpy.data.meshes.new("Muro")
+    mesh.from_pydata([(0, 0, 0), (1, 0, 0), (1, 0, 1), (0, 0, 1)], [], [(0, 1, 2, 3)])
+    scene.collection.objects.link(bpy.data.objects.new("Muro", mesh))
+    cam = bpy.data.objects.new("Camera", bpy.data.cameras.new("Camera"))
+    scene.collection.objects.link(cam)
+    scene.camera = cam
+    return scene
+
+
+def test_fingerprint_is_stable(scene):
+    assert render_cache.scene_fingerprint(scene) == render_cache.scene_fingerprint(scene)
+
+
+def test_visibility_only_changes_fingerprint(scene):
+    before = render_cache.scene_fingerprint(scene)
+    scene.objects["Muro"].visible_camera = False
+    hidden = render_cache.scene_fingerprint(scene)
+    assert hidden != before
+    scene.objects["Muro"].visible_camera = True
+    scene.objects["Muro"].is_holdout = True
+    assert render_cache.scene_fingerprint(scene) not in (before, hidden)
+
+
+def test_view_layer_and_world_change_fingerprint(scene):
+    scene.world = bpy.data.worlds.new("World")
+    before = render_cache.scene_fingerprint(scene)
+    scene.view_layers[0].samples = 7
+    after_layer = render_cache.scene_fingerprint(scene)
+    assert after_layer != before
+    scene.world.cycles.sample_map_resolution = 512
+    assert render_cache.scene_fingerprint(scene) != after_layer
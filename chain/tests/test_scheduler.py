@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from homeforge import cpu_sets, scheduler
+
+SCRIPT = "chain/training_muro_pietra.py"
+
+
+@pytest.fixture
+def sched(tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler, "cpu_cores", lambda: list(range(8)))
+    monkeypatch.setattr(scheduler, "_ram_mb", lambda: 64000)
+    return scheduler.Scheduler(workers=2, threads=4, log_dir=tmp_path,
+                               state_path=tmp_path / "state.json")
+
+
+def test_pool_size(monkeypatch):
+    monkeypatch.setattr(scheduler, "cpu_cores", lambda: list(range(16)))
+    monkeypatch.setattr(scheduler, "_ram_mb", lambda: 64000)
+    assert scheduler.pool_size() == (8, 2)
+    assert scheduler.pool_size(threads=4) == (4, 4)
+    monkeypatch.setattr(scheduler, "_ram_mb", lambda: 13000)       # RAM per 2 worker
+    assert scheduler.pool_size() == (2, 8)
+    assert scheduler.pool_size(workers=3) == (3, 5)
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="affinità CPU solo su Linux")
+def test_cpu_sets_wrap_around():
+    sets = cpu_sets(3, 5, list(range(12)))
+    assert sets[:2] == [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9]]
+    assert sets[2] == [10, 11, 0, 1, 2]                 # 5 core anche a fine lista
+    assert cpu_sets(2, 8, [0, 1, 2, 3]) == [[0, 1, 2, 3]] * 2
+
+
+def test_pick_priority_and_fast_lane(sched):
+    final = sched.submit(SCRIPT, tier="final")
+    draft = sched.submit(SCRIPT, tier="draft", args=["--view", "a"])
+    sched.submit(SCRIPT, tier="draft", args=["--view", "b"])
+    fast, normal = sched.workers
+    assert fast.fast_lane and not normal.fast_lane
+    assert sched._pick(normal) is draft                 # priorità, poi ordine di arrivo
+    draft.state = "running"
+    assert sched._pick(fast).args == ["--view", "b"]
+    for job in sched._jobs[1:]:
+        job.state = "done"
+    assert sched._pick(fast) is None                    # la corsia veloce non prende i final
+    assert sched._pick(normal) is final
+
+
+def test_duplicate_submit_returns_same_job(sched):
+    job = sched.submit(SCRIPT, tier="preview")
+    assert sched.submit(SCRIPT, tier="preview") is job
+    assert job.duplicates == 1
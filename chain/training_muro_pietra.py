@@ -2,20 +2,32 @@
 HomeForge AI — Training: Muro in pietra — ITERAZIONE 3
 Texture PBR reali da Poly Haven (broken_wall) + bump forte
 """
-import bpy, bmesh, math, time
+import bpy, bmesh, math, time, sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from homeforge import materials as hfm
+from homeforge import quality
+from homeforge import instrument
+from homeforge import scene_setup
+from homeforge import render_cache
+from homeforge import progressive
+from homeforge import preflight
+from homeforge import texture_cache
+from homeforge import bake_cache
+from homeforge import asset_library as hflib
+
 PROJ = Path(__file__).parent.parent
 TEX_DIR = Path(__file__).parent / "materials" / "textures"
 OUTPUT = str(PROJ / "output" / "training_muro_final.png")
 
-# === CLEAR ===
-bpy.ops.object.select_all(action='SELECT')
-bpy.ops.object.delete(use_global=False)
-for m in bpy.data.meshes: bpy.data.meshes.remove(m)
-for m in bpy.data.materials: bpy.data.materials.remove(m)
-for img in bpy.data.images: bpy.data.images.remove(img)
+# Tempi per fase (homeforge/bench.py li raccoglie da $HF_PHASES_JSON)
+instrument.mark("clear")
+
+# === CLEAR === template di avvio (Cycles, 1920×1080, AgX, world) — homeforge/scene_setup.py
+scene_setup.new_scene()
 
+instrument.mark("geometry")
 # === MURO 3m x 2m x 0.45m ===
 bpy.ops.mesh.primitive_cube_add(size=1.0, location=(0, 0, 1.0))
 obj = bpy.context.active_object
@@ -23,107 +35,25 @@ obj.name = "Muro"
 obj.scale = (3.0, 0.45, 2.0)
 bpy.ops.object.transform_apply(scale=True)
 
-# === MATERIALE PBR con texture reali ===
-mat = bpy.data.materials.new("PietraFiume_PBR")
-mat.use_nodes = True
-mat.displacement_method = 'BUMP'
-nt = mat.node_tree
-ns = nt.nodes
-lk = nt.links
-for n in ns: ns.remove(n)
-
-# --- Nodi base ---
-out = ns.new("ShaderNodeOutputMaterial"); out.location = (1200, 0)
-bsdf = ns.new("ShaderNodeBsdfPrincipled"); bsdf.location = (800, 0)
-lk.new(bsdf.outputs["BSDF"], out.inputs["Surface"])
-
-# --- Texture Coordinate + Mapping ---
-tc = ns.new("ShaderNodeTexCoord"); tc.location = (-800, 0)
-mapping = ns.new("ShaderNodeMapping"); mapping.location = (-600, 0)
-# Scala per adattare la texture al muro 3m x 2m
-# La texture è quadrata, il muro è 3:2 → scala Y (che in object space è Z) per compensare
-mapping.inputs["Scale"].default_value = (1.5, 1.5, 1.5)
-lk.new(tc.outputs["Generated"], mapping.inputs["Vector"])
-
-# === DIFFUSE (Color) ===
-tex_diff = ns.new("ShaderNodeTexImage"); tex_diff.location = (-200, 300)
-tex_diff.image = bpy.data.images.load(str(TEX_DIR / "rock_wall_08_diff_2k.jpg"))
-tex_diff.image.colorspace_settings.name = 'sRGB'
-tex_diff.projection = 'BOX'
-tex_diff.projection_blend = 0.3
-lk.new(mapping.outputs["Vector"], tex_diff.inputs["Vector"])
-
-# Leggero color correction: scalda un po' i grigi per sembrare sasso di fiume alpino
-hsv = ns.new("ShaderNodeHueSaturation"); hsv.location = (200, 300)
-hsv.inputs["Saturation"].default_value = 0.85  # desatura leggermente
-hsv.inputs["Value"].default_value = 0.95  # un po' più scuro
-lk.new(tex_diff.outputs["Color"], hsv.inputs["Color"])
-lk.new(hsv.outputs["Color"], bsdf.inputs["Base Color"])
-
-# === ROUGHNESS ===
-tex_rough = ns.new("ShaderNodeTexImage"); tex_rough.location = (-200, 0)
-tex_rough.image = bpy.data.images.load(str(TEX_DIR / "rock_wall_08_rough_2k.jpg"))
-tex_rough.image.colorspace_settings.name = 'Non-Color'
-tex_rough.projection = 'BOX'
-tex_rough.projection_blend = 0.3
-lk.new(mapping.outputs["Vector"], tex_rough.inputs["Vector"])
-lk.new(tex_rough.outputs["Color"], bsdf.inputs["Roughness"])
-
-# === NORMAL MAP ===
-tex_nor = ns.new("ShaderNodeTexImage"); tex_nor.location = (-200, -300)
-tex_nor.image = bpy.data.images.load(str(TEX_DIR / "rock_wall_08_nor_gl_2k.jpg"))
-tex_nor.image.colorspace_settings.name = 'Non-Color'
-tex_nor.projection = 'BOX'
-tex_nor.projection_blend = 0.3
-lk.new(mapping.outputs["Vector"], tex_nor.inputs["Vector"])
-
-normal_map = ns.new("ShaderNodeNormalMap"); normal_map.location = (200, -300)
-normal_map.inputs["Strength"].default_value = 2.0  # forte per profondità
-lk.new(tex_nor.outputs["Color"], normal_map.inputs["Color"])
-
-# === DISPLACEMENT → Bump (per profondità extra) ===
-tex_disp = ns.new("ShaderNodeTexImage"); tex_disp.location = (-200, -600)
-tex_disp.image = bpy.data.images.load(str(TEX_DIR / "rock_wall_08_disp_2k.png"))
-tex_disp.image.colorspace_settings.name = 'Non-Color'
-tex_disp.projection = 'BOX'
-tex_disp.projection_blend = 0.3
-lk.new(mapping.outputs["Vector"], tex_disp.inputs["Vector"])
-
-bump = ns.new("ShaderNodeBump"); bump.location = (500, -500)
-bump.inputs["Strength"].default_value = 0.8  # forte
-bump.inputs["Distance"].default_value = 0.04  # 4cm di profondità percepita
-lk.new(tex_disp.outputs["Color"], bump.inputs["Height"])
-lk.new(normal_map.outputs["Normal"], bump.inputs["Normal"])
-
-# Micro noise aggiuntivo per rugosità singolo sasso
-noise_micro = ns.new("ShaderNodeTexNoise"); noise_micro.location = (200, -700)
-noise_micro.inputs["Scale"].default_value = 150.0
-noise_micro.inputs["Detail"].default_value = 16.0
-noise_micro.inputs["Roughness"].default_value = 0.8
-lk.new(mapping.outputs["Vector"], noise_micro.inputs["Vector"])
-
-bump2 = ns.new("ShaderNodeBump"); bump2.location = (700, -600)
-bump2.inputs["Strength"].default_value = 0.05
-bump2.inputs["Distance"].default_value = 0.002
-lk.new(noise_micro.outputs["Fac"], bump2.inputs["Height"])
-lk.new(bump.outputs["Normal"], bump2.inputs["Normal"])
-
-lk.new(bump2.outputs["Normal"], bsdf.inputs["Normal"])
+instrument.mark("materials")
+# === MATERIALE PBR con texture reali (parametri in materials/stone_wall.md) ===
+# rock_wall_08: Hue/Sat 0.85/0.95, Normal 2.0, Bump 0.8/0.04 + micro noise 150/16
+# Caricato dalla libreria pre-costruita materials/hf_materials_v*.blend
+mat = hflib.load_materials(["Pietra_Muro"])["Pietra_Muro"]
 
 # Assegna materiale
 obj.data.materials.append(mat)
 
+instrument.mark("geometry")
 # ============================================================
 # PIANO TERRA
 # ============================================================
 bpy.ops.mesh.primitive_plane_add(size=20, location=(0, 0, 0))
 ground = bpy.context.active_object; ground.name = "Ground"
-mat_g = bpy.data.materials.new("Ground"); mat_g.use_nodes = True
-bsdf_g = mat_g.node_tree.nodes["Principled BSDF"]
-bsdf_g.inputs["Base Color"].default_value = (0.25, 0.28, 0.20, 1)  # terra/erba
-bsdf_g.inputs["Roughness"].default_value = 0.95
+mat_g = hfm.create_flat_material("Ground", (0.25, 0.28, 0.20, 1), roughness=0.95)  # terra/erba
 ground.data.materials.append(mat_g)
 
+instrument.mark("setup")
 # ============================================================
 # CAMERA — 50mm, vista 3/4 per mostrare la profondità
 # ============================================================
@@ -182,7 +112,7 @@ fill.location = (5, 0, 4)
 fill.rotation_euler = (math.radians(40), math.radians(30), math.radians(25))
 
 # ============================================================
-# RENDER — Cycles, 512 samples
+# RENDER — Cycles, livello qualità (default final: 512 samples)
 # ============================================================
 scene = bpy.context.scene
 scene.render.engine = 'CYCLES'
@@ -195,9 +125,11 @@ try:
 except:
     scene.cycles.device = 'CPU'
 
-scene.cycles.samples = 512
-scene.cycles.use_denoising = True
-scene.cycles.denoiser = 'OPENIMAGEDENOISE'
+# Samples, risoluzione %, bounces, texture, denoiser: --tier draft|preview|final
+TIER = quality.apply_tier(scene)
+OUTPUT = quality.tier_output(OUTPUT, TIER["name"])
+texture_cache.apply_variants(tier=TIER["name"])   # draft/preview: map 512/1K dalla cache
+BAKED = bake_cache.apply(scene, tier=TIER["name"])   # final: canali procedurali da texture baked
 scene.render.resolution_x = 1920
 scene.render.resolution_y = 1080
 scene.render.film_transparent = False
@@ -211,16 +143,39 @@ scene.view_settings.look = 'AgX - Base Contrast'
 
 print("=" * 60)
 print("HomeForge AI — Training: Muro pietra v3 (PBR textures)")
-print(f"Output: {OUTPUT}")
+print(f"Output: {OUTPUT} (qualità: {TIER['name']})")
 print("=" * 60)
 
+# Final: proxy 240×135 a 16 samples + controlli NumPy (esposizione, clipping,
+# rame non verde, oggetto in quadro) — se fallisce il render finale non parte
+preflight.gate(scene, tier=TIER["name"], target=["Muro"], output=OUTPUT)
+
+instrument.mark(None)
+
+# Scena invariata (stessa impronta) → immagine dalla cache, nessun render
 start = time.time()
-bpy.ops.render.render(write_still=True)
+# --progressive / --checkpoints 16,64 / --hook file.py:funzione → checkpoint + stop anticipato
+CACHED = render_cache.render(scene, OUTPUT, prepare=instrument.load_images,
+                             renderer=progressive.renderer_from_args(scene, OUTPUT))
 elapsed = time.time() - start
-print(f"\nRender completato in {elapsed:.1f}s")
+if not CACHED["complete"]:
+    print(f"\nRender fermato dall'hook dopo {elapsed:.1f}s: solo i checkpoint in output/")
+    instrument.finish("training_muro_pietra.py", output=None, status="STOPPED", tier=TIER["name"])
+    raise SystemExit(0)
+print(f"\nRender completato in {elapsed:.1f}s" + (" (cache)" if CACHED["hit"] else ""))
 print(f"Salvato: {OUTPUT}")
+quality.record_render(OUTPUT, TIER, elapsed, cached=CACHED["hit"])
+hfm.print_memory_report()
 
 # Salva il .blend
 blend_path = str(Path(__file__).parent / "materials" / "test_stone_wall.blend")
-bpy.ops.wm.save_as_mainfile(filepath=blend_path)
-print(f"Blend salvato: {blend_path}")
+if CACHED["hit"] and Path(blend_path).exists():
+    print(f"Blend invariato (render dalla cache): {blend_path}")
+else:
+    instrument.mark("blend_save")
+    bake_cache.restore(BAKED)                      # .blend con i materiali procedurali
+    bpy.ops.wm.save_as_mainfile(filepath=blend_path)
+    print(f"Blend salvato: {blend_path}")
+    instrument.mark(None)
+
+instrument.finish("training_muro_pietra.py", output=OUTPUT, tier=TIER["name"])